@@ -31,10 +31,11 @@ class BathymetricMapper:
     def load_sonar_data(self, csv_file: str) -> bool:
         """
         Load parsed sonar data from CSV files
-        Works with our universal parser output
+        Works with our universal parser output (CSV or .npy/.parquet records)
         """
         try:
-            df = pd.read_csv(csv_file)
+            from record_columns import read_records_frame
+            df = read_records_frame(csv_file)
             
             # Extract coordinates and depth data
             if all(col in df.columns for col in ['lat', 'lon', 'depth_m']):
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Block pair alignment benchmark.
+
+Reports block alignments per second for the original per-row complex-FFT
+phase correlation, the batched rfft engine (phase_align.block_shift) and
+auto_align_block_pair on a repeat visit (memoised in the PingReader), and
+checks that the batched shifts equal the per-row ones.
+
+    python benchmark_alignment.py [--blocks 200] [--width 1024] [--rows 5]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from block_pipeline import BlockProcessor, PingReader, auto_align_block_pair
+from engine_nextgen_syncfirst import parse_rsd
+from phase_align import _row_shift_reference, block_shift, row_shifts
+from synthetic_rsd import write_synthetic_rsd
+
+
+def _best(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t)
+    return best
+
+
+def _per_row(left, right):
+    shifts = np.array([_row_shift_reference(l, r) for l, r in zip(left, right)])
+    return int(np.median(shifts))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--blocks', type=int, default=200)
+    ap.add_argument('--width', type=int, default=1024)
+    ap.add_argument('--rows', type=int, default=5, help='sampled rows per block')
+    ap.add_argument('--repeat', type=int, default=5)
+    a = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 256, (a.blocks, a.rows, a.width + 80), dtype=np.uint8)
+    true = rng.integers(-30, 31, a.blocks)
+    lefts = base[:, :, 40:40 + a.width]
+    rights = np.stack([np.roll(b, s, axis=1)[:, 40:40 + a.width] for b, s in zip(base, true)])
+
+    same = all(np.array_equal(row_shifts(l, r), [_row_shift_reference(x, y) for x, y in zip(l, r)])
+               for l, r in zip(lefts, rights))
+    t_ref = _best(lambda: [_per_row(l, r) for l, r in zip(lefts, rights)], a.repeat)
+    t_new = _best(lambda: [block_shift(l, r) for l, r in zip(lefts, rights)], a.repeat)
+    print(f"{a.blocks} blocks x {a.rows} rows x {a.width}px, best of {a.repeat} (shifts identical: {same})")
+    print(f"  per-row fft      {a.blocks / t_ref:>10.0f} alignments/s")
+    print(f"  batched rfft     {a.blocks / t_new:>10.0f} alignments/s  ({t_ref / t_new:.1f}x)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rsd = write_synthetic_rsd(os.path.join(tmp, 'bench.RSD'), a.blocks * 100, samples=a.width)
+        _, csv_path, _ = parse_rsd(rsd, os.path.join(tmp, 'out'))
+        with PingReader(rsd) as reader:
+            bp = BlockProcessor(csv_path, rsd, block_size=50, reader=reader)
+            pairs = [(bp.get_channel_blocks(4)[i], bp.get_channel_blocks(5)[i])
+                     for i in range(bp.num_block_pairs(4, 5))]
+            t = time.perf_counter()
+            for l, r in pairs:
+                auto_align_block_pair(rsd, l, r, reader=reader)
+            t_first = time.perf_counter() - t
+            t_memo = _best(lambda: [auto_align_block_pair(rsd, l, r, reader=reader) for l, r in pairs], a.repeat)
+        print(f"auto_align_block_pair on {len(pairs)} RSD block pairs")
+        print(f"  first visit      {len(pairs) / t_first:>10.0f} alignments/s")
+        print(f"  memoised         {len(pairs) / t_memo:>10.0f} alignments/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Block waterfall composition benchmark for block_pipeline.
+
+Times the original one-ping-at-a-time composer against the batched
+compose_waterfall path (PingReader.read_block + resample_block) on blocks of
+50-500 pings, both from the RSD mmap and from a ping store, and checks that
+every output matches the per-ping reference within one grey level.
+
+    python benchmark_block_compose.py [--records 4000] [--samples 1400] [--width 512]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from block_pipeline import (PingReader, _compose_preview_per_ping, compose_waterfall,
+                            read_records_from_csv)
+from engine_nextgen_syncfirst import parse_rsd
+from synthetic_rsd import write_synthetic_rsd
+
+
+def _best(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--records', type=int, default=4000)
+    ap.add_argument('--samples', type=int, default=1400)
+    ap.add_argument('--width', type=int, default=512)
+    ap.add_argument('--repeat', type=int, default=7)
+    a = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rsd = write_synthetic_rsd(os.path.join(tmp, 'bench.RSD'), a.records, samples=a.samples)
+        _, csv_path, _ = parse_rsd(rsd, os.path.join(tmp, 'out'), ping_store=True)
+        records = read_records_from_csv(csv_path)
+        left_all = [r for r in records if r.channel_id == 4]
+        right_all = [r for r in records if r.channel_id == 5]
+
+        plain = PingReader(rsd)
+        stored = PingReader(rsd)
+        from ping_store import PingStore
+        stored.store = PingStore.open(csv_path)
+
+        print(f"{a.samples} samples/ping -> {a.width}px, best of {a.repeat}")
+        print(f"{'pings':>6} {'per-ping':>10} {'batched':>10} {'store':>10} {'speedup':>8} {'max diff':>8}")
+        for n in (50, 100, 200, 500):
+            left, right = left_all[:n], right_all[:n]
+            kw = dict(width=a.width, flip_left=True, remove_water_column=True)
+            ref = _compose_preview_per_ping(plain, left, right, **kw)
+            out = compose_waterfall(plain.read_block(left), plain.read_block(right), **kw)
+            via_store = compose_waterfall(stored.read_block(left), stored.read_block(right), **kw)
+            diff = max(int(np.abs(ref.astype(int) - out).max()), int(np.abs(ref.astype(int) - via_store).max()))
+
+            t_ref = _best(lambda: _compose_preview_per_ping(plain, left, right, **kw), a.repeat)
+            t_new = _best(lambda: compose_waterfall(plain.read_block(left), plain.read_block(right), **kw), a.repeat)
+            t_store = _best(lambda: compose_waterfall(stored.read_block(left), stored.read_block(right), **kw), a.repeat)
+            print(f"{n:>6} {t_ref * 1e3:>8.2f}ms {t_new * 1e3:>8.2f}ms {t_store * 1e3:>8.2f}ms "
+                  f"{t_ref / t_new:>7.1f}x {diff:>8}")
+        plain.close(); stored.close()
+
+
+if __name__ == '__main__':
+    main()
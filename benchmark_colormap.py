@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Colormap benchmark on large grey frames (default 4096x4096).
+
+Compares the old float path (matplotlib cmap on a normalised float image,
+float64 RGBA, then back to uint8), fancy indexing `lut[gray]`, and
+colormap_utils.colorize (single np.take through the cached uint8 table),
+into a fresh array and into a reused output buffer, with and without a
+contrast stretch folded into the table. Outputs are checked to be identical.
+
+    python benchmark_colormap.py [--size 4096] [--cmap viridis] [--repeat 3]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from colormap_utils import _get_cmap, colorize, colormap_lut
+
+
+def _best(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t)
+    return best
+
+
+def _float_path(gray, name, stretch):
+    if stretch:
+        lo, hi = gray.min(), gray.max()
+        gray = ((gray - lo) / (hi - lo) * 255).astype(np.uint8)
+    return (_get_cmap(name)(gray.astype(np.float32) / 255.0)[:, :, :3] * 255).astype(np.uint8)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--size', type=int, default=4096)
+    ap.add_argument('--cmap', default='viridis')
+    ap.add_argument('--repeat', type=int, default=3)
+    a = ap.parse_args()
+
+    gray = np.random.default_rng(0).integers(20, 230, (a.size, a.size), dtype=np.uint8)
+    out = np.empty(gray.shape + (3,), np.uint8)
+    lut = colormap_lut(a.cmap)
+    mpix = gray.size / 1e6
+    same = (np.array_equal(_float_path(gray, a.cmap, False), colorize(gray, a.cmap))
+            and np.array_equal(_float_path(gray, a.cmap, True), colorize(gray, a.cmap, contrast='auto')))
+    print(f"{a.size}x{a.size} '{a.cmap}', best of {a.repeat} (identical to float path: {same})")
+    for label, fn in [
+        ('float (matplotlib)', lambda: _float_path(gray, a.cmap, False)),
+        ('lut[gray]', lambda: lut[gray]),
+        ('colorize', lambda: colorize(gray, a.cmap)),
+        ('colorize out=', lambda: colorize(gray, a.cmap, out=out)),
+        ('float + stretch', lambda: _float_path(gray, a.cmap, True)),
+        ('colorize + stretch', lambda: colorize(gray, a.cmap, out=out, contrast='auto')),
+    ]:
+        t = _best(fn, a.repeat)
+        print(f"  {label:<20} {t * 1000:>8.1f} ms  {mpix / t:>8.0f} Mpx/s")
+
+
+if __name__ == '__main__':
+    main()
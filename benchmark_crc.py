@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+CRC benchmark for core_shared.
+
+Reports MB/s for every CRC implementation (bitwise reference, slicing-by-4
+table, zlib) on varstruct-sized blocks, checks that each one
+returns exactly what _crc32_custom returns, then times a full nextgen parse
+of a synthetic RSD in every crc_mode.
+
+    python benchmark_crc.py [--blocks 20000] [--records 20000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from core_shared import _crc32_custom, _crc32_table, _crc32_fast
+
+
+def _mbps(nbytes, secs):
+    return (nbytes / (1024 * 1024)) / max(secs, 1e-9)
+
+
+def bench_implementations(n_blocks: int):
+    rnd = random.Random(11)
+    buf = os.urandom(n_blocks * 64 + 256)
+    starts = [rnd.randrange(0, n_blocks * 64) for _ in range(n_blocks)]
+    lengths = [rnd.randrange(16, 96) for _ in range(n_blocks)]
+    total = sum(lengths)
+    blocks = [buf[s:s + l] for s, l in zip(starts, lengths)]
+
+    # reference is slow; time it on a slice and extrapolate
+    ref_n = min(n_blocks, 2000)
+    t = time.perf_counter(); ref = [_crc32_custom(b) for b in blocks[:ref_n]]
+    ref_s = time.perf_counter() - t
+    print(f"  bitwise (reference) {_mbps(sum(lengths[:ref_n]), ref_s):9.2f} MB/s")
+
+    t = time.perf_counter(); tab = [_crc32_table(b) for b in blocks]; tab_s = time.perf_counter() - t
+    t = time.perf_counter(); fast = [_crc32_fast(b) for b in blocks]; fast_s = time.perf_counter() - t
+    print(f"  table slicing-by-4  {_mbps(total, tab_s):9.2f} MB/s")
+    print(f"  zlib                {_mbps(total, fast_s):9.2f} MB/s")
+
+    ok = tab[:ref_n] == ref and fast[:ref_n] == ref and tab == fast
+    print(f"  identical to _crc32_custom: {'YES' if ok else 'NO'}")
+    return ok
+
+
+def bench_parse_modes(n_records: int):
+    import logging
+    from synthetic_rsd import write_synthetic_rsd
+    from engine_nextgen_syncfirst import parse_rsd_records_nextgen
+    logging.disable(logging.WARNING)  # the 1-byte backtrack probe logs mismatches by design
+    with tempfile.TemporaryDirectory() as td:
+        path = write_synthetic_rsd(os.path.join(td, 'bench.RSD'), n_records)
+        size = os.path.getsize(path)
+        base = None; ok = True
+        for mode in ('strict', 'warn', 'sampled', 'batch', 'off'):
+            t = time.perf_counter(); recs = list(parse_rsd_records_nextgen(path, crc_mode=mode))
+            secs = time.perf_counter() - t
+            if base is None: base = recs
+            same = recs == base; ok &= same
+            print(f"  crc_mode={mode:<8} {_mbps(size, secs):8.2f} MB/s  {len(recs)} records  "
+                  f"{'same' if same else 'DIFFERENT'}")
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--blocks', type=int, default=20000)
+    ap.add_argument('--records', type=int, default=20000)
+    a = ap.parse_args()
+    print("CRC implementations:")
+    ok = bench_implementations(a.blocks)
+    print("Nextgen parse by crc_mode:")
+    ok &= bench_parse_modes(a.records)
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for the sharded nextgen parser.
+
+Writes a large synthetic RSD (or uses --rsd), times the sequential engine,
+then parse_rsd_records_parallel at 1..N workers, and checks that every run
+yields exactly the sequential record stream (compared by a running CRC of
+each record, so multi-GB files do not have to fit in memory).
+
+    python benchmark_parallel_parse.py [--size-gb 2] [--max-workers 8] [--rsd FILE]
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+import zlib
+
+from engine_nextgen_syncfirst import parse_rsd_records_nextgen, parse_rsd_records_parallel
+
+
+def _digest(records):
+    crc = 0; n = 0
+    for r in records:
+        crc = zlib.crc32(repr((r.ofs, r.channel_id, r.seq, r.time_ms, r.lat, r.lon, r.depth_m,
+                               r.sample_cnt, r.sonar_ofs, r.sonar_size, r.beam_deg)).encode(), crc)
+        n += 1
+    return n, crc
+
+
+def run(path: str, max_workers: int):
+    size = os.path.getsize(path)
+    mb = size / (1024 * 1024)
+    t = time.perf_counter(); ref = _digest(parse_rsd_records_nextgen(path)); base = time.perf_counter() - t
+    print(f"  sequential       {base:8.2f}s {mb / base:8.1f} MB/s  ({ref[0]} records)")
+    ok = True
+    w = 1
+    while w <= max_workers:
+        t = time.perf_counter(); got = _digest(parse_rsd_records_parallel(path, workers=w)); secs = time.perf_counter() - t
+        same = got == ref; ok &= same
+        print(f"  {w:2d} worker(s)     {secs:8.2f}s {mb / secs:8.1f} MB/s  x{base / secs:4.2f}  "
+              f"{'identical' if same else 'MISMATCH'}")
+        w *= 2
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark sharded RSD parsing')
+    ap.add_argument('--size-gb', type=float, default=2.0)
+    ap.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    ap.add_argument('--rsd', default=None, help='Benchmark an existing file instead')
+    a = ap.parse_args()
+    logging.disable(logging.WARNING)
+    if a.rsd:
+        print(f"{a.rsd} ({os.path.getsize(a.rsd) / 1e9:.2f} GB)")
+        return 0 if run(a.rsd, a.max_workers) else 1
+    from synthetic_rsd import write_synthetic_rsd_bytes
+    with tempfile.TemporaryDirectory() as td:
+        path = os.path.join(td, 'bench.RSD')
+        print(f"Writing {a.size_gb:.2f} GB synthetic RSD...")
+        write_synthetic_rsd_bytes(path, int(a.size_gb * 1024 ** 3), garbage_every=997)
+        return 0 if run(path, a.max_workers) else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
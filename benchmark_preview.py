@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Preview redraw benchmark for preview_manager.PreviewManager.
+
+Times a colormap change on a two-channel preview the way the manager used to
+do it (decode both PNGs, colour, stack, LANCZOS-resize the RGB image) and with
+the cached path (decoded rows and the stacked grayscale kept, lookup table
+re-applied before the resize), plus a first render and a PREVIEW_HEIGHT change.
+
+    python benchmark_preview.py [--height 2000] [--width 2048] [--preview-h 1080]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from color_manager import ColorManager
+from preview_manager import PreviewManager
+
+
+def _old_redraw(paths, cfg, cm):
+    img0 = np.array(Image.open(paths[0]))
+    h = img0.shape[0]
+    preview = np.hstack([cm.apply(img0, cfg['COLORMAP']), cm.apply(np.array(Image.open(paths[1])), cfg['COLORMAP'])])
+    scale = cfg['PREVIEW_HEIGHT'] / h
+    return np.array(Image.fromarray(preview).resize((int(preview.shape[1] * scale), cfg['PREVIEW_HEIGHT']),
+                                                    Image.Resampling.LANCZOS))
+
+
+def _ms(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t)
+    return best * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--height', type=int, default=2000)
+    ap.add_argument('--width', type=int, default=2048)
+    ap.add_argument('--preview-h', type=int, default=1080)
+    a = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(2):
+            p = os.path.join(tmp, f'ch{i}.png')
+            Image.fromarray(rng.integers(0, 256, (a.height, a.width), dtype=np.uint8)).save(p)
+            paths.append(p)
+        cfg = {'PREVIEW_MODE': 'both', 'PREVIEW_HEIGHT': a.preview_h, 'COLORMAP': 'amber'}
+        cm = ColorManager()
+        cmaps = iter(['amber', 'viridis', 'sepia', 'grayscale'] * 100)
+
+        pm = PreviewManager()
+        pm._current_paths = paths
+        pm._current_config = dict(cfg)
+        t = time.perf_counter(); pm._generate_preview(); t_first = (time.perf_counter() - t) * 1000
+
+        def lut_only():
+            pm._current_config = dict(cfg, COLORMAP=next(cmaps)); pm._generate_preview()
+
+        heights = iter([a.preview_h // 2, a.preview_h] * 100)
+
+        def rescale():
+            pm._current_config = dict(cfg, PREVIEW_HEIGHT=next(heights)); pm._generate_preview()
+
+        print(f"2 x {a.height}x{a.width} rows -> {a.preview_h}px preview")
+        print(f"  colormap change, decode + colour + resize  {_ms(lambda: _old_redraw(paths, dict(cfg, COLORMAP=next(cmaps)), cm)):>8.1f} ms")
+        print(f"  colormap change, cached (LUT only)         {_ms(lut_only):>8.1f} ms")
+        print(f"  first render                               {t_first:>8.1f} ms")
+        print(f"  preview height change (cached rows)        {_ms(rescale):>8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Video frame rendering benchmark for video_exporter.export_waterfall_frames.
+
+Reports frames/sec for the encoder alone and for the full export with
+RENDER_WORKERS = 0 (in-process), 2, 4, ... (process pool + ordered reorder
+buffer), once with the real encoder and once with a null sink so the
+rendering stage is measured on its own. The encoder is timed on the
+caller's thread and on VideoWorker's writer thread. Rendering scales with workers until
+the encoder rate is reached; outputs are checked to be identical.
+
+    python benchmark_video_render.py [--rows 300] [--row-h 50] [--video-h 720] [--workers 0,2,4]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import video_exporter
+from render_accel import VideoWorker
+from video_exporter import export_waterfall_frames
+
+
+class _NullSink:
+    frames = []
+    shape = None
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def push(self, frame):
+        _NullSink.shape = frame.shape
+        _NullSink.frames.append(hash(frame.tobytes()))
+
+    def close(self):
+        pass
+
+    def stats(self):
+        return {'frames': 0}
+
+
+def _rows(n, row_h, width):
+    rng = np.random.default_rng(0)
+    rows = []
+    for _ in range(n):
+        row = np.zeros((row_h, width), dtype=np.uint8)
+        row[:, :width // 2 - 2] = rng.integers(0, 256, (row_h, width // 2 - 2))
+        row[:, width // 2 + 2:] = rng.integers(0, 256, (row_h, width - width // 2 - 2))
+        rows.append(row)
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--rows', type=int, default=300)
+    ap.add_argument('--row-h', type=int, default=50)
+    ap.add_argument('--width', type=int, default=516)
+    ap.add_argument('--video-h', type=int, default=720)
+    ap.add_argument('--workers', default='0,2,4')
+    a = ap.parse_args()
+
+    rows = _rows(a.rows, a.row_h, a.width)
+    print(f"{a.rows} rows of {a.row_h}x{a.width} -> {a.video_h}px frames, {os.cpu_count()} CPUs")
+    with tempfile.TemporaryDirectory() as tmp:
+        reference = None
+        for w in [int(x) for x in a.workers.split(',')]:
+            cfg = {'COLORMAP': 'amber', 'RENDER_WORKERS': w}
+            logs = []
+            real_enc = video_exporter.VideoWorker
+            video_exporter.VideoWorker = _NullSink
+            _NullSink.frames = []
+            try:
+                t = time.perf_counter()
+                export_waterfall_frames(iter(rows), cfg, os.path.join(tmp, 'null.mp4'),
+                                        a.row_h, a.video_h, 30, 10 ** 9)
+                t_render = time.perf_counter() - t
+            finally:
+                video_exporter.VideoWorker = real_enc
+            n = len(_NullSink.frames)
+            reference = reference or _NullSink.frames
+            same = _NullSink.frames == reference
+
+            t = time.perf_counter()
+            export_waterfall_frames(iter(rows), cfg, os.path.join(tmp, f'w{w}.mp4'),
+                                    a.row_h, a.video_h, 30, 10 ** 9, log_func=logs.append)
+            t_full = time.perf_counter() - t
+            if w == int(a.workers.split(',')[0]):
+                # encoder alone, on frames of the same size, on the caller's thread and threaded
+                frame = np.random.default_rng(1).integers(0, 256, _NullSink.shape, dtype=np.uint8)
+                for threaded in (False, True):
+                    vw = VideoWorker(os.path.join(tmp, 'enc.mp4'), fps=30, threaded=threaded)
+                    t = time.perf_counter()
+                    for _ in range(n):
+                        vw.push(frame)
+                    vw.close()
+                    label = 'threaded' if threaded else 'synchronous'
+                    print(f"  encoder only ({label:<11})                   {n / (time.perf_counter() - t):>8.1f} frames/s")
+            print(f"  workers={w:<2} render {n / t_render:>8.1f} frames/s   "
+                  f"with encoder {n / t_full:>8.1f} frames/s   identical={same}")
+            print(f"    {logs[-1]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 # block_pipeline.py - Enhanced block-based left/right channel processing with auto-alignment
 
-import csv, json, mmap
+import csv, json, mmap, os, threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import List, Tuple, Iterator, Optional, Dict, Any
 from pathlib import Path
@@ -31,57 +32,33 @@ class RSDRecord:
     color_id: Optional[int] = None
     extras: Optional[Dict[str, Any]] = None
 
-def read_records_from_csv(csv_path: str) -> List[RSDRecord]:
-    """Read RSD records from CSV with all available fields"""
+def records_from_array(arr: np.ndarray) -> List[RSDRecord]:
+    """RSDRecords from a record_columns.RECORD_DTYPE array (sentinels -> None)"""
+    from record_columns import RECORD_FIELDS, INT_NULL
+    cols = [arr[n].tolist() for n in RECORD_FIELDS]
+    is_int = [arr.dtype[n].kind == 'i' for n in RECORD_FIELDS]
     records = []
-    with open(csv_path, 'r', encoding='utf-8', newline='') as fp:
-        reader = csv.DictReader(fp)
-        for row in reader:
-            try:
-                # Parse extras JSON if present
-                extras = None
-                if 'extras_json' in row and row['extras_json']:
-                    try:
-                        extras = json.loads(row['extras_json'])
-                    except:
-                        pass
-                
-                # Helper function to safely convert values
-                def safe_float(val, default=None):
-                    try:
-                        return float(val) if val and val.strip() else default
-                    except (ValueError, AttributeError):
-                        return default
-                
-                def safe_int(val, default=None):
-                    try:
-                        return int(val) if val and val.strip() else default
-                    except (ValueError, AttributeError):
-                        return default
-                
-                record = RSDRecord(
-                    ofs=safe_int(row.get('ofs'), 0),
-                    channel_id=safe_int(row.get('channel_id')),
-                    seq=safe_int(row.get('seq'), 0),
-                    time_ms=safe_int(row.get('time_ms'), 0),
-                    lat=safe_float(row.get('lat')),
-                    lon=safe_float(row.get('lon')),
-                    depth_m=safe_float(row.get('depth_m')),
-                    sample_cnt=safe_int(row.get('sample_cnt')),
-                    sonar_ofs=safe_int(row.get('sonar_ofs')),
-                    sonar_size=safe_int(row.get('sonar_size')),
-                    beam_deg=safe_float(row.get('beam_deg')),
-                    pitch_deg=safe_float(row.get('pitch_deg')),
-                    roll_deg=safe_float(row.get('roll_deg')),
-                    heave_m=safe_float(row.get('heave_m')),
-                    tx_ofs_m=safe_float(row.get('tx_ofs_m')),
-                    rx_ofs_m=safe_float(row.get('rx_ofs_m')),
-                    color_id=safe_int(row.get('color_id')),
-                    extras=extras
-                )
-                records.append(record)
-            except Exception as e:
-                continue  # Skip malformed rows
+    for row in zip(*cols):
+        vals = [None if (v != v or (i and v == INT_NULL)) else v for v, i in zip(row, is_int)]
+        records.append(RSDRecord(*vals))
+    return records
+
+def _attach_extras(records: List[RSDRecord], csv_path: str, limit: Optional[int] = None):
+    """Fill record.extras from the CSV's extras_json column (first `limit` rows)"""
+    from record_columns import read_extras
+    for record, extras in zip(records, read_extras(str(csv_path), limit)):
+        record.extras = extras
+
+def read_records_from_csv(csv_path: str, extras: bool = False, cache: bool = True) -> List[RSDRecord]:
+    """Read RSD records from a records CSV (or a columnar .npy/.parquet file).
+    
+    Columns are parsed with fixed dtypes by record_columns.load_records, which
+    keeps a `<csv>.rcache` binary copy so repeat loads are memory-mapped;
+    extras_json is only parsed with extras=True."""
+    from record_columns import load_records
+    records = records_from_array(load_records(str(csv_path), cache=cache))
+    if extras:
+        _attach_extras(records, csv_path)
     return records
 
 def split_by_channels(records: List[RSDRecord]) -> Dict[int, List[RSDRecord]]:
@@ -134,21 +111,393 @@ def pair_channel_blocks(left_blocks: List[List[RSDRecord]],
     print(f"Created {len(paired_blocks)} paired blocks")
     return paired_blocks
 
-def extract_sonar_data(rsd_path: str, record: RSDRecord) -> bytes:
+MIN_BLOCK_RECORDS = 5
+
+class RecordBlock:
+    """Records of one block described as row numbers into the record columns.
+    
+    len() and slicing only touch the row numbers; indexing or iterating
+    builds the RSDRecords once (PingReader.read_block reads the offset
+    columns directly and never needs them)."""
+    
+    __slots__ = ('columns', 'rows', '_records')
+    
+    def __init__(self, columns: np.ndarray, rows: np.ndarray):
+        self.columns = columns
+        self.rows = rows
+        self._records = None
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return RecordBlock(self.columns, self.rows[i])
+        return self.records()[i]
+    
+    def __iter__(self):
+        return iter(self.records())
+    
+    def __repr__(self) -> str:
+        return f"RecordBlock({len(self)} records)"
+    
+    def records(self) -> List[RSDRecord]:
+        if self._records is None:
+            self._records = records_from_array(self.columns[self.rows])
+        return self._records
+    
+    def int_columns(self, *names: str) -> List[np.ndarray]:
+        """int64 copies of the named columns for this block (nulls -> 0)"""
+        from record_columns import INT_NULL
+        out = []
+        for name in names:
+            col = self.columns[name][self.rows].astype(np.int64)
+            col[col == INT_NULL] = 0
+            out.append(col)
+        return out
+
+class ChannelBlocks:
+    """Lazy create_channel_blocks() for one channel: `block_size` consecutive
+    rows of the seq-ordered channel, with a short tail dropped below
+    MIN_BLOCK_RECORDS. Blocks are created on access."""
+    
+    def __init__(self, columns: np.ndarray, order: np.ndarray, block_size: int):
+        self.columns = columns
+        self.order = order
+        self.block_size = block_size
+        n_full, tail = divmod(len(order), block_size)
+        self._count = n_full + (1 if tail >= MIN_BLOCK_RECORDS else 0)
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("block index out of range")
+        return RecordBlock(self.columns, self.order[i * self.block_size:(i + 1) * self.block_size])
+    
+    def __iter__(self):
+        return (self[i] for i in range(self._count))
+    
+    def block_lengths(self) -> List[int]:
+        return [min(self.block_size, len(self.order) - i * self.block_size) for i in range(self._count)]
+    
+    def end_times(self, field: str = 'time_ms') -> np.ndarray:
+        """`field` of the last record of every block (time-based video scheduling)"""
+        ends = np.minimum((np.arange(self._count) + 1) * self.block_size, len(self.order)) - 1
+        return np.asarray(self.columns[field][self.order[ends]])
+
+DEFAULT_PING_CACHE_BYTES = 64 << 20
+_EMPTY_PAYLOAD = np.zeros(0, dtype=np.uint8)
+_EMPTY_PAYLOAD.flags.writeable = False
+
+def _record_int(record, name: str) -> Optional[int]:
+    """Integer field of an RSDRecord, dict or pandas row (None/NaN -> None)"""
+    v = record.get(name) if isinstance(record, dict) else getattr(record, name, None)
+    if v is None or v != v:
+        return None
+    return int(v)
+
+def _max_scaled_row(raw: np.ndarray, width: int) -> np.ndarray:
+    """Preview normalisation: scale to the ping's own max, then resample to `width`"""
+    if raw.max() > 0:
+        data = (raw.astype(np.float32) * 255.0 / raw.max()).astype(np.uint8)
+    else:
+        data = raw.astype(np.uint8)
+    if len(data) != width:
+        x_old = np.linspace(0, 1, len(data))
+        x_new = np.linspace(0, 1, width)
+        data = np.interp(x_new, x_old, data).astype(np.uint8)
+    return data
+
+class ByteLRU:
+    """Thread-safe LRU of read-only NumPy arrays bounded by their total nbytes
+    (the newest entry is always kept, even when it alone exceeds the bound)"""
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = self.misses = 0
+        self._items: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def __contains__(self, key) -> bool:
+        return key in self._items
+    
+    def get(self, key) -> Optional[np.ndarray]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+            return value
+    
+    def put(self, key, value: np.ndarray) -> np.ndarray:
+        value.flags.writeable = False
+        with self._lock:
+            if key in self._items:
+                self.nbytes -= self._items.pop(key).nbytes
+            self._items[key] = value
+            self.nbytes += value.nbytes
+            while self.nbytes > self.max_bytes and len(self._items) > 1:
+                _, old = self._items.popitem(last=False)
+                self.nbytes -= old.nbytes
+        return value
+    
+    def get_or_build(self, key, build) -> Optional[np.ndarray]:
+        """Cached value for `key`, else `build()` stored (None results are not cached)"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = build()
+        if value is None:
+            return None
+        with self._lock:
+            self.misses += 1
+            if key in self._items:  # built concurrently: keep the first copy
+                return self._items[key]
+        return self.put(key, value)
+    
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+def load_image_cached(path: str, cache: ByteLRU) -> np.ndarray:
+    """Decoded image file as a read-only array, cached in `cache` under the path
+    and its mtime/size so a rewritten file is decoded again"""
+    st = os.stat(path)
+    key = ('image', os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    
+    def decode():
+        with Image.open(path) as im:
+            return np.array(im)
+    return cache.get_or_build(key, decode)
+
+class PingReader:
+    """Shared read access to the sonar payloads of one RSD file.
+    
+    One read-only mmap is opened lazily and kept for the reader's lifetime;
+    payload() returns zero-copy uint8 views into it. Decoded rows (preview
+    normalised, rendered, float intensity) go through an LRU bounded by
+    `cache_bytes`, so re-rendering a block or exporting after a preview
+    touches no file I/O. An attached PingStore (see ping_store) serves
+    read_block() as matrix slices and covers payloads when the RSD is gone.
+    Thread-safe; use shared_ping_reader() to get the per-file instance.
+    """
+    
+    def __init__(self, rsd_path: str, cache_bytes: int = DEFAULT_PING_CACHE_BYTES, store=None):
+        self.rsd_path = str(rsd_path)
+        self.cache_bytes = cache_bytes
+        self.store = store
+        self.stamp = None
+        self._mm = None
+        self._size = 0
+        self._cache = ByteLRU(cache_bytes)
+        self._lock = threading.RLock()
+    
+    def _map(self, end: int = 0) -> bool:
+        """Map the file (again, if it has grown past `end`). False when unavailable."""
+        if self._mm is not None and end <= self._size:
+            return True
+        try:
+            with open(self.rsd_path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                if st.st_size == 0 or (self._mm is not None and st.st_size <= self._size):
+                    return self._mm is not None
+                # the old map stays alive for as long as views into it exist
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._size = st.st_size
+                self.stamp = (st.st_size, st.st_mtime_ns)
+            return True
+        except (OSError, ValueError):
+            return False
+    
+    def payload_at(self, sonar_ofs: Optional[int], sonar_size: Optional[int]) -> np.ndarray:
+        """uint8 view of `sonar_size` bytes at `sonar_ofs` (shorter at end of file)"""
+        if not sonar_ofs or not sonar_size or sonar_ofs < 0:
+            return _EMPTY_PAYLOAD
+        with self._lock:
+            if not self._map(sonar_ofs + sonar_size):
+                return _EMPTY_PAYLOAD
+            n = min(sonar_size, self._size - sonar_ofs)
+            if n <= 0:
+                return _EMPTY_PAYLOAD
+            return np.frombuffer(self._mm, dtype=np.uint8, count=n, offset=sonar_ofs)
+    
+    def payload(self, record) -> np.ndarray:
+        """Sonar samples of an RSDRecord / dict / DataFrame row as a uint8 view"""
+        ofs, size = _record_int(record, 'sonar_ofs'), _record_int(record, 'sonar_size')
+        data = self.payload_at(ofs, size)
+        if not len(data) and self.store is not None and ofs and size:
+            ch = _record_int(record, 'channel_id')
+            if ch is not None and ch in self.store:
+                i = int(self.store.find(ch, ofs)[0])
+                if i >= 0:
+                    return self.store.ping(ch, i)
+        return data
+    
+    def read_block(self, records, width: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(len(records), width) zero-padded uint8 matrix and the per-ping lengths.
+        
+        Consecutive pings of one channel in the ping store come back as a
+        view of the store's matrix; otherwise rows are copied from the mmap.
+        """
+        if isinstance(records, RecordBlock):
+            ch, ofs, size = records.int_columns('channel_id', 'sonar_ofs', 'sonar_size')
+        else:
+            records = list(records)
+            ch, ofs, size = (np.array([_record_int(r, name) or 0 for r in records], dtype=np.int64)
+                             for name in ('channel_id', 'sonar_ofs', 'sonar_size'))
+        if self.store is not None and len(ofs):
+            hit = self._store_block(ch, ofs, width)
+            if hit is not None:
+                return hit
+        size[ofs <= 0] = 0
+        with self._lock:
+            mapped = self._map(int((ofs + size).max())) if len(ofs) else False
+            if mapped:
+                buf = np.frombuffer(self._mm, dtype=np.uint8)
+                lengths = np.clip(np.minimum(size, self._size - ofs), 0, None)
+        if not mapped:
+            rows = [self.payload(r) for r in records]
+            lengths = np.array([len(r) for r in rows], dtype=np.int64)
+        if width is None:
+            width = int(lengths.max()) if len(lengths) else 0
+        lengths = np.minimum(lengths, width)
+        out = np.zeros((len(ofs), width), dtype=np.uint8)
+        for i, (o, k) in enumerate(zip(ofs.tolist(), lengths.tolist())):
+            if k:
+                out[i, :k] = buf[o:o + k] if mapped else rows[i][:k]
+        return out, lengths.astype(np.int32)
+    
+    def _store_block(self, channels: np.ndarray, ofs: np.ndarray, width):
+        ch = int(channels[0])
+        if ch not in self.store or (channels != ch).any():
+            return None
+        rows = self.store.find(ch, np.where(ofs > 0, ofs, -1))
+        if (rows < 0).any():
+            return None
+        mat = self.store.matrix(ch)
+        if np.array_equal(rows, np.arange(rows[0], rows[0] + len(rows))):
+            block = mat[rows[0]:rows[0] + len(rows)]
+        else:
+            block = mat[rows]
+        lengths = self.store.lengths(ch)[rows].astype(np.int32)
+        if width is None:
+            width = mat.shape[1]
+        if width > block.shape[1]:
+            block = np.pad(block, ((0, 0), (0, width - block.shape[1])))
+        return block[:, :width], np.minimum(lengths, width)
+    
+    def cached(self, key: tuple, build) -> Optional[np.ndarray]:
+        """LRU lookup of a decoded row; `build()` computes it on a miss (None is not cached)"""
+        return self._cache.get_or_build(key, build)
+    
+    def _cached_payload_row(self, kind: str, record, width, build) -> Optional[np.ndarray]:
+        ofs, size = _record_int(record, 'sonar_ofs'), _record_int(record, 'sonar_size')
+        if not ofs or not size:
+            return None
+        def decode():
+            raw = self.payload(record)
+            return build(raw) if len(raw) else None
+        return self.cached((kind, ofs, size, width), decode)
+    
+    def normalized_row(self, record, width: int) -> Optional[np.ndarray]:
+        """Ping scaled to its own max and resampled to `width` (block preview rows)"""
+        return self._cached_payload_row('max', record, width, lambda raw: _max_scaled_row(raw, width))
+    
+    def render_row(self, record, width: int = 1024) -> Optional[np.ndarray]:
+        """render_sonar_row() of the ping as a 1-D row (aligned blocks, alignment)"""
+        return self._cached_payload_row('render', record, width, lambda raw: render_sonar_row(raw, width)[0])
+    
+    def intensity(self, record) -> Optional[np.ndarray]:
+        """Ping as float32 intensities in [0, 1] (target detection)"""
+        return self._cached_payload_row('f32', record, None,
+                                        lambda raw: raw.astype(np.float32) / 255.0)
+    
+    @property
+    def cached_bytes(self) -> int:
+        return self._cache.nbytes
+    
+    @property
+    def hits(self) -> int:
+        return self._cache.hits
+    
+    @property
+    def misses(self) -> int:
+        return self._cache.misses
+    
+    def clear_cache(self):
+        self._cache.clear()
+    
+    def reset(self):
+        """Drop the mapping and the row cache (the file was replaced)"""
+        with self._lock:
+            self.clear_cache()
+            self._mm = None
+            self._size = 0
+            self.stamp = None
+    
+    def close(self):
+        with self._lock:
+            mm, self._mm = self._mm, None
+            self._size = 0
+            self.clear_cache()
+            if mm is not None:
+                try:
+                    mm.close()
+                except BufferError:
+                    pass  # views still exported; freed with the last one
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+_SHARED_READERS: Dict[str, PingReader] = {}
+_SHARED_LOCK = threading.Lock()
+
+def shared_ping_reader(rsd_path: str, records_path: Optional[str] = None) -> PingReader:
+    """The process-wide PingReader for `rsd_path`, so BlockProcessor, TargetDetector
+    and the exporters share one mmap and one row cache. `records_path` (CSV or
+    columnar output) attaches its ping store when one was written."""
+    key = os.path.abspath(str(rsd_path))
+    with _SHARED_LOCK:
+        reader = _SHARED_READERS.get(key)
+        if reader is None:
+            reader = _SHARED_READERS[key] = PingReader(key)
+        elif reader.stamp is not None:
+            try:
+                st = os.stat(key)
+                if st.st_size < reader.stamp[0] or (st.st_size == reader.stamp[0] and st.st_mtime_ns != reader.stamp[1]):
+                    reader.reset()
+            except OSError:
+                pass
+    if records_path and reader.store is None:
+        try:
+            from ping_store import PingStore
+            reader.store = PingStore.open(records_path, key if os.path.exists(key) else None)
+        except Exception:
+            reader.store = None
+    return reader
+
+def extract_sonar_data(rsd_path: str, record: RSDRecord, reader: Optional[PingReader] = None) -> bytes:
     """Extract sonar data payload from RSD file"""
-    if not record.sonar_ofs or not record.sonar_size:
-        return b''
-    
-    try:
-        with open(rsd_path, 'rb') as f:
-            f.seek(record.sonar_ofs)
-            return f.read(record.sonar_size)
-    except Exception:
-        return b''
-
-def render_sonar_row(payload: bytes, width: int = 1024, intensity_scale: float = 1.0) -> np.ndarray:
-    """Render sonar payload as grayscale row with intensity scaling"""
-    if not payload:
+    return (reader or shared_ping_reader(rsd_path)).payload(record).tobytes()
+
+def render_sonar_row(payload, width: int = 1024, intensity_scale: float = 1.0) -> np.ndarray:
+    """Render sonar payload (bytes or uint8 array) as grayscale row with intensity scaling"""
+    if payload is None or len(payload) == 0:
         return np.zeros((1, width), dtype=np.uint8)
     
     # Convert bytes to intensity values
@@ -168,87 +517,152 @@ def render_sonar_row(payload: bytes, width: int = 1024, intensity_scale: float =
 
 def calculate_phase_correlation_shift(left_data: np.ndarray, right_data: np.ndarray, 
                                     max_shift: int = 50) -> int:
-    """Calculate horizontal shift using phase correlation for better alignment"""
+    """Calculate horizontal shift using phase correlation for better alignment
+    (first row of each input; see phase_align.row_shifts for whole blocks)"""
     if left_data.size == 0 or right_data.size == 0:
         return 0
-    
-    # Ensure same dimensions
-    min_width = min(left_data.shape[1], right_data.shape[1])
-    left_row = left_data[0, :min_width].astype(np.float32)
-    right_row = right_data[0, :min_width].astype(np.float32)
-    
-    # Apply window to reduce edge effects
-    window = np.hanning(min_width)
-    left_row *= window
-    right_row *= window
-    
-    # Cross-correlation via FFT
-    f_left = np.fft.fft(left_row)
-    f_right = np.fft.fft(right_row)
-    
-    # Phase correlation
-    cross_power = f_left * np.conj(f_right)
-    cross_power /= (np.abs(cross_power) + 1e-10)  # Normalize
-    
-    # Get correlation in spatial domain
-    correlation = np.fft.ifft(cross_power)
-    correlation = np.abs(correlation)
-    
-    # Find peak within allowed shift range
-    shift_range = min(max_shift, min_width // 4)
-    
-    # Check positive shifts (right channel moves right)
-    best_shift = 0
-    best_score = correlation[0]
-    
-    for shift in range(1, shift_range + 1):
-        if correlation[shift] > best_score:
-            best_score = correlation[shift]
-            best_shift = shift
-        
-        # Check negative shifts (right channel moves left)
-        neg_idx = min_width - shift
-        if correlation[neg_idx] > best_score:
-            best_score = correlation[neg_idx]
-            best_shift = -shift
-    
-    return int(best_shift)
+    from phase_align import row_shifts
+    return int(row_shifts(left_data[:1], right_data[:1], max_shift)[0])
 
 def auto_align_block_pair(rsd_path: str, left_block: List[RSDRecord], 
-                         right_block: List[RSDRecord]) -> Tuple[int, float]:
-    """Auto-align a pair of blocks and return optimal shift and confidence score"""
+                         right_block: List[RSDRecord],
+                         reader: Optional[PingReader] = None) -> Tuple[int, float]:
+    """Auto-align a pair of blocks and return optimal shift and confidence score
+    
+    The sampled rows are aligned in one batched FFT (phase_align.block_shift)
+    and the result is memoised in the reader's cache under the sampled pings'
+    offsets, so every user of the shared reader aligns a block pair once.
+    """
     if not left_block or not right_block:
         return 0, 0.0
+    reader = reader or shared_ping_reader(rsd_path)
     
     # Sample a few rows from middle of each block for alignment
     sample_size = min(5, len(left_block), len(right_block))
     mid_start = len(left_block) // 2 - sample_size // 2
     
-    left_samples = left_block[mid_start:mid_start + sample_size]
-    right_samples = right_block[mid_start:mid_start + sample_size]
+    left_samples = list(left_block[mid_start:mid_start + sample_size])
+    right_samples = list(right_block[mid_start:mid_start + sample_size])
+    key = ('align', tuple(_record_int(r, 'sonar_ofs') for r in left_samples),
+           tuple(_record_int(r, 'sonar_ofs') for r in right_samples))
     
-    shifts = []
+    def align():
+        rows = [(reader.render_row(l), reader.render_row(r)) for l, r in zip(left_samples, right_samples)]
+        rows = [(l, r) for l, r in rows if l is not None and r is not None]
+        if not rows:
+            return None
+        from phase_align import block_shift
+        shift, confidence = block_shift(np.stack([l for l, _ in rows]), np.stack([r for _, r in rows]))
+        return np.array([shift, confidence])
     
-    for left_rec, right_rec in zip(left_samples, right_samples):
-        left_payload = extract_sonar_data(rsd_path, left_rec)
-        right_payload = extract_sonar_data(rsd_path, right_rec)
-        
-        if left_payload and right_payload:
-            left_row = render_sonar_row(left_payload)
-            right_row = render_sonar_row(right_payload)
-            
-            shift = calculate_phase_correlation_shift(left_row, right_row)
-            shifts.append(shift)
-    
-    if not shifts:
+    result = reader.cached(key, align)
+    if result is None:
         return 0, 0.0
+    return int(result[0]), float(result[1])
+
+_RESAMPLE_MAPS: Dict[Tuple[int, int], Tuple[np.ndarray, ...]] = {}
+
+def _resample_map(src_len: int, width: int):
+    """Column map for np.interp(linspace(0,1,width), linspace(0,1,src_len), row)
+    applied to every row at once: left and right source column of each output
+    column and the float32 weight of the right one."""
+    key = (src_len, width)
+    m = _RESAMPLE_MAPS.get(key)
+    if m is None:
+        x_old = np.linspace(0, 1, src_len)
+        x_new = np.linspace(0, 1, width)
+        j = np.clip(np.searchsorted(x_old, x_new, side='right') - 1, 0, src_len - 2)
+        w = np.clip((x_new - x_old[j]) / (x_old[j + 1] - x_old[j]), 0.0, 1.0)
+        m = (j, j + 1, w.astype(np.float32))
+        if len(_RESAMPLE_MAPS) > 256:
+            _RESAMPLE_MAPS.clear()
+        _RESAMPLE_MAPS[key] = m
+    return m
+
+_RESAMPLE_CHUNK_BYTES = 512 << 10
+
+def _scaled(raw: np.ndarray, peak: np.ndarray) -> np.ndarray:
+    """raw * 255 / row peak in float32, truncated to whole grey levels (the
+    per-ping composer's gain step, bit for bit)"""
+    vals = raw.astype(np.float32)
+    vals *= 255.0
+    vals /= peak
+    return np.floor(vals, out=vals)
+
+def resample_block(matrix: np.ndarray, lengths: np.ndarray, width: int,
+                   out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Preview rows for a whole block: each ping scaled to its own max and
+    resampled to `width`, as the per-ping composer did (within one grey level).
     
-    # Calculate consensus shift and confidence
-    shifts = np.array(shifts)
-    median_shift = int(np.median(shifts))
-    confidence = 1.0 - (np.std(shifts) / (np.std(shifts) + 10.0))  # Normalize confidence
+    `matrix` is a zero-padded (pings, samples) uint8 block (PingReader.read_block
+    or a PingStore slice) and `lengths` the valid samples per row; rows with no
+    samples stay black. Rows are grouped by length and handled a few hundred
+    KB at a time: gather the two neighbouring source columns of every output
+    column, apply the per-row gain and interpolate, all in float32. `out`
+    may be any (pings, width) uint8 view, e.g. a reversed slice of the image.
+    """
+    lengths = np.asarray(lengths)
+    if out is None:
+        out = np.zeros((len(lengths), width), dtype=np.uint8)
+    else:
+        out[...] = 0
+    for n in np.unique(lengths):
+        n = int(n)
+        if n <= 0:
+            continue
+        if lengths[0] == n and (lengths == n).all():
+            step = max(16, _RESAMPLE_CHUNK_BYTES // n)
+            groups = [slice(a, a + step) for a in range(0, len(lengths), step)]
+        else:
+            groups = [np.nonzero(lengths == n)[0]]
+        for rows in groups:
+            raw = matrix[rows, :n]
+            peak = raw.max(axis=1)
+            peak = np.where(peak > 0, peak, 1).astype(np.float32)[:, None]
+            if n == width or n == 1:
+                out[rows] = _scaled(raw[:, :1] if n == 1 else raw, peak)
+            else:
+                left, right, w = _resample_map(n, width)
+                vals = _scaled(raw[:, left], peak)
+                vals += (_scaled(raw[:, right], peak) - vals) * w
+                out[rows] = vals
+    return out
+
+def compose_waterfall(left: Tuple[np.ndarray, np.ndarray], right: Tuple[np.ndarray, np.ndarray],
+                      preview_mode: str = "both", width: int = 512,
+                      flip_left: bool = False, flip_right: bool = False,
+                      remove_water_column: bool = False, water_column_pixels: int = 50,
+                      gap_width: int = 4) -> np.ndarray:
+    """[LEFT | GAP | RIGHT] waterfall from two (matrix, lengths) ping blocks.
+    
+    Gain, resampling, flips, water-column cropping and the centre gap are all
+    whole-array operations; the result is within one grey level of the
+    per-ping composer.
+    """
+    num_pings = min(len(left[1]), len(right[1]))
+    channel_width = width // 2
+    total_width = channel_width * 2 + gap_width
+    waterfall = np.zeros((num_pings, total_width), dtype=np.uint8)
     
-    return median_shift, confidence
+    # Resample straight into the image (flips are reversed output views)
+    left_out = waterfall[:, :channel_width]
+    right_out = waterfall[:, channel_width + gap_width:]
+    resample_block(left[0][:num_pings], left[1][:num_pings], channel_width,
+                   out=left_out[:, ::-1] if flip_left else left_out)
+    resample_block(right[0][:num_pings], right[1][:num_pings], channel_width,
+                   out=right_out[:, ::-1] if flip_right else right_out)
+    
+    # Water column sits on the boat side: right edge of the left channel,
+    # left edge of the right channel
+    if remove_water_column and 0 < water_column_pixels < channel_width:
+        waterfall[:, channel_width - water_column_pixels:channel_width] = 0
+        waterfall[:, channel_width + gap_width:channel_width + gap_width + water_column_pixels] = 0
+    
+    if preview_mode == "left":
+        return waterfall[:, :channel_width]
+    elif preview_mode == "right":
+        return waterfall[:, channel_width + gap_width:]
+    return waterfall
 
 def compose_channel_block_preview(rsd_path: str, left_block: List[RSDRecord], 
                                 right_block: List[RSDRecord], 
@@ -256,48 +670,18 @@ def compose_channel_block_preview(rsd_path: str, left_block: List[RSDRecord],
                                 width: int = 512, 
                                 flip_left: bool = False, flip_right: bool = False,
                                 remove_water_column: bool = False,
-                                water_column_pixels: int = 50) -> np.ndarray:
+                                water_column_pixels: int = 50,
+                                reader: Optional[PingReader] = None) -> np.ndarray:
     """Create proper sidescan preview with left and right channels stitched horizontally
     
     This creates a traditional sidescan sonar waterfall view where:
     - Each ping (row) shows: [LEFT CHANNEL | CENTER GAP | RIGHT CHANNEL]
     - Multiple pings are stacked vertically to show the sonar track over time
     - This produces the classic "waterfall" view with seafloor on both sides
-    """
     
-    def extract_channel_ping_data(record: RSDRecord, target_width: int, flip: bool) -> np.ndarray:
-        """Extract and process sonar data for a single ping from one channel"""
-        try:
-            sonar_data = extract_sonar_data(rsd_path, record)
-            
-            if sonar_data and len(sonar_data) > 0:
-                # Convert bytes to numpy array
-                raw_array = np.frombuffer(sonar_data, dtype=np.uint8)
-                
-                # Scale to 0-255 range 
-                if raw_array.max() > 0:
-                    intensity_data = (raw_array.astype(np.float32) * 255.0 / raw_array.max()).astype(np.uint8)
-                else:
-                    intensity_data = raw_array.astype(np.uint8)
-                
-                # Resize to target width if needed
-                if len(intensity_data) != target_width:
-                    x_old = np.linspace(0, 1, len(intensity_data))
-                    x_new = np.linspace(0, 1, target_width)
-                    intensity_data = np.interp(x_new, x_old, intensity_data).astype(np.uint8)
-                
-                # Apply flipping if requested
-                if flip:
-                    intensity_data = intensity_data[::-1]
-                
-                return intensity_data
-            else:
-                # No data - return zeros
-                return np.zeros(target_width, dtype=np.uint8)
-                
-        except Exception as e:
-            print(f"Error extracting ping data: {e}")
-            return np.zeros(target_width, dtype=np.uint8)
+    Both blocks are read in one call each and composed with compose_waterfall.
+    """
+    reader = reader or shared_ping_reader(rsd_path)
     
     # Determine how many pings we have
     num_pings = min(len(left_block), len(right_block)) if left_block and right_block else 0
@@ -307,68 +691,61 @@ def compose_channel_block_preview(rsd_path: str, left_block: List[RSDRecord],
     
     print(f"Creating sidescan waterfall: {num_pings} pings")
     
-    # For sidescan, each channel gets half the width
-    channel_width = width // 2
-    gap_width = 4  # Small gap between channels
+    waterfall = compose_waterfall(reader.read_block(left_block[:num_pings]),
+                                  reader.read_block(right_block[:num_pings]),
+                                  preview_mode=preview_mode, width=width,
+                                  flip_left=flip_left, flip_right=flip_right,
+                                  remove_water_column=remove_water_column,
+                                  water_column_pixels=water_column_pixels)
     
-    # Calculate final dimensions
+    print(f"Completed waterfall: {waterfall.shape}, range: {waterfall.min()}-{waterfall.max()}")
+    return waterfall
+
+def _compose_preview_per_ping(reader: PingReader, left_block: List[RSDRecord],
+                              right_block: List[RSDRecord], preview_mode: str = "both",
+                              width: int = 512, flip_left: bool = False, flip_right: bool = False,
+                              remove_water_column: bool = False,
+                              water_column_pixels: int = 50) -> np.ndarray:
+    """Original one-ping-at-a-time composer (reference for tests and benchmark_block_compose)"""
+    num_pings = min(len(left_block), len(right_block))
+    channel_width = width // 2
+    gap_width = 4
     total_width = channel_width * 2 + gap_width
-    waterfall_height = num_pings
-    
-    # Create the waterfall image
-    waterfall = np.zeros((waterfall_height, total_width), dtype=np.uint8)
+    waterfall = np.zeros((num_pings, total_width), dtype=np.uint8)
     
-    print(f"Waterfall dimensions: {waterfall_height} x {total_width}")
-    print(f"Channel width: {channel_width}, Gap: {gap_width}")
+    def ping_row(record, flip):
+        raw = reader.payload(record)
+        if not len(raw):
+            return np.zeros(channel_width, dtype=np.uint8)
+        data = _max_scaled_row(raw, channel_width)
+        return data[::-1] if flip else data
     
-    # Process each ping pair
     for ping_idx in range(num_pings):
-        if ping_idx < len(left_block) and ping_idx < len(right_block):
-            left_record = left_block[ping_idx]
-            right_record = right_block[ping_idx]
-            
-            # Extract data for each channel
-            left_data = extract_channel_ping_data(left_record, channel_width, flip_left)
-            right_data = extract_channel_ping_data(right_record, channel_width, flip_right)
-            
-            # Remove water column from left channel (crop from right side - boat side)
-            if remove_water_column and water_column_pixels > 0:
-                if len(left_data) > water_column_pixels:
-                    left_data = left_data[:-water_column_pixels]
-                    # Pad back to channel_width
-                    left_data = np.pad(left_data, (0, channel_width - len(left_data)), 'constant')
-            
-            # Remove water column from right channel (crop from left side - boat side)  
-            if remove_water_column and water_column_pixels > 0:
-                if len(right_data) > water_column_pixels:
-                    right_data = right_data[water_column_pixels:]
-                    # Pad back to channel_width
-                    right_data = np.pad(right_data, (channel_width - len(right_data), 0), 'constant')
-            
-            # Compose the ping row: [LEFT | GAP | RIGHT]
-            ping_row = np.zeros(total_width, dtype=np.uint8)
-            ping_row[0:channel_width] = left_data[:channel_width]  # Left channel
-            # Gap stays black (zeros)
-            ping_row[channel_width + gap_width:] = right_data[:channel_width]  # Right channel
-            
-            # Set this row in the waterfall
-            waterfall[ping_idx, :] = ping_row
+        left_data = ping_row(left_block[ping_idx], flip_left)
+        right_data = ping_row(right_block[ping_idx], flip_right)
+        if remove_water_column and water_column_pixels > 0:
+            if len(left_data) > water_column_pixels:
+                left_data = left_data[:-water_column_pixels]
+                left_data = np.pad(left_data, (0, channel_width - len(left_data)), 'constant')
+            if len(right_data) > water_column_pixels:
+                right_data = right_data[water_column_pixels:]
+                right_data = np.pad(right_data, (channel_width - len(right_data), 0), 'constant')
+        waterfall[ping_idx, :channel_width] = left_data[:channel_width]
+        waterfall[ping_idx, channel_width + gap_width:] = right_data[:channel_width]
     
-    print(f"Completed waterfall: {waterfall.shape}, range: {waterfall.min()}-{waterfall.max()}")
-    
-    # Handle different preview modes
     if preview_mode == "left":
         return waterfall[:, :channel_width]
-    elif preview_mode == "right": 
+    elif preview_mode == "right":
         return waterfall[:, channel_width + gap_width:]
-    else:  # "both" or any other mode
-        return waterfall
+    return waterfall
 
 def compose_aligned_block(rsd_path: str, left_block: List[RSDRecord], 
                          right_block: List[RSDRecord], shift: int = 0,
                          width: int = 1024, gap: int = 8,
-                         flip_left: bool = False, flip_right: bool = False) -> np.ndarray:
+                         flip_left: bool = False, flip_right: bool = False,
+                         reader: Optional[PingReader] = None) -> np.ndarray:
     """Compose aligned waterfall image from block pair"""
+    reader = reader or shared_ping_reader(rsd_path)
     max_rows = max(len(left_block), len(right_block))
     
     # Create output image
@@ -378,25 +755,25 @@ def compose_aligned_block(rsd_path: str, left_block: List[RSDRecord],
     for i in range(max_rows):
         # Process left channel
         if i < len(left_block):
-            left_payload = extract_sonar_data(rsd_path, left_block[i])
-            left_row = render_sonar_row(left_payload, width)
-            if flip_left:
-                left_row = np.fliplr(left_row)
-            output[i, :width] = left_row[0]
+            left_row = reader.render_row(left_block[i], width)
+            if left_row is not None:
+                output[i, :width] = left_row[::-1] if flip_left else left_row
         
         # Process right channel with shift
         right_idx = i + shift
         if 0 <= right_idx < len(right_block):
-            right_payload = extract_sonar_data(rsd_path, right_block[right_idx])
-            right_row = render_sonar_row(right_payload, width)
-            if flip_right:
-                right_row = np.fliplr(right_row)
-            output[i, width + gap:] = right_row[0]
+            right_row = reader.render_row(right_block[right_idx], width)
+            if right_row is not None:
+                output[i, width + gap:] = right_row[::-1] if flip_right else right_row
     
     return output
 
 def detect_transducer_config(records: List[RSDRecord]) -> Dict[str, Any]:
     """Detect transducer configuration from record patterns and metadata"""
+    channels = sorted({r.channel_id for r in records if r.channel_id is not None})
+    return _transducer_config(channels, [r.extras for r in records[:100]])
+
+def _transducer_config(channels: List[int], extras: List[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
     config = {
         'scan_type': 'unknown',
         'frequency_bands': [],
@@ -405,10 +782,6 @@ def detect_transducer_config(records: List[RSDRecord]) -> Dict[str, Any]:
         'transducer_serial': None
     }
     
-    # Analyze channel patterns
-    by_channel = split_by_channels(records)
-    channels = sorted(by_channel.keys())
-    
     # Detect scan type based on channel count and sample patterns
     if len(channels) == 2:
         config['scan_type'] = 'sidescan_dual'
@@ -423,9 +796,9 @@ def detect_transducer_config(records: List[RSDRecord]) -> Dict[str, Any]:
                 config['suggested_pairs'].append((channels[i], channels[i + 1]))
     
     # Extract transducer info from extras
-    for record in records[:100]:  # Check first 100 records
-        if record.extras:
-            for key, value in record.extras.items():
+    for record_extras in extras[:100]:  # Check first 100 records
+        if record_extras:
+            for key, value in record_extras.items():
                 if 'serial' in key.lower() and isinstance(value, str):
                     config['transducer_serial'] = value
                     break
@@ -434,26 +807,201 @@ def detect_transducer_config(records: List[RSDRecord]) -> Dict[str, Any]:
     
     return config
 
+def iter_source_batches(source, batch_size: int = 65536) -> Iterator[np.ndarray]:
+    """RECORD_DTYPE batches in file order from a records CSV, a columnar record
+    file, an .RSD (parsed on the fly) or an iterable of batches"""
+    if not isinstance(source, (str, Path)):
+        return iter(source)
+    if str(source).lower().endswith('.rsd'):
+        from engine_nextgen_syncfirst import parse_rsd_batches_nextgen
+        return parse_rsd_batches_nextgen(str(source), batch_size=batch_size)
+    from record_columns import iter_records
+    return iter_records(str(source), batch_size)
+
+def stream_block_pairs(source, left_channel: int, right_channel: int, block_size: int = 50,
+                       batch_size: int = 65536,
+                       max_lag_blocks: Optional[int] = 256) -> Iterator[Tuple[RecordBlock, RecordBlock]]:
+    """Yield (left block, right block) pairs while reading `source` once.
+    
+    Streaming counterpart of split_by_channels -> create_channel_blocks ->
+    pair_channel_blocks: records are taken in file order (the seq order of a
+    normal recording), only the not-yet-paired records of the two channels
+    are buffered, and a pair is yielded as soon as both sides hold
+    `block_size` pings; the tail pair follows the MIN_BLOCK_RECORDS rule.
+    Peak memory is one batch plus the buffers. If one channel runs more than
+    `max_lag_blocks` blocks ahead of the other (None: no limit), its oldest
+    unmatched blocks are dropped so the buffer cannot grow with the file.
+    """
+    from record_columns import RECORD_DTYPE
+    empty = np.zeros(0, dtype=RECORD_DTYPE)
+    left, right = empty, empty
+    dropped = 0
+    
+    def block(buf, n):
+        return RecordBlock(buf, np.arange(min(n, len(buf))))
+    
+    for batch in iter_source_batches(source, batch_size):
+        ch = batch['channel_id']
+        left = np.concatenate([left, batch[ch == left_channel]])
+        right = np.concatenate([right, batch[ch == right_channel]])
+        pairs = min(len(left), len(right)) // block_size
+        for k in range(pairs):
+            yield (block(left[k * block_size:], block_size),
+                   block(right[k * block_size:], block_size))
+        used = pairs * block_size
+        left, right = left[used:].copy(), right[used:].copy()
+        if max_lag_blocks is not None:
+            limit = max_lag_blocks * block_size
+            for side in ('left', 'right'):
+                buf = left if side == 'left' else right
+                if len(buf) > limit:
+                    extra = (len(buf) - limit + block_size - 1) // block_size * block_size
+                    dropped += extra // block_size
+                    if side == 'left':
+                        left = left[extra:].copy()
+                    else:
+                        right = right[extra:].copy()
+    
+    if dropped:
+        print(f"Dropped {dropped} unmatched blocks (one channel ran more than {max_lag_blocks} blocks ahead)")
+    if len(left) >= MIN_BLOCK_RECORDS and len(right) >= MIN_BLOCK_RECORDS:
+        yield block(left, block_size), block(right, block_size)
+
+def stream_block_previews(rsd_path: str, source, left_channel: int, right_channel: int,
+                          block_size: int = 50, reader: Optional[PingReader] = None,
+                          **preview_kwargs) -> Iterator[Tuple[int, np.ndarray]]:
+    """(block index, compose_channel_block_preview image) for each streamed pair"""
+    reader = reader or shared_ping_reader(rsd_path)
+    pairs = stream_block_pairs(source, left_channel, right_channel, block_size)
+    for i, (left_block, right_block) in enumerate(pairs):
+        yield i, compose_channel_block_preview(rsd_path, left_block, right_block,
+                                               reader=reader, **preview_kwargs)
+
+DEFAULT_BLOCK_CACHE_BYTES = 128 << 20
+
 class BlockProcessor:
-    """Main class for block-based channel processing"""
+    """Main class for block-based channel processing
+    
+    Only the typed record columns are loaded up front; each channel's seq
+    order and its blocks (RecordBlock row ranges) are built on first use.
+    Rendered block images are kept in an LRU of `cache_bytes` keyed by every
+    render setting, so colormap changes and revisits do not re-read pings.
+    """
     
-    def __init__(self, csv_path: str, rsd_path: str, block_size: int = 50):
-        self.csv_path = Path(csv_path)
+    def __init__(self, csv_path, rsd_path: str, block_size: int = 50,
+                 reader: Optional[PingReader] = None,
+                 cache_bytes: int = DEFAULT_BLOCK_CACHE_BYTES):
+        """csv_path: records CSV, columnar record file, or a RECORD_DTYPE array"""
+        from record_columns import load_records, read_extras, INT_NULL
         self.rsd_path = Path(rsd_path)
         self.block_size = block_size
-        self.records = read_records_from_csv(str(csv_path))
-        self.by_channel = split_by_channels(self.records)
-        self.config = detect_transducer_config(self.records)
+        if isinstance(csv_path, np.ndarray):
+            self.csv_path = None
+            self.columns = csv_path
+        else:
+            self.csv_path = Path(csv_path)
+            self.columns = load_records(str(csv_path))
+        self.reader = reader or shared_ping_reader(str(rsd_path), self.csv_path and str(self.csv_path))
+        ch = self.columns['channel_id']
+        self._channels = [int(c) for c in np.unique(ch[ch != INT_NULL])]
+        self._order: Dict[int, np.ndarray] = {}
+        self._blocks: Dict[int, ChannelBlocks] = {}
+        self._alignments: Dict[tuple, Tuple[int, float]] = {}
+        self._records = None
+        self._by_channel: Optional[Dict[int, List[RSDRecord]]] = None
+        self.image_cache = ByteLRU(cache_bytes)
+        extras = read_extras(str(self.csv_path), limit=100) if self.csv_path is not None else []
+        self.config = _transducer_config(self._channels, extras)  # transducer serial lookup
+    
+    def __len__(self) -> int:
+        return len(self.columns)
+    
+    @property
+    def records(self) -> List[RSDRecord]:
+        """Every record as an RSDRecord (built on first access)"""
+        if self._records is None:
+            self._records = records_from_array(self.columns)
+        return self._records
+    
+    @property
+    def by_channel(self) -> Dict[int, List[RSDRecord]]:
+        """split_by_channels() equivalent (built on first access, sharing the
+        RSDRecord objects of `records`)"""
+        if self._by_channel is None:
+            records = self.records
+            self._by_channel = {ch: [records[i] for i in self.channel_rows(ch).tolist()] for ch in self._channels}
+        return self._by_channel
+    
+    def channel_rows(self, channel_id: int) -> np.ndarray:
+        """Row numbers of `channel_id`'s records in seq order (stable, like split_by_channels)"""
+        if channel_id not in self._order:
+            rows = np.nonzero(self.columns['channel_id'] == channel_id)[0]
+            self._order[channel_id] = rows[np.argsort(self.columns['seq'][rows], kind='stable')]
+        return self._order[channel_id]
     
     def get_available_channels(self) -> List[int]:
         """Get list of available channel IDs"""
-        return sorted(self.by_channel.keys())
+        return list(self._channels)
+    
+    def get_channel_blocks(self, channel_id: int) -> ChannelBlocks:
+        """Get blocks for specific channel (lazy; see ChannelBlocks)"""
+        if channel_id not in self._blocks:
+            rows = self.channel_rows(channel_id) if channel_id in self._channels else np.zeros(0, dtype=np.int64)
+            self._blocks[channel_id] = ChannelBlocks(self.columns, rows, self.block_size)
+        return self._blocks[channel_id]
+    
+    def num_block_pairs(self, left_channel: int, right_channel: int) -> int:
+        """Number of index-paired blocks (as pair_channel_blocks pairs them)"""
+        return min(len(self.get_channel_blocks(left_channel)), len(self.get_channel_blocks(right_channel)))
+    
+    def render_block(self, left_channel: int, right_channel: int, block_index: int,
+                     preview_mode: str = "both", width: int = 512,
+                     flip_left: bool = False, flip_right: bool = False,
+                     remove_water_column: bool = False,
+                     water_column_pixels: int = 50) -> np.ndarray:
+        """Grayscale compose_channel_block_preview() of one block pair, cached.
+        
+        The image is read-only and shared by later calls with the same
+        settings; apply colormaps to a copy (or via a lookup table)."""
+        key = self.preview_key(left_channel, right_channel, block_index, preview_mode, width,
+                               flip_left, flip_right, remove_water_column, water_column_pixels)
+        image = self.image_cache.get(key)
+        if image is None:
+            left_block = self.get_channel_blocks(left_channel)[block_index]
+            right_block = self.get_channel_blocks(right_channel)[block_index]
+            image = self.image_cache.put(key, compose_channel_block_preview(
+                str(self.rsd_path), left_block, right_block, preview_mode=preview_mode,
+                width=width, flip_left=flip_left, flip_right=flip_right,
+                remove_water_column=remove_water_column,
+                water_column_pixels=water_column_pixels, reader=self.reader))
+        return image
+    
+    @staticmethod
+    def preview_key(left_channel: int, right_channel: int, block_index: int,
+                    preview_mode: str = "both", width: int = 512,
+                    flip_left: bool = False, flip_right: bool = False,
+                    remove_water_column: bool = False, water_column_pixels: int = 50) -> tuple:
+        """image_cache key of a render_block() result"""
+        return ('preview', left_channel, right_channel, block_index, preview_mode,
+                bool(flip_left), bool(flip_right),
+                water_column_pixels if remove_water_column else 0, width)
+    
+    def is_rendered(self, left_channel: int, right_channel: int, block_index: int, **settings) -> bool:
+        return self.preview_key(left_channel, right_channel, block_index, **settings) in self.image_cache
     
-    def get_channel_blocks(self, channel_id: int) -> List[List[RSDRecord]]:
-        """Get blocks for specific channel"""
-        if channel_id not in self.by_channel:
-            return []
-        return create_channel_blocks(self.by_channel[channel_id], self.block_size)
+    def block_alignment(self, left_channel: int, right_channel: int, block_index: int) -> Tuple[int, float]:
+        """auto_align_block_pair() result for one block pair (memoised)"""
+        key = (left_channel, right_channel, block_index)
+        if key not in self._alignments:
+            self._alignments[key] = auto_align_block_pair(
+                str(self.rsd_path), self.get_channel_blocks(left_channel)[block_index],
+                self.get_channel_blocks(right_channel)[block_index], reader=self.reader)
+        return self._alignments[key]
+    
+    def clear_cache(self):
+        """Drop rendered images and alignments (the reader's row cache is kept)"""
+        self.image_cache.clear()
+        self._alignments.clear()
     
     def process_channel_pair(self, left_channel: int, right_channel: int,
                            auto_align: bool = True, manual_shift: int = 0,
@@ -462,9 +1010,8 @@ class BlockProcessor:
         left_blocks = self.get_channel_blocks(left_channel)
         right_blocks = self.get_channel_blocks(right_channel)
         
-        paired_blocks = pair_channel_blocks(left_blocks, right_blocks)
-        
-        for block_idx, (left_block, right_block) in enumerate(paired_blocks):
+        for block_idx in range(self.num_block_pairs(left_channel, right_channel)):
+            left_block, right_block = left_blocks[block_idx], right_blocks[block_idx]
             result = {
                 'block_index': block_idx,
                 'left_channel': left_channel,
@@ -478,15 +1025,18 @@ class BlockProcessor:
             
             # Auto-align if requested
             if auto_align:
-                auto_shift, confidence = auto_align_block_pair(
-                    str(self.rsd_path), left_block, right_block)
+                auto_shift, confidence = self.block_alignment(left_channel, right_channel, block_idx)
                 result['shift'] = auto_shift + manual_shift
                 result['confidence'] = confidence
             
             # Compose aligned image
-            result['image'] = compose_aligned_block(
-                str(self.rsd_path), left_block, right_block, 
-                result['shift'], flip_left=flip_left, flip_right=flip_right)
+            key = ('aligned', left_channel, right_channel, block_idx, result['shift'], flip_left, flip_right)
+            result['image'] = self.image_cache.get(key)
+            if result['image'] is None:
+                result['image'] = self.image_cache.put(key, compose_aligned_block(
+                    str(self.rsd_path), left_block, right_block, 
+                    result['shift'], flip_left=flip_left, flip_right=flip_right,
+                    reader=self.reader))
             
             yield result
     
@@ -517,14 +1067,144 @@ class BlockProcessor:
         
         return exported_files
 
+class BlockPrefetcher:
+    """Renders the blocks around the one on screen on a background thread.
+    
+    prefetch() queues block_index+1, block_index-1, +2, -2 ... up to `radius`
+    at the given render settings; a newer prefetch() (navigation or a
+    settings change) or cancel() abandons the remaining stale work. get()
+    returns a block from BlockProcessor's image cache when it is already
+    rendered (a hit), waits for it when the prefetch thread is rendering it
+    (also a hit) and renders it in the caller's thread otherwise (a miss).
+    Each block is rendered by at most one thread at a time.
+    """
+    
+    def __init__(self, processor: BlockProcessor, radius: int = 3):
+        self.processor = processor
+        self.radius = radius
+        self.hits = self.misses = 0
+        self.rendered = 0
+        self._generation = 0
+        self._job = None
+        self._busy = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = None
+        self._inflight: Dict[tuple, threading.Event] = {}
+    
+    def get(self, left_channel: int, right_channel: int, block_index: int, **settings) -> np.ndarray:
+        """Rendered block (see BlockProcessor.render_block for `settings`)"""
+        rendered = self.processor.is_rendered(left_channel, right_channel, block_index, **settings)
+        image, owner = self._render(left_channel, right_channel, block_index, settings, wait=True)
+        with self._cond:
+            if rendered or not owner:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return image
+    
+    def prefetch(self, left_channel: int, right_channel: int, block_index: int, **settings):
+        """Replace any pending work with the neighbours of `block_index`"""
+        with self._cond:
+            if self._closed:
+                return
+            self._generation += 1
+            self._job = (self._generation, left_channel, right_channel, block_index, settings)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='block-prefetch', daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+    
+    def cancel(self):
+        """Drop queued and in-progress prefetch work"""
+        with self._cond:
+            self._generation += 1
+            self._job = None
+            self._cond.notify_all()
+    
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._generation += 1
+            self._job = None
+            self._cond.notify_all()
+    
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'prefetched': self.rendered}
+    
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until no prefetch work is pending (tests, benchmarks)"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._job is None and not self._busy, timeout)
+    
+    def _render(self, left: int, right: int, index: int, settings: Dict[str, Any],
+                wait: bool) -> Tuple[Optional[np.ndarray], bool]:
+        """(image, rendered here) for one block, claiming it in `_inflight`
+        first; when another thread already holds the claim, wait for it and
+        take its image from the cache (wait=True) or return (None, False)"""
+        key = self.processor.preview_key(left, right, index, **settings)
+        with self._cond:
+            done = self._inflight.get(key)
+            if done is None:
+                done = self._inflight[key] = threading.Event()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            if not wait:
+                return None, False
+            done.wait()
+            # a cache hit, unless the other render failed or was already evicted
+            return self.processor.render_block(left, right, index, **settings), False
+        try:
+            return self.processor.render_block(left, right, index, **settings), True
+        finally:
+            with self._cond:
+                del self._inflight[key]
+            done.set()
+    
+    def _neighbours(self, block_index: int, count: int) -> List[int]:
+        order = []
+        for d in range(1, self.radius + 1):
+            order += [i for i in (block_index + d, block_index - d) if 0 <= i < count]
+        return order
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._job is not None or self._closed)
+                if self._closed:
+                    return
+                generation, left, right, index, settings = self._job
+                self._job = None
+                self._busy = True
+            try:
+                count = self.processor.num_block_pairs(left, right)
+                for i in self._neighbours(index, count):
+                    if generation != self._generation:
+                        break
+                    if self.processor.is_rendered(left, right, i, **settings):
+                        continue
+                    try:
+                        if self._render(left, right, i, settings, wait=False)[1]:
+                            self.rendered += 1
+                    except Exception as e:
+                        print(f"Prefetch of block {i} failed: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
 # Utility functions for GUI integration
 def get_suggested_channel_pairs(csv_path: str) -> List[Tuple[int, int]]:
     """Get suggested channel pairs for processing"""
-    records = read_records_from_csv(csv_path)
-    config = detect_transducer_config(records)
+    config = get_transducer_info(csv_path)
     return config.get('suggested_pairs', [])
 
 def get_transducer_info(csv_path: str) -> Dict[str, Any]:
-    """Get transducer configuration information"""
-    records = read_records_from_csv(csv_path)
-    return detect_transducer_config(records)
\ No newline at end of file
+    """Get transducer configuration information (from the typed columns,
+    without building per-record objects)"""
+    from record_columns import load_records, read_extras, INT_NULL
+    ch = load_records(csv_path)['channel_id']
+    channels = [int(c) for c in np.unique(ch[ch != INT_NULL])]
+    return _transducer_config(channels, read_extras(csv_path, limit=100))
\ No newline at end of file
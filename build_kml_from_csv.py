@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 from pathlib import Path
-import argparse, csv
+import argparse
+import numpy as np
+from record_columns import load_records
 
 def main():
     ap = argparse.ArgumentParser()
@@ -10,21 +12,11 @@ def main():
     ap.add_argument("--seq-end", type=int, default=None)
     a = ap.parse_args()
     
-    pts = []
-    with Path(a.csv).open("r", encoding="utf-8", newline="") as fp:
-        r = csv.DictReader(fp)
-        for row in r:
-            try:
-                s = int(float(row.get("seq") or 0))
-                if a.seq_start is not None and s < a.seq_start: continue
-                if a.seq_end is not None and s > a.seq_end: continue
-                
-                lat = float(row.get("lat")) if row.get("lat") else None
-                lon = float(row.get("lon")) if row.get("lon") else None
-                if lat is None or lon is None: continue
-                pts.append((lon, lat))
-            except Exception:
-                pass
+    arr = load_records(a.csv)
+    keep = ~(np.isnan(arr["lat"]) | np.isnan(arr["lon"]))
+    if a.seq_start is not None: keep &= arr["seq"] >= a.seq_start
+    if a.seq_end is not None: keep &= arr["seq"] <= a.seq_end
+    pts = list(zip(arr["lon"][keep].tolist(), arr["lat"][keep].tolist()))
     
     if not pts:
         raise SystemExit("No lat/lon points.")
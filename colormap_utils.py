@@ -3,6 +3,7 @@ Colormap utilities for sonar data visualization
 """
 import numpy as np
 from PIL import Image
+import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.cm as cm
 
@@ -27,45 +28,141 @@ def apply_colormap(gray_image, colormap_name='viridis', enhance_contrast=True):
     Returns:
         PIL Image in RGB mode with colormap applied
     """
-    # Convert to numpy array if needed
-    if isinstance(gray_image, Image.Image):
-        img_array = np.array(gray_image)
-    else:
-        img_array = gray_image.copy()
+    # Convert to numpy array if needed (read-only view, nothing is modified in place)
+    img_array = np.asarray(gray_image)
     
     # Ensure it's 2D
     if len(img_array.shape) == 3:
         img_array = img_array[:, :, 0]  # Take first channel
     
-    # Enhance contrast if requested
-    if enhance_contrast:
-        # Stretch histogram to full range
-        img_min, img_max = img_array.min(), img_array.max()
-        if img_max > img_min:
-            img_array = ((img_array - img_min) / (img_max - img_min) * 255).astype(np.uint8)
-    
-    # Normalize to 0-1 range for colormap
-    normalized = img_array.astype(np.float32) / 255.0
-    
-    # Apply colormap
     try:
-        cmap = cm.get_cmap(colormap_name)
-        colored = cmap(normalized)
-        
-        # Convert to RGB (remove alpha channel if present)
-        if colored.shape[-1] == 4:
-            colored = colored[:, :, :3]
-        
-        # Convert back to 0-255 range
-        colored_uint8 = (colored * 255).astype(np.uint8)
-        
-        # Convert to PIL Image
-        return Image.fromarray(colored_uint8, mode='RGB')
+        colored = colorize(img_array, colormap_name, contrast='auto' if enhance_contrast else None)
+        return Image.fromarray(colored, mode='RGB')
         
     except Exception as e:
         print(f"Warning: Failed to apply colormap '{colormap_name}': {e}")
         # Fallback to grayscale
-        return Image.fromarray(img_array, mode='L').convert('RGB')
+        return Image.fromarray(to_uint8(img_array), mode='L').convert('RGB')
+
+# Stop-based palettes of the studio preview/tile/video exporters (position, hex colour)
+STUDIO_COLORMAPS = {
+    "grayscale": [(0, "#000000"), (255, "#ffffff")],
+    "amber": [(0, "#000000"), (40, "#2b1b00"), (96, "#7a3e00"), (180, "#f6a400"), (255, "#fff5cc")],
+    "copper": [(0, "#000000"), (48, "#1a0e06"), (110, "#5a2e15"), (190, "#b36b2c"), (255, "#ffd29c")],
+    "blue": [(0, "#000000"), (64, "#001a33"), (140, "#004c99"), (210, "#33aaff"), (255, "#d6f0ff")],
+    "ice": [(0, "#000000"), (64, "#001a33"), (170, "#66b2ff"), (255, "#ffffff")],
+    "purple": [(0, "#000000"), (64, "#1a0033"), (150, "#5a00a3"), (210, "#c084ff"), (255, "#ffe6ff")],
+    "fire": [(0, "#000000"), (50, "#330000"), (120, "#990000"), (200, "#ff6600"), (255, "#ffff66")],
+    "viridis": [(0, "#440154"), (80, "#3b528b"), (140, "#21918c"), (200, "#5ec962"), (255, "#fde725")],
+    "magma": [(0, "#000004"), (90, "#3b0f70"), (150, "#8c2981"), (200, "#de4968"), (235, "#fca636"), (255, "#fcfdbf")],
+    "inferno": [(0, "#000004"), (70, "#1f0c48"), (135, "#5c1e76"), (190, "#b63679"), (225, "#ee7b51"), (255, "#f6d746")],
+    "bathymetry": [(0, "#000033"), (64, "#000099"), (128, "#0066cc"), (192, "#00ffff"), (255, "#ffffff")],
+    "depth": [(0, "#08306b"), (85, "#08519c"), (170, "#2171b5"), (255, "#4292c6")],
+}
+
+_LUTS = {}
+
+def _hex2rgb(h):
+    h = h.lstrip("#")
+    return int(h[0:2], 16), int(h[2:4], 16), int(h[4:6], 16)
+
+def lut_from_stops(stops):
+    """(256, 3) uint8 table interpolated linearly between (position, '#rrggbb') stops"""
+    lut = np.zeros((256, 3), np.uint8)
+    for (p0, c0), (p1, c1) in zip(stops[:-1], stops[1:]):
+        r0, g0, b0 = _hex2rgb(c0)
+        r1, g1, b1 = _hex2rgb(c1)
+        span = max(1, p1 - p0)
+        t = np.linspace(0, 1, span, endpoint=False, dtype=np.float32)
+        lut[p0:p1, 0] = (r0 + (r1 - r0) * t).astype(np.uint8)
+        lut[p0:p1, 1] = (g0 + (g1 - g0) * t).astype(np.uint8)
+        lut[p0:p1, 2] = (b0 + (b1 - b0) * t).astype(np.uint8)
+    p, c = stops[-1]
+    lut[p:] = np.array(_hex2rgb(c), np.uint8)
+    return lut
+
+def _get_cmap(colormap_name):
+    """Matplotlib colormap by name (matplotlib.colormaps, or cm.get_cmap on old releases)"""
+    registry = getattr(matplotlib, 'colormaps', None)
+    if registry is not None:
+        return registry[colormap_name]
+    return cm.get_cmap(colormap_name)
+
+def _build_lut(colormap_name, studio):
+    if studio:
+        return lut_from_stops(STUDIO_COLORMAPS[colormap_name])
+    try:
+        cmap = _get_cmap(colormap_name)
+    except (KeyError, ValueError):
+        if colormap_name.lower() not in STUDIO_COLORMAPS:
+            raise
+        return lut_from_stops(STUDIO_COLORMAPS[colormap_name.lower()])
+    levels = np.arange(256, dtype=np.float32) / 255.0
+    return (cmap(levels)[:, :3] * 255).astype(np.uint8)
+
+def stretch_index(lo, hi):
+    """uint8 table mapping grey levels lo..hi onto 0..255 (integer min/max contrast stretch)"""
+    lo, hi = int(lo), int(hi)
+    levels = np.arange(256, dtype=np.int32)
+    if hi <= lo:
+        return levels.astype(np.uint8)
+    return (np.clip(levels - lo, 0, hi - lo) * 255 // (hi - lo)).astype(np.uint8)
+
+def colormap_lut(colormap_name, contrast=None, studio=False):
+    """
+    (256, 3) uint8 RGB lookup table for a colormap, so one gather colours a
+    whole uint8 image (same values as apply_colormap without contrast stretch).
+
+    Matplotlib names are used first and STUDIO_COLORMAPS cover the rest;
+    studio=True picks the studio palettes (grayscale for unknown names), as the
+    preview, tile and video exporters always have. contrast=(lo, hi) folds a
+    min/max stretch into the table. Base tables are cached read-only by name.
+    Raises KeyError/ValueError for unknown names when studio is False.
+    """
+    if studio:
+        colormap_name = colormap_name.lower()
+        if colormap_name not in STUDIO_COLORMAPS:
+            colormap_name = "grayscale"
+    key = (colormap_name, bool(studio))
+    lut = _LUTS.get(key)
+    if lut is None:
+        lut = _build_lut(colormap_name, studio)
+        lut.flags.writeable = False
+        _LUTS[key] = lut
+    if contrast is not None:
+        return lut[stretch_index(*contrast)]
+    return lut
+
+def to_uint8(data):
+    """Scale a non-uint8 array onto 0..255 by its finite min/max (uint8 passes through)"""
+    if data.dtype == np.uint8:
+        return data
+    f = data.astype(np.float32)
+    mn, mx = np.nanmin(f), np.nanmax(f)
+    if not np.isfinite(mn) or not np.isfinite(mx) or mx <= mn:
+        f = np.clip(f, 0, 1)
+    else:
+        f = np.clip((f - mn) / (mx - mn), 0, 1)
+    return (f * 255 + 0.5).astype(np.uint8)
+
+def apply_lut(gray, lut, out=None):
+    """
+    Colour a 2-D grey image with a (256, 3) table in a single np.take. Writes
+    into `out` ((h, w, 3) uint8) when given; non-uint8 input goes through
+    to_uint8 first.
+    """
+    return np.take(lut, to_uint8(gray), axis=0, out=out, mode='clip')
+
+def colorize(gray, colormap_name='viridis', out=None, contrast=None, studio=False):
+    """
+    uint8 grey array -> (h, w, 3) uint8 RGB array through colormap_lut().
+    contrast='auto' stretches the image's own min/max through the table,
+    (lo, hi) a fixed range; no float intermediate for uint8 input.
+    """
+    gray = to_uint8(gray)
+    if isinstance(contrast, str):
+        contrast = (gray.min(), gray.max()) if gray.size else None
+    return apply_lut(gray, colormap_lut(colormap_name, contrast, studio), out)
 
 def create_colormap_preview(width=256, height=32, colormap_name='viridis'):
     """Create a preview strip of the colormap"""
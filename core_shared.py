@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 # core_shared.py — shared helpers (varstruct, CRC, magic scan, progress)
 
-import struct
+import struct, threading, zlib
+from contextlib import contextmanager
 
 MAGIC_REC_HDR = 0x86DAE9B7  # header magic (BE) - changed to big-endian
 MAGIC_REC_TRL = 0x7C4B26D9  # trailer magic (BE) - changed to big-endian
@@ -10,12 +11,23 @@ _progress_hook = None
 def set_progress_hook(fn):  # fn(percent_float, message)
     global _progress_hook; _progress_hook = fn
 
+@contextmanager
+def progress_hook(fn):
+    """Install fn as the progress hook for the block and restore the previous
+    one afterwards (fn None leaves the current hook in place)."""
+    global _progress_hook
+    prev = _progress_hook
+    if fn: _progress_hook = fn
+    try: yield
+    finally: _progress_hook = prev
+
 def _emit(pct, msg):
     if _progress_hook:
         try: _progress_hook(float(pct), str(msg))
         except Exception: pass
 
 def _crc32_custom(data: bytes) -> int:
+    """Bit-by-bit reference CRC. Kept for verification; parsers use _crc32_fast."""
     poly=0x04C11DB7; crc=0
     for b in data:
         crc ^= (int(b)<<24) & 0xFFFFFFFF
@@ -28,6 +40,101 @@ def _crc32_custom(data: bytes) -> int:
         rev=(rev<<1)|(tmp&1); tmp>>=1
     return (rev ^ 0xFFFFFFFF) & 0xFFFFFFFF
 
+# --- table-driven CRC ---------------------------------------------------------
+# The firmware CRC runs poly 0x04C11DB7 MSB-first from a zero register, then
+# bit-reverses and inverts the result. That equals the reflected CRC-32
+# (0xEDB88320, zero init, final xor) over bit-reversed input bytes, so the usual
+# reflected tables apply -- and zlib.crc32 with init 0xFFFFFFFF is the same loop in C.
+_REV8 = bytes(int('{:08b}'.format(i)[::-1], 2) for i in range(256))
+
+def _mk_crc_tables(n=4):
+    t0=[]
+    for i in range(256):
+        c=i
+        for _ in range(8): c=(c>>1)^0xEDB88320 if c&1 else c>>1
+        t0.append(c)
+    tables=[t0]
+    for _ in range(1,n):
+        prev=tables[-1]
+        tables.append([(prev[i]>>8)^t0[prev[i]&0xFF] for i in range(256)])
+    return tables
+
+_CRC_TABLES = _mk_crc_tables(4)  # slicing-by-4
+
+def _crc32_table(data) -> int:
+    """Pure-Python slicing-by-4 CRC (same result as _crc32_custom)."""
+    d=bytes(data).translate(_REV8); t0,t1,t2,t3=_CRC_TABLES
+    crc=0; n=len(d); i=0; n4=n-(n&3)
+    while i<n4:
+        crc^=d[i]|(d[i+1]<<8)|(d[i+2]<<16)|(d[i+3]<<24)
+        crc=t3[crc&0xFF]^t2[(crc>>8)&0xFF]^t1[(crc>>16)&0xFF]^t0[crc>>24]
+        i+=4
+    while i<n:
+        crc=(crc>>8)^t0[(crc^d[i])&0xFF]; i+=1
+    return crc ^ 0xFFFFFFFF
+
+def _crc32_fast(data) -> int:
+    """zlib-backed CRC (same result as _crc32_custom)."""
+    return zlib.crc32(bytes(data).translate(_REV8), 0xFFFFFFFF)
+
+_CRC_COPY_MAX = 16 * 1024  # below this a translated temporary is cheaper than the NumPy passes
+_CRC_CHUNK = 64 * 1024
+_crc_scratch = threading.local()
+_BIT_SWAPS = ((4, 0x0F0F0F0F0F0F0F0F), (2, 0x3333333333333333), (1, 0x5555555555555555))
+
+def _crc32_view(buf, start, end) -> int:
+    """_crc32_fast(buf[start:end]) without copying the block out of `buf`
+    (an mmap, bytes or bytearray). Larger blocks are copied a chunk at a time
+    into a per-thread scratch buffer, bit-reversed there with in-place
+    shifts/masks on 64-bit words and fed to zlib from there."""
+    n = end - start
+    if n <= _CRC_COPY_MAX:
+        return zlib.crc32(bytes(buf[start:end]).translate(_REV8), 0xFFFFFFFF)
+    import numpy as np
+    sc = getattr(_crc_scratch, 'words', None)
+    if sc is None:
+        sc = _crc_scratch.words = (np.zeros(_CRC_CHUNK // 8, np.uint64), np.empty(_CRC_CHUNK // 8, np.uint64),
+                                   tuple((s, np.uint64(m), np.uint64(m << s)) for s, m in _BIT_SWAPS))
+    words, tmp, swaps = sc
+    data = words.view(np.uint8)
+    src = np.frombuffer(buf, dtype=np.uint8, count=n, offset=start)
+    crc = 0xFFFFFFFF
+    for o in range(0, n, _CRC_CHUNK):
+        k = min(_CRC_CHUNK, n - o); nw = (k + 7) // 8
+        data[:k] = src[o:o+k]
+        w = words[:nw]; t = tmp[:nw]
+        for shift, lo, hi in swaps:  # swap nibbles, then bit pairs, then bits
+            np.right_shift(w, shift, out=t); np.bitwise_and(t, lo, out=t)
+            np.bitwise_and(w, lo, out=w); np.left_shift(w, shift, out=w)
+            np.bitwise_or(w, t, out=w)
+        crc = zlib.crc32(data[:k], crc)
+    del src  # drop the export before the caller can close the mmap
+    return crc
+
+class CrcBatch:
+    """Deferred CRC checks for crc_mode='batch'. Blocks are queued by
+    _parse_varstruct and verified with zlib every `size` blocks (and on
+    flush(), which the walks call in a finally); mismatches are logged like
+    crc_mode='warn'."""
+    def __init__(self, mm, size=4096):
+        self.mm=mm; self.size=size; self.starts=[]; self.lengths=[]; self.crcs=[]
+        self.checked=0; self.mismatches=0
+    def add(self, start, length, crc_read):
+        self.starts.append(start); self.lengths.append(length); self.crcs.append(crc_read)
+        if len(self.starts)>=self.size: self.flush()
+    def flush(self):
+        if not self.starts: return
+        import logging
+        mm=self.mm; bad=0
+        for start, length, crc_read in zip(self.starts, self.lengths, self.crcs):
+            if _crc32_view(mm, start, start+length) != crc_read:
+                logging.warning('CRC mismatch at 0x%X', start); bad+=1
+        self.checked+=len(self.starts); self.mismatches+=bad
+        self.starts=[]; self.lengths=[]; self.crcs=[]
+
+CRC_SAMPLE_EVERY = 64
+_crc_sample_n = 0
+
 def _read_varuint_from(mm,pos,limit):
     res=0; shift=0
     while pos<limit:
@@ -50,7 +157,35 @@ def _read_varint_from(buf,pos,limit):
         if shift>35: break
     raise ValueError('VarInt overflow')
 
-def _parse_varstruct(mm,pos,limit,crc_mode='warn'):
+def _varstruct_crc(mm,start,pos,limit,crc_mode='warn',crc_batch=None):
+    """Read the CRC that follows the fields ending at `pos`, check it per
+    crc_mode and return the position after it."""
+    global _crc_sample_n
+    if pos + 4 > limit: raise ValueError('Truncated before CRC')
+    crc_read = struct.unpack_from('>I', mm, pos)[0]; pos += 4
+    if crc_mode == 'off':
+        return pos
+    if crc_mode == 'sampled':
+        _crc_sample_n += 1
+        if _crc_sample_n % CRC_SAMPLE_EVERY: return pos
+        crc_mode = 'warn'
+    elif crc_mode == 'batch':
+        if crc_batch is not None:
+            crc_batch.add(start, pos-4-start, crc_read)
+            return pos
+        crc_mode = 'warn'  # no queue to defer to: check inline
+    crc_calc = _crc32_view(mm, start, pos-4)
+    if crc_mode == 'strict' and crc_calc != crc_read:
+        raise ValueError(f'CRC mismatch: calc=0x{crc_calc:08X} read=0x{crc_read:08X}')
+    elif crc_mode == 'warn' and crc_calc != crc_read:
+        import logging; logging.warning('CRC mismatch at 0x%X', start)
+    return pos
+
+def _parse_varstruct(mm,pos,limit,crc_mode='warn',crc_batch=None):
+    """crc_mode: 'strict' raises on mismatch, 'warn' logs, 'sampled' checks
+    one block in CRC_SAMPLE_EVERY (warn semantics), 'batch' queues the block on
+    `crc_batch` (a CrcBatch; checked inline like 'warn' when none is given),
+    'off' skips the check."""
     start = pos
     n, pos = _read_varuint_from(mm, pos, limit)
     if n < 0 or n > 10000:
@@ -69,14 +204,92 @@ def _parse_varstruct(mm,pos,limit,crc_mode='warn'):
         if endv > limit: raise ValueError('Varstruct value exceeds file size')
         fields[fn] = bytes(mm[pos:endv])
         pos = endv
-    if pos + 4 > limit: raise ValueError('Truncated before CRC')
-    crc_read = struct.unpack('>I', mm[pos:pos+4])[0]; pos += 4
-    data = bytes(mm[start:pos-4]); crc_calc = _crc32_custom(data)
-    if crc_mode == 'strict' and crc_calc != crc_read:
-        raise ValueError(f'CRC mismatch: calc=0x{crc_calc:08X} read=0x{crc_read:08X}')
-    elif crc_mode == 'warn' and crc_calc != crc_read:
-        import logging; logging.warning('CRC mismatch at 0x%X', start)
-    return fields, pos
+    return fields, _varstruct_crc(mm, start, pos, limit, crc_mode, crc_batch)
+
+_STRUCTS = {}
+
+class FieldTable:
+    """Reusable (offset, length) table filled by _scan_varstruct.
+
+    Only field numbers below `size` are kept. Nothing is copied: values are
+    decoded on request with struct.unpack_from on the underlying buffer, and
+    a generation counter marks which slots belong to the last scan, so the
+    table is never cleared or reallocated between records.
+    """
+    __slots__ = ('buf', 'size', 'ofs', 'lens', 'gen', 'cur')
+    def __init__(self, size=16):
+        self.buf=None; self.size=size
+        self.ofs=[0]*size; self.lens=[0]*size; self.gen=[0]*size; self.cur=0
+    def __contains__(self, fn):
+        return 0 <= fn < self.size and self.gen[fn] == self.cur
+    def span(self, fn):
+        """(offset, length) of field `fn`, or None."""
+        if fn in self: return self.ofs[fn], self.lens[fn]
+        return None
+    def length(self, fn):
+        return self.lens[fn] if fn in self else None
+    def view(self, fn):
+        """memoryview of the raw value (release it before closing the mmap)."""
+        if fn not in self: return None
+        o=self.ofs[fn]; return memoryview(self.buf)[o:o+self.lens[fn]]
+    def unpack(self, fn, fmt):
+        """struct-unpack the start of field `fn`; raises struct.error if it is
+        shorter than `fmt` (like unpacking value[:n] of a copied field)."""
+        st = _STRUCTS.get(fmt) or _STRUCTS.setdefault(fmt, struct.Struct(fmt))
+        if self.lens[fn] < st.size:
+            raise struct.error(f'field {fn} too short for {fmt!r}')
+        return st.unpack_from(self.buf, self.ofs[fn])[0]
+    def uint_le(self, fn, nbytes=4):
+        """Little-endian unsigned int of the first `nbytes` (short fields zero-padded)."""
+        o=self.ofs[fn]; n=min(nbytes, self.lens[fn])
+        if n == 4: return struct.unpack_from('<I', self.buf, o)[0]
+        return int.from_bytes(self.buf[o:o+n], 'little')
+    def as_dict(self):
+        """Copy into the {field: bytes} form _parse_varstruct returns."""
+        return {fn: bytes(self.buf[self.ofs[fn]:self.ofs[fn]+self.lens[fn]])
+                for fn in range(self.size) if fn in self}
+
+def _scan_varstruct(mm,pos,limit,table,crc_mode='warn',crc_batch=None):
+    """Zero-copy _parse_varstruct: records each field's offset/length in
+    `table` (a FieldTable, reused across calls) and returns the position
+    after the CRC. Same validation and crc_mode handling."""
+    start = pos
+    n = mm[pos] if pos < limit else 0x80
+    if n < 0x80: pos += 1  # single-byte varuints inline; longer ones via _read_varuint_from
+    else: n, pos = _read_varuint_from(mm, pos, limit)
+    if n < 0 or n > 10000:
+        raise ValueError(f'Unreasonable field count: {n}')
+    table.buf = mm; table.cur += 1
+    ofs = table.ofs; lens = table.lens; gen = table.gen; size = table.size; cur = table.cur
+    for _ in range(n):
+        key = mm[pos] if pos < limit else 0x80
+        if key < 0x80: pos += 1
+        else: key, pos = _read_varuint_from(mm, pos, limit)
+        fn = key >> 3
+        lc = key & 7
+        if lc == 7:
+            vlen, pos = _read_varuint_from(mm, pos, limit)
+            if vlen < 0 or vlen > (limit - pos): raise ValueError('Varstruct value exceeds file size')
+        else:
+            vlen = lc
+        endv = pos + vlen
+        if endv > limit: raise ValueError('Varstruct value exceeds file size')
+        if fn < size:
+            ofs[fn] = pos; lens[fn] = vlen; gen[fn] = cur
+        pos = endv
+    return _varstruct_crc(mm, start, pos, limit, crc_mode, crc_batch)
+
+def _read_zigzag_at(buf,pos,limit):
+    """Zigzag varint at absolute `pos` of `buf` (no slice copy)."""
+    res=0; shift=0; i=pos
+    while i<limit:
+        b=buf[i]; i+=1
+        res|=(b&0x7F)<<shift
+        if not(b&0x80):
+            return (res>>1)^(-(res&1)),i
+        shift+=7
+        if shift>35: break
+    raise ValueError('VarInt overflow')
 
 def _mapunit_to_deg(x:int)->float: return x*(360.0/float(1<<32))
 
@@ -8,6 +8,7 @@ import mmap
 import struct
 from dataclasses import dataclass
 from typing import Iterator, Optional, Dict, Any, List
+import numpy as np
 from core_shared import find_magic, _mapunit_to_deg
 
 @dataclass
@@ -37,56 +38,153 @@ class RSDRecord:
 
 RECORD_MAGIC = 0xB7E9DA86
 
+HEURISTIC_BATCH = 4096          # records decoded together by _decode_batch
+HEURISTIC_REGION = 8 << 20     # max bytes spanned by one batch
+_DEG_PER_UNIT = 360.0/float(1<<32)  # same factor as _mapunit_to_deg
+
+def iter_header_positions(mm, start_ofs: int = 0x5000) -> Iterator[int]:
+    """Stream every record magic from start_ofs to EOF."""
+    magic_bytes = struct.pack('<I', RECORD_MAGIC)
+    current_pos = start_ofs
+    while current_pos < len(mm) - 16:
+        magic_pos = find_magic(mm, magic_bytes, current_pos, len(mm))
+        if magic_pos < 0:
+            break
+        yield magic_pos
+        current_pos = magic_pos + 4
+
+def iter_record_spans(mm, start_ofs: int = 0x5000) -> Iterator[tuple]:
+    """(header_pos, record_size) per header: up to the next header, or at
+    most 64KB for the last one."""
+    prev = None
+    for pos in iter_header_positions(mm, start_ofs):
+        if prev is not None:
+            yield prev, pos - prev
+        prev = pos
+    if prev is not None:
+        yield prev, min(len(mm) - prev, 0x10000)
+
+def _first_in_range(nz, lo, hi):
+    """First element of sorted `nz` in [lo, hi) per row, -1 where none."""
+    i = np.searchsorted(nz, lo)
+    cand = nz[np.minimum(i, max(len(nz) - 1, 0))] if len(nz) else np.full(len(lo), -1)
+    return np.where((i < len(nz)) & (cand < hi), cand, -1)
+
+def _decode_batch(mm, starts: np.ndarray, sizes: np.ndarray) -> Dict[str, np.ndarray]:
+    """Vectorised parse_record_heuristic for consecutive records.
+
+    The batch's bytes are viewed (zero-copy) as int32 words at each of the
+    four byte alignments; the channel, lat/lon, depth and sample-count tests
+    become masks over those words and each record takes the first hit inside
+    its own search window. Word k of a record is the 4 bytes at
+    data_start + 4k, exactly the stride the scalar loops step with.
+    """
+    lo = int(starts[0]); hi = int((starts + sizes).max())
+    buf = np.frombuffer(mm, dtype=np.uint8, count=hi - lo, offset=lo)
+    d = starts + 4 - lo                  # data_start, relative to the batch
+    e = starts + sizes - lo              # data_end
+    n = len(starts)
+    out = {k: np.full(n, -1, dtype=np.int64) for k in ('chan_k', 'coord_k', 'depth_k', 'samp_k')}
+    words_by_align = {}
+    align = d % 4
+    for a in range(4):
+        sel = np.nonzero(align == a)[0]
+        if not len(sel): continue
+        nw = (len(buf) - a) // 4
+        w = buf[a:a + 4 * nw].view('<i4')
+        u = w.view('<u4')
+        words_by_align[a] = w
+        base = (d[sel] - a) // 4         # word index of data_start
+        ds = d[sel]; es = e[sel]
+
+        # channel: words 0..7, stopping before data_end-4
+        k_hi = np.minimum(8, np.maximum(0, (es - 4 - ds + 3) // 4))
+        hit = _first_in_range(np.flatnonzero(u <= 15), base, base + k_hi)
+        out['chan_k'][sel] = np.where(hit >= 0, hit - base, -1)
+
+        # lat/lon pair: words 50.. while offset < data_end-8
+        deg = w * _DEG_PER_UNIT
+        pair = ((deg[:-1] >= 40.0) & (deg[:-1] <= 55.0) & (deg[1:] >= -100.0) & (deg[1:] <= -80.0))
+        k_hi = np.maximum(50, (es - 8 - ds + 3) // 4)
+        hit = _first_in_range(np.flatnonzero(pair), base + 50, base + k_hi)
+        out['coord_k'][sel] = np.where(hit >= 0, hit - base, -1)
+
+        # depth: from 6 words before the pair, below min(data_end-4, pair+32)
+        has = hit >= 0
+        if has.any():
+            b = hit[has]; best = ds[has] + 4 * (b - base[has])
+            h_ofs = np.minimum(es[has] - 4, best + 32)
+            g0 = b - 6
+            g1 = g0 + np.maximum(0, (h_ofs - (best - 24) + 3) // 4)
+            dh = _first_in_range(np.flatnonzero((w >= 0) & (w <= 500000)), g0, g1)
+            tmp = np.full(len(sel), -1, dtype=np.int64)
+            tmp[has] = np.where(dh >= 0, dh - base[has], -1)
+            out['depth_k'][sel] = tmp
+
+        # sample count (low uint16 of the word): words 25.. while offset < data_end-8
+        s16 = u & 0xFFFF
+        k_hi = np.maximum(25, (es - 8 - ds + 3) // 4)
+        hit = _first_in_range(np.flatnonzero((s16 >= 64) & (s16 <= 4096)), base + 25, base + k_hi)
+        out['samp_k'][sel] = np.where(hit >= 0, hit - base, -1)
+    out['words'] = words_by_align
+    out['d'] = d; out['e'] = e; out['lo'] = lo
+    return out
+
+def _records_from_batch(mm, starts, sizes, seq0: int, limit: Optional[int]) -> List[RSDRecord]:
+    res = _decode_batch(mm, starts, sizes)
+    d = res['d']; e = res['e']; lo = res['lo']; words = res['words']
+    records = []; seq = seq0
+    for r in np.flatnonzero(res['coord_k'] >= 0):
+        if limit and seq >= limit: break
+        ds = int(d[r]); a = ds % 4; w = words[a]; base = (ds - a) // 4
+        rec = RSDRecord(ofs=int(starts[r]), seq=seq)
+        ck = int(res['chan_k'][r])
+        rec.channel_id = int(w[base + ck]) & 0xFFFFFFFF if ck >= 0 else seq % 2
+        k = int(res['coord_k'][r])
+        rec.lat = int(w[base + k]) * _DEG_PER_UNIT
+        rec.lon = int(w[base + k + 1]) * _DEG_PER_UNIT
+        dk = int(res['depth_k'][r])
+        if dk >= 0: rec.depth_m = int(w[base + dk]) / 1000.0
+        sk = int(res['samp_k'][r])
+        if sk >= 0:
+            cnt = int(w[base + sk]) & 0xFFFF
+            ofs = ds + 4 * sk + 8
+            rec.sample_cnt = cnt
+            rec.sonar_ofs = lo + ofs
+            rec.sonar_size = min(cnt * 2, int(e[r]) - ofs)
+        rec.time_ms = seq * 1000  # Approximate timing
+        records.append(rec); seq += 1
+    return records
+
 def parse_rsd_records_classic(rsd_path: str, start_ofs: int = 0x5000, limit_records: Optional[int] = None) -> Iterator[RSDRecord]:
     """
     Replacement parser that doesn't hang.
-    Uses header scanning and heuristic coordinate extraction.
+    Streams record headers and decodes them in NumPy batches with the same
+    heuristics as parse_record_heuristic (no cap on the number of headers).
     """
     
     with open(rsd_path, 'rb') as f:
         with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
-            
-            # Find record headers
-            magic_bytes = struct.pack('<I', RECORD_MAGIC)
-            headers = []
-            
-            current_pos = start_ofs
-            while current_pos < len(mm) - 16:
-                magic_pos = find_magic(mm, magic_bytes, current_pos, len(mm))
-                if magic_pos is None:
-                    break
-                headers.append(magic_pos)
-                current_pos = magic_pos + 4
-                
-                # Limit header search for performance
-                if len(headers) > 20000:
-                    break
-            
-            if not headers:
-                return
-                
-            # Process each record
             record_count = 0
-            for i, header_pos in enumerate(headers):
+            starts = []; sizes = []
+            def flush():
+                nonlocal record_count
+                recs = _records_from_batch(mm, np.asarray(starts, dtype=np.int64),
+                                           np.asarray(sizes, dtype=np.int64), record_count, limit_records)
+                starts.clear(); sizes.clear()
+                record_count += len(recs)
+                return recs
+            for header_pos, record_size in iter_record_spans(mm, start_ofs):
                 if limit_records and record_count >= limit_records:
-                    break
-                    
-                # Determine record size
-                if i + 1 < len(headers):
-                    record_size = headers[i + 1] - header_pos
-                else:
-                    record_size = min(len(mm) - header_pos, 0x10000)
-                    
+                    return
                 if record_size < 16 or record_size > 0x100000:
                     continue
-                    
-                try:
-                    record = parse_record_heuristic(mm, header_pos, record_size, record_count)
-                    if record:
-                        yield record
-                        record_count += 1
-                except Exception:
-                    continue
+                if starts and (len(starts) >= HEURISTIC_BATCH or
+                               header_pos + record_size - starts[0] > HEURISTIC_REGION):
+                    yield from flush()
+                starts.append(header_pos); sizes.append(record_size)
+            if starts and not (limit_records and record_count >= limit_records):
+                yield from flush()
 
 def parse_record_heuristic(mm: mmap.mmap, header_pos: int, record_size: int, seq: int) -> Optional[RSDRecord]:
     """Parse a single record using heuristic approach"""
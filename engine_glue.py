@@ -11,7 +11,8 @@ from typing import Tuple
 
 
 def _run_one(engine_name: str, inp: str, out_dir: str, max_records=None, progress_every=2000, 
-           progress_seconds=2.0, verbose=False, scan_type="auto", channel="all") -> Tuple[int,str,str]:
+           progress_seconds=2.0, verbose=False, scan_type="auto", channel="all",
+           resume=False, check_cancel=None, ping_store=False) -> Tuple[int,str,str]:
     # Import engine module dynamically
     if verbose:
         print(f"[engine_glue] Starting {engine_name} parser on {inp}")
@@ -32,7 +33,12 @@ def _run_one(engine_name: str, inp: str, out_dir: str, max_records=None, progres
     if verbose:
         print(f"[engine_glue] Parsing {inp} to {csv_path}...")
         
-    parse_result = engine_parse(inp, out_dir, max_records=max_records)
+    if engine_name == 'nextgen':
+        # nextgen checkpoints as it goes; resume picks up an interrupted parse
+        parse_result = engine_parse(inp, out_dir, max_records=max_records,
+                                    resume=resume, check_cancel=check_cancel)
+    else:
+        parse_result = engine_parse(inp, out_dir, max_records=max_records)
     
     # Handle the tuple return from parse engines
     if isinstance(parse_result, tuple):
@@ -60,7 +66,14 @@ def _run_one(engine_name: str, inp: str, out_dir: str, max_records=None, progres
     except:
         log_path = None
     
-    # Now generate PNGs from sonar data
+    # Per-channel ping matrices for block/video/target consumers (either engine)
+    if ping_store and n:
+        if verbose:
+            print(f"[engine_glue] Writing ping store beside {result_csv}...")
+        from ping_store import build_ping_store
+        build_ping_store(inp, result_csv)
+    
+    # Per-channel waterfall strips (images/strips.json) for the preview/video/tile exporters
     if verbose:
         print(f"[engine_glue] Generating images from {result_csv}...")
     
@@ -68,14 +81,15 @@ def _run_one(engine_name: str, inp: str, out_dir: str, max_records=None, progres
         from render_accel import process_record_images
         img_dir = os.path.join(out_dir, 'images')
         os.makedirs(img_dir, exist_ok=True)
-        process_record_images(result_csv, img_dir, scan_type=scan_type, channel=channel)
+        process_record_images(result_csv, img_dir, scan_type=scan_type, channel=channel, rsd_path=inp)
     except Exception as e:
         print(f"[engine_glue] Warning: Image generation failed: {str(e)}")
     
     return n, result_csv, log_path
 
 
-def run_engine(engine: str, rsd_path: str, csv_out: str, limit_rows: int | None = None) -> list[str]:
+def run_engine(engine: str, rsd_path: str, csv_out: str, limit_rows: int | None = None,
+               resume: bool = False, check_cancel=None, ping_store: bool = False) -> list[str]:
     """Run engine and return list of output file paths for GUI compatibility."""
     # Extract output directory from csv_out path
     import os
@@ -84,7 +98,8 @@ def run_engine(engine: str, rsd_path: str, csv_out: str, limit_rows: int | None
         out_dir = '.'
     
     # Run the engine
-    n, csv_path, log_path = _run_one(engine, rsd_path, out_dir, max_records=limit_rows)
+    n, csv_path, log_path = _run_one(engine, rsd_path, out_dir, max_records=limit_rows,
+                                     resume=resume, check_cancel=check_cancel, ping_store=ping_store)
     
     # Return list of paths for GUI compatibility
     result_paths = [csv_path]
@@ -106,6 +121,8 @@ def main():
     ap.add_argument("--scan-type", default="auto", choices=["auto", "sidescan", "downscan", "chirp"],
                    help="Type of scan data to parse")
     ap.add_argument("--channel", default="all", help="Channel ID to parse (all, auto, or specific ID)")
+    ap.add_argument("--resume", action="store_true", help="Continue an interrupted nextgen parse from its checkpoint")
+    ap.add_argument("--ping-store", action="store_true", help="Also write per-channel ping matrices (.npy) beside the CSV")
     args = ap.parse_args()
 
     inp = args.input
@@ -119,7 +136,8 @@ def main():
         try:
             if args.verbose:
                 print("[engine_glue] Trying nextgen parser first...")
-            n, p, l = _run_one("nextgen", inp, out_dir, args.max, verbose=args.verbose)
+            n, p, l = _run_one("nextgen", inp, out_dir, args.max, verbose=args.verbose, resume=args.resume,
+                               ping_store=args.ping_store)
             total = n; paths = [p]; logs = [l]
             if args.verbose:
                 print(f"[engine_glue] Nextgen parser succeeded with {n} records")
@@ -127,21 +145,23 @@ def main():
             if args.verbose:
                 print(f"[engine_glue] Nextgen parser failed: {str(e)}")
                 print("[engine_glue] Falling back to classic parser...")
-            n, p, l = _run_one("classic", inp, out_dir, args.max, verbose=args.verbose)
+            n, p, l = _run_one("classic", inp, out_dir, args.max, verbose=args.verbose,
+                               ping_store=args.ping_store)
             total = n; paths = [p]; logs = [l]
     elif prefer in ("classic", "nextgen"):
         if args.verbose:
             print(f"[engine_glue] Using {prefer} parser as specified")
-        n, p, l = _run_one(prefer, inp, out_dir, args.max, verbose=args.verbose)
+        n, p, l = _run_one(prefer, inp, out_dir, args.max, verbose=args.verbose, resume=args.resume,
+                           ping_store=args.ping_store)
         total = n; paths = [p]; logs = [l]
     elif prefer == "both":
         n1, p1, l1 = _run_one("classic", inp, os.path.join(out_dir, "classic"), args.max)
         n2, p2, l2 = _run_one("nextgen", inp, os.path.join(out_dir, "nextgen"), args.max)
         total = n1 + n2; paths = [p1,p2]; logs = [l1,l2]
     else:
-        n2, p2, l2 = _run_one("nextgen", inp, out_dir, args.max)
+        n2, p2, l2 = _run_one("nextgen", inp, out_dir, args.max, resume=args.resume, ping_store=args.ping_store)
         if n2 == 0:
-            n1, p1, l1 = _run_one("classic", inp, out_dir, args.max)
+            n1, p1, l1 = _run_one("classic", inp, out_dir, args.max, ping_store=args.ping_store)
             total = n1; paths = [p1]; logs = [l1]
         else:
             total = n2; paths = [p2]; logs = [l2]
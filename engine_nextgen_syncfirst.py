@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 # engine_nextgen_syncfirst.py — tolerant (warn CRC) + stall watchdog
 
-import os, mmap, struct, csv
+import os, mmap, struct, csv, json
 from dataclasses import dataclass
-from typing import Optional, Iterable, Callable, Tuple, Dict, Any
-from core_shared import MAGIC_REC_HDR, MAGIC_REC_TRL, _parse_varstruct, _mapunit_to_deg, _read_varint_from, find_magic, set_progress_hook, _emit
+from typing import Optional, Iterable, Callable, Tuple, Dict, Any, NamedTuple
+from core_shared import MAGIC_REC_HDR, MAGIC_REC_TRL, _scan_varstruct, FieldTable, _read_zigzag_at, _read_varuint_from, _mapunit_to_deg, find_magic, progress_hook, _emit, CrcBatch
 
 @dataclass
 class RSDRecord:
@@ -28,140 +28,623 @@ class RSDRecord:
     color_id: Optional[int]     # Color scheme ID
     extras: Dict[str,Any]  # Additional decoded fields
 
-def parse_rsd_records_nextgen(path:str, limit_records:int=0, progress:Callable[[float,str],None]=None) -> Iterable[RSDRecord]:
-    if progress: set_progress_hook(progress)
-    size=os.path.getsize(path)
-    with open(path,'rb') as f:
-        mm=mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
-        limit = size
-        mbytes = MAGIC_REC_HDR.to_bytes(4,'little')
-
-        _emit(0.0, "Scanning file for sonar data...")
-        j = find_magic(mm, mbytes, 0, limit)
-        if j < 0:
-            _emit(0.0, "No sonar data found in file"); mm.close(); return
-        pos = j - 1
-        _emit(5.0, f"Found sonar data, analyzing structure...")
-
-        count=0
-        last_magic=None; stuck_hits=0; MAX_STUCK=2
-
-        while pos + 12 < limit:
-            k = find_magic(mm, mbytes, max(pos,0), min(limit, pos+16*1024*1024))
-            if k < 0: break
-            pos_magic = k
-            # Don't emit technical header messages, just update progress
-
-            if pos_magic == last_magic:
-                stuck_hits += 1
-                if stuck_hits > MAX_STUCK:
-                    pos = pos_magic + 8
-                    # Skip corrupt data quietly, don't show as error
-                    last_magic = None; stuck_hits = 0
-                    continue
-            else:
-                last_magic = pos_magic; stuck_hits = 0
-
-            # Read header as varstruct
-            hdr_block=None
-            for back in range(1,65):
-                try:
-                    start = pos_magic - back
-                    if start < 0: break
-                    hdr, body_start = _parse_varstruct(mm, start, limit, crc_mode='warn')
-                    if struct.unpack('<I', hdr.get(0,b'\x00'*4)[:4])[0] == MAGIC_REC_HDR:
-                        hdr_block=(hdr,start,body_start); break
-                except Exception: pass
-            if not hdr_block:
-                pos = pos_magic + 4
-                # Skip unparseable data quietly
+class WalkItem(NamedTuple):
+    """One record as located by _walk (raw positions plus decoded fields)."""
+    hdr_start: int
+    body_start: int
+    seq: int
+    time_ms: int
+    channel_id: Optional[int]
+    lat: Optional[float]
+    lon: Optional[float]
+    depth_m: Optional[float]
+    sample_cnt: Optional[int]
+    beam_deg: Optional[float]
+    sonar_ofs: int
+    sonar_size: int
+    trailer_pos: int
+    hop: Optional[int]
+
+_MBYTES = MAGIC_REC_HDR.to_bytes(4,'little')
+
+def _probe_header(mm, pos_magic, limit, crc_mode='warn', crc_batch=None, table=None):
+    """Backtrack up to 64 bytes from a magic hit to the header varstruct.
+    Returns (hdr_table, hdr_start, body_start) or None. `table` is a reusable
+    FieldTable (one is made if not given)."""
+    hdr = table if table is not None else FieldTable()
+    for back in range(1,65):
+        try:
+            start = pos_magic - back
+            if start < 0: break
+            body_start = _scan_varstruct(mm, start, limit, hdr, crc_mode=crc_mode, crc_batch=crc_batch)
+            if (hdr.unpack(0, '<I') if 0 in hdr else 0) == MAGIC_REC_HDR:
+                return hdr, start, body_start
+        except Exception: pass
+
+def _decode_record(mm, hdr, hdr_start, body_start, limit, crc_mode='warn', crc_batch=None, body=None) -> WalkItem:
+    """Decode the body and trailer that follow a parsed header.
+    `hdr` is the header's FieldTable; `body` an optional reusable FieldTable."""
+    seq     = hdr.unpack(2, '<I') if 2 in hdr else 0
+    time_ms = hdr.unpack(5, '<I') if 5 in hdr else 0
+    data_sz = hdr.unpack(4, '<H') if hdr.length(4) else 0
+
+    lat=lon=depth=beam_deg=None; sample=None; ch=None
+    if body is None: body = FieldTable()
+    # Read body as varstruct, but handle failures gracefully
+    try:
+        body_end = _scan_varstruct(mm, body_start, limit, body, crc_mode=crc_mode, crc_batch=crc_batch)
+        used = max(0, body_end-body_start)
+
+        if 0 in body: ch = body.uint_le(0)
+        if 9 in body and body.lens[9]>=4: lat = _mapunit_to_deg(body.unpack(9, '>i'))
+        if 10 in body and body.lens[10]>=4: lon = _mapunit_to_deg(body.unpack(10, '>i'))
+        if 1 in body:
+            try:
+                # NB: read from body_start, not the field offset (long-standing behaviour)
+                v,_ = _read_zigzag_at(mm, body_start, body_start+body.lens[1]); depth = v/1000.0
+            except Exception: pass
+        if 7 in body: sample = body.uint_le(7)
+        if 11 in body and body.lens[11]>=4: beam_deg = body.unpack(11, '<f')
+    except Exception as e:
+        # Body parsing failed, use default values and assume fixed size
+        used = 32  # Assume standard metadata size
+        ch = seq  # Use seq as channel ID fallback
+        lat = lon = depth = beam_deg = None
+        sample = 0
+
+    sonar_ofs = body_start + used
+    sonar_len = max(0, data_sz - used) if data_sz > 0 else 0
+
+    trailer_pos = body_start + data_sz
+    hop = _read_hop(mm, trailer_pos, limit)
+
+    return WalkItem(hdr_start, body_start, seq, time_ms, ch, lat, lon, depth, sample, beam_deg,
+                    sonar_ofs if sonar_len > 0 else 0, sonar_len if sonar_len > 0 else 0, trailer_pos, hop)
+
+def _read_hop(mm, trailer_pos, limit):
+    """chunk_size of a valid trailer at `trailer_pos`, else None."""
+    if trailer_pos + 12 <= limit:
+        try:
+            tr_magic, chunk_size, tr_crc = struct.unpack_from('>III', mm, trailer_pos)
+            if tr_magic == MAGIC_REC_TRL and chunk_size > 0:
+                return chunk_size
+        except Exception: pass
+    return None
+
+def _hop_chain(mm, pos, limit, crc_mode='off', crc_batch=None, end=None, hdr_table=None):
+    """Header-only walk: follow trailer hops from `pos` (find_magic resync
+    when there is no hop) without touching record bodies.
+
+    Yields (hdr, hdr_start, body_start, trailer_pos, hop, next_pos); `hdr`
+    is a FieldTable reused for every header and next_pos is None when the
+    walk cannot go on. With `end`, stops at the first header starting at or
+    after `end` and returns its offset (the generator's return value);
+    otherwise returns None.
+    """
+    last_magic=None; stuck_hits=0; MAX_STUCK=2
+    if hdr_table is None: hdr_table = FieldTable()
+
+    while pos + 12 < limit:
+        k = find_magic(mm, _MBYTES, max(pos,0), min(limit, pos+16*1024*1024))
+        if k < 0: break
+        pos_magic = k
+        # Don't emit technical header messages, just update progress
+
+        if pos_magic == last_magic:
+            stuck_hits += 1
+            if stuck_hits > MAX_STUCK:
+                pos = pos_magic + 8
+                # Skip corrupt data quietly, don't show as error
+                last_magic = None; stuck_hits = 0
                 continue
+        else:
+            last_magic = pos_magic; stuck_hits = 0
+
+        hdr_block = _probe_header(mm, pos_magic, limit, crc_mode, crc_batch, hdr_table)
+        if not hdr_block:
+            pos = pos_magic + 4
+            # Skip unparseable data quietly
+            continue
 
-            hdr,hdr_start,body_start = hdr_block
-            seq     = struct.unpack('<I', hdr.get(2,b'\x00'*4)[:4])[0]
-            time_ms = struct.unpack('<I', hdr.get(5,b'\x00'*4)[:4])[0]
-            data_sz = struct.unpack('<H', (hdr.get(4,b'\x00\x00')[:2] or b'\x00\x00'))[0]
+        hdr,hdr_start,body_start = hdr_block
+        if end is not None and hdr_start >= end:
+            return hdr_start
+        data_sz = hdr.unpack(4, '<H') if hdr.length(4) else 0
+        trailer_pos = body_start + data_sz
+        hop = _read_hop(mm, trailer_pos, limit)
+
+        if hop:
+            nxt = hdr_start + hop
+        else:
+            k = find_magic(mm, _MBYTES, min(limit, trailer_pos+2), min(limit, hdr_start+4*1024*1024))
+            nxt = k - 1 if k >= 0 else None
+        yield hdr, hdr_start, body_start, trailer_pos, hop, nxt
+        if nxt is None: break
+        pos = nxt
+    return None
+
+def _walk(mm, pos, limit, crc_mode='warn', crc_batch=None, end=None):
+    """_hop_chain plus body decode: yields (WalkItem, next_pos) and returns
+    what _hop_chain returns."""
+    body_table = FieldTable()
+    chain = _hop_chain(mm, pos, limit, crc_mode, crc_batch, end)
+    while True:
+        try:
+            hdr, hdr_start, body_start, _trailer, _hop, nxt = next(chain)
+        except StopIteration as stop:
+            return stop.value
+        yield _decode_record(mm, hdr, hdr_start, body_start, limit, crc_mode, crc_batch, body_table), nxt
 
-            lat=lon=depth=beam_deg=None; sample=None; ch=None
-            # Read body as varstruct, but handle failures gracefully
+def _first_header_pos(mm, limit):
+    """Walk start position: one byte before the first header magic, or None."""
+    j = find_magic(mm, _MBYTES, 0, limit)
+    return j - 1 if j >= 0 else None
+
+def _record_from_item(it: WalkItem) -> RSDRecord:
+    return RSDRecord(
+        ofs=it.hdr_start,
+        channel_id=it.channel_id if it.channel_id is not None else 0,
+        seq=it.seq,
+        time_ms=it.time_ms,
+        lat=it.lat if it.lat is not None else 0.0,
+        lon=it.lon if it.lon is not None else 0.0,
+        depth_m=it.depth_m if it.depth_m is not None else 0.0,
+        sample_cnt=it.sample_cnt if it.sample_cnt is not None else 0,
+        sonar_ofs=it.sonar_ofs,
+        sonar_size=it.sonar_size,
+        beam_deg=it.beam_deg if it.beam_deg is not None else 0.0,  # Extracted from field 11
+        pitch_deg=0.0,  # Not in original data
+        roll_deg=0.0,   # Not in original data
+        heave_m=None,   # Not in original data
+        tx_ofs_m=None,  # Not in original data
+        rx_ofs_m=None,  # Not in original data
+        color_id=None,  # Not in original data
+        extras={}       # Not in original data
+    )
+
+def parse_rsd_records_nextgen(path:str, limit_records:int=0, progress:Callable[[float,str],None]=None,
+                              crc_mode:str='warn', start_after:Optional[int]=None,
+                              follow:bool=False, poll_interval:float=0.2, max_poll_interval:float=2.0,
+                              idle_timeout:Optional[float]=None,
+                              stop:Optional[Callable[[], bool]]=None) -> Iterable[RSDRecord]:
+    """Walk the file by trailer hop (find_magic resync) and yield records.
+
+    crc_mode is passed to _scan_varstruct: 'warn' (default), 'strict',
+    'sampled', 'batch' (checks deferred and run every 4096 blocks) or 'off'.
+    start_after: header offset of the last record already consumed (from a
+    checkpoint); the walk restarts at that header and yields what follows it.
+    follow=True tails a file that is still being written: see _follow_records.
+    """
+    with progress_hook(progress):
+        if follow:
+            yield from _follow_records(path, limit_records, crc_mode, start_after, poll_interval,
+                                       max_poll_interval, idle_timeout, stop)
+            return
+        size=os.path.getsize(path)
+        with open(path,'rb') as f:
+            mm=mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+            limit = size
+            crc_batch = CrcBatch(mm) if crc_mode == 'batch' else None
             try:
-                body, body_end = _parse_varstruct(mm, body_start, limit, crc_mode='warn')
-                used = max(0, body_end-body_start)
-                
-                if 0 in body: ch = int.from_bytes(body[0][:4].ljust(4,b'\x00'), 'little')
-                if 9 in body and len(body[9])>=4: lat_raw = int.from_bytes(body[9][:4], 'big', signed=True); lat = _mapunit_to_deg(lat_raw)
-                if 10 in body and len(body[10])>=4: lon_raw = int.from_bytes(body[10][:4], 'big', signed=True); lon = _mapunit_to_deg(lon_raw)
-                if 1 in body:
+                _emit(0.0, "Scanning file for sonar data...")
+                pos = _first_header_pos(mm, limit) if start_after is None else start_after
+                if pos is None:
+                    _emit(0.0, "No sonar data found in file"); return
+                _emit(5.0, f"Found sonar data, analyzing structure...")
+
+                count=0
+                for item, _nxt in _walk(mm, pos, limit, crc_mode, crc_batch):
+                    if start_after is not None and item.hdr_start <= start_after: continue
+                    yield _record_from_item(item)
+                    count += 1
+                    if count % 100 == 0:  # Update progress more frequently
+                        progress_pct = min(95.0, (item.trailer_pos/limit)*100.0)  # Cap at 95% until done
+                        _emit(progress_pct, f"Processing sonar records... ({count} found)")
+                    if limit_records and count >= limit_records: break
+
+                _emit(100.0, f"✓ Parsing complete! Found {count} sonar records")
+            finally:
+                if crc_batch: crc_batch.flush()  # also when the consumer stops early
+                mm.close()
+
+
+def count_rsd_records(path:str, crc_mode:str='off') -> int:
+    """Number of records the nextgen walk would yield, found by following
+    the trailer hop chain only (headers are parsed, bodies never are)."""
+    if not os.path.getsize(path): return 0
+    with open(path,'rb') as f:
+        mm=mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+        try:
+            pos = _first_header_pos(mm, len(mm))
+            if pos is None: return 0
+            n = 0
+            for _ in _hop_chain(mm, pos, len(mm), crc_mode): n += 1
+            return n
+        finally:
+            mm.close()
+
+def _peek_channel(mm, body_start, limit, body_t, fallback=None):
+    """Channel id of the body at `body_start`: reads the first field when it
+    is field 0, otherwise scans the body's field table (no CRC). A body that
+    does not parse gives `fallback` (the record decode uses the seq then)."""
+    try:
+        n, p = _read_varuint_from(mm, body_start, limit)
+        key, p = _read_varuint_from(mm, p, limit) if n else (None, p)
+        if key is not None and key >> 3 == 0:
+            vlen = key & 7
+            if vlen == 7: vlen, p = _read_varuint_from(mm, p, limit)
+            return int.from_bytes(mm[p:p+min(4, vlen)], 'little')
+        _scan_varstruct(mm, body_start, limit, body_t, crc_mode='off')
+        return body_t.uint_le(0) if 0 in body_t else None
+    except Exception:
+        return fallback
+
+def _empty_survey(path, size):
+    return {'path': str(path), 'file_size': size, 'records': 0, 'channels': {},
+            'time_ms_first': None, 'time_ms_last': None, 'duration_s': 0.0,
+            'bbox': None, 'sampled_pings': 0, 'corrupt_regions': 0, 'corrupt_bytes': 0,
+            'tail_bytes': size, 'source': 'scan'}
+
+def _bbox_update(bbox, lat, lon):
+    if lat is None or lon is None or (lat == 0.0 and lon == 0.0): return bbox
+    if bbox is None: return {'min_lat': lat, 'max_lat': lat, 'min_lon': lon, 'max_lon': lon}
+    bbox['min_lat'] = min(bbox['min_lat'], lat); bbox['max_lat'] = max(bbox['max_lat'], lat)
+    bbox['min_lon'] = min(bbox['min_lon'], lon); bbox['max_lon'] = max(bbox['max_lon'], lon)
+    return bbox
+
+def survey_rsd(path:str, sample_pings:int=1000, use_index:bool=True) -> Dict[str, Any]:
+    """Quick file statistics for display before (or instead of) a full parse.
+
+    Returns a dict with the record count, a {channel: records} histogram,
+    first/last time_ms and duration, a lat/lon bbox from about
+    `sample_pings` pings spread evenly over the file, the number and total
+    size of corrupt regions (bytes skipped between one record's end or hop
+    target and the next header) and the bytes left after the last record.
+    A valid .rsdidx sidecar is used when present; otherwise only headers are
+    followed along the hop chain and bodies are peeked for the channel id.
+    """
+    import time
+    t0 = time.perf_counter()
+    size = os.path.getsize(path)
+    if use_index:
+        from rsd_index import open_index
+        idx = open_index(path)
+        if idx is not None:
+            out = _survey_from_index(idx, size, sample_pings)
+            out['elapsed_s'] = time.perf_counter() - t0
+            return out
+    out = _empty_survey(path, size)
+    if not size:
+        out['elapsed_s'] = time.perf_counter() - t0; return out
+    with open(path,'rb') as f:
+        mm=mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+        try:
+            pos = _first_header_pos(mm, size)
+            if pos is not None:
+                body_t = FieldTable(); channels = {}; bbox = None
+                count = sampled = regions = bad_bytes = 0
+                t_first = t_last = None; expected = None
+                stride = max(1, size // max(1, sample_pings)); next_sample = 0
+                for hdr, hdr_start, body_start, trailer_pos, hop, nxt in _hop_chain(mm, pos, size, 'off'):
+                    count += 1
+                    if expected is not None and hdr_start > expected:
+                        regions += 1; bad_bytes += hdr_start - expected
+                    expected = hdr_start + hop if hop else trailer_pos + 12
                     try:
-                        v,_ = _read_varint_from(mm[body_start:body_start+len(body[1])],0,len(body[1])); depth = v/1000.0
-                    except Exception: pass
-                if 7 in body: sample = int.from_bytes(body[7][:4].ljust(4,b'\x00'), 'little')
-                if 11 in body and len(body[11])>=4: beam_deg = struct.unpack('<f', body[11][:4])[0]
-            except Exception as e:
-                # Body parsing failed, use default values and assume fixed size
-                used = 32  # Assume standard metadata size
-                ch = seq  # Use seq as channel ID fallback
-                lat = lon = depth = beam_deg = None
-                sample = 0
-
-            sonar_ofs = body_start + used
-            sonar_len = max(0, data_sz - used) if data_sz > 0 else 0
-
-            hop=None; trailer_pos = body_start + data_sz
-            if trailer_pos + 12 <= limit:
-                try:
-                    tr_magic, chunk_size, tr_crc = struct.unpack('>III', mm[trailer_pos:trailer_pos+12])
-                    if tr_magic == MAGIC_REC_TRL and chunk_size > 0:
-                        hop = chunk_size
-                except Exception: pass
-
-            yield RSDRecord(
-                ofs=hdr_start, 
-                channel_id=ch if ch is not None else 0, 
-                seq=seq, 
-                time_ms=time_ms, 
-                lat=lat if lat is not None else 0.0, 
-                lon=lon if lon is not None else 0.0, 
-                depth_m=depth if depth is not None else 0.0,
-                sample_cnt=sample if sample is not None else 0, 
-                sonar_ofs=sonar_ofs if sonar_len > 0 else 0, 
-                sonar_size=sonar_len if sonar_len > 0 else 0,
-                beam_deg=beam_deg if beam_deg is not None else 0.0,  # Extracted from field 11
-                pitch_deg=0.0,  # Not in original data  
-                roll_deg=0.0,   # Not in original data
-                heave_m=None,   # Not in original data
-                tx_ofs_m=None,  # Not in original data
-                rx_ofs_m=None,  # Not in original data
-                color_id=None,  # Not in original data
-                extras={}       # Not in original data
-            )
-            count += 1
-            if count % 100 == 0:  # Update progress more frequently
-                progress_pct = min(95.0, (trailer_pos/limit)*100.0)  # Cap at 95% until done
-                _emit(progress_pct, f"Processing sonar records... ({count} found)")
-            if limit_records and count >= limit_records: break
-
-            if hop:
-                pos = hdr_start + hop
-            else:
-                nxt = find_magic(mm, mbytes, min(limit, trailer_pos+2), min(limit, hdr_start+4*1024*1024))
-                if nxt < 0: break
-                pos = nxt - 1
+                        t = hdr.unpack(5, '<I') if 5 in hdr else 0
+                        if t_first is None: t_first = t
+                        t_last = t
+                    except struct.error: pass
+                    seq = hdr.unpack(2, '<I') if 2 in hdr and hdr.lens[2] >= 4 else 0
+                    ch = _peek_channel(mm, body_start, size, body_t, fallback=seq)
+                    channels[ch] = channels.get(ch, 0) + 1
+                    if hdr_start >= next_sample:
+                        try:
+                            it = _decode_record(mm, hdr, hdr_start, body_start, size, 'off', None, body_t)
+                            bbox = _bbox_update(bbox, it.lat, it.lon); sampled += 1
+                        except Exception: pass
+                        next_sample = hdr_start + stride
+                out.update(records=count, channels=channels, time_ms_first=t_first, time_ms_last=t_last,
+                           duration_s=((t_last - t_first) / 1000.0) if count else 0.0, bbox=bbox,
+                           sampled_pings=sampled, corrupt_regions=regions, corrupt_bytes=bad_bytes,
+                           tail_bytes=max(0, size - expected) if expected is not None else size)
+        finally:
+            mm.close()
+    out['elapsed_s'] = time.perf_counter() - t0
+    return out
 
-        _emit(100.0, f"✓ Parsing complete! Found {count} sonar records")
-        mm.close()
+def _survey_from_index(idx, size, sample_pings):
+    import numpy as np
+    e = idx.entries; n = len(idx)
+    out = _empty_survey(idx.rsd_path, size); out['source'] = 'index'
+    if not n: return out
+    hdr = e['hdr_ofs'].astype(np.int64); hop = e['hop'].astype(np.int64)
+    tail = e['body_ofs'].astype(np.int64) + e['data_size'] + 12  # past the trailer, as in the scan
+    expected = np.where(hop > 0, hdr + hop, tail)
+    gaps = hdr[1:] - expected[:-1]
+    gaps = gaps[gaps > 0]
+    bbox = None; sampled = 0
+    rows = np.unique(np.linspace(0, n - 1, min(n, max(1, sample_pings))).astype(np.int64))
+    for rec in idx.iter_rows(rows, crc_mode='off'):
+        bbox = _bbox_update(bbox, rec.lat, rec.lon); sampled += 1
+    t = e['time_ms']
+    out.update(records=n, channels=idx.channel_counts(), time_ms_first=int(t[0]), time_ms_last=int(t[-1]),
+               duration_s=(int(t[-1]) - int(t[0])) / 1000.0, bbox=bbox, sampled_pings=sampled,
+               corrupt_regions=int(gaps.size), corrupt_bytes=int(gaps.sum()),
+               tail_bytes=max(0, size - int(expected[-1])))
+    return out
 
+_TAIL_SLACK = 256  # a header this close to EOF that fails to parse may just be incomplete
 
-def parse_rsd(rsd_path: str, out_dir: str, max_records: Optional[int] = None) -> Tuple[int, str, str]:
-    """Parse RSD file and write records to CSV.
-    Returns (record_count, csv_path, log_path).
+def _follow_records(path, limit_records=0, crc_mode='warn', start_after=None, poll_interval=0.2,
+                    max_poll_interval=2.0, idle_timeout=None, stop=None):
+    """Tail-follow walk used by parse_rsd_records_nextgen(follow=True).
+
+    The file is remapped whenever it grows and the walk carries on from where
+    it stopped, so only new bytes are scanned. A record is yielded once its
+    trailer is on disk; a header cut off at EOF is retried after the next
+    growth instead of being skipped. At EOF the file size is polled with
+    exponential backoff (poll_interval .. max_poll_interval). Ends when
+    stop() returns True, after idle_timeout seconds without growth, or if the
+    file shrinks. Records without a trailer hop resync by find_magic with no
+    4MB window, since the next header may simply not be written yet.
+    Only the current mapping and a few offsets are held, so memory stays flat.
     """
-    # Setup output paths
-    os.makedirs(out_dir, exist_ok=True)
-    base_name = os.path.splitext(os.path.basename(rsd_path))[0]
-    csv_path = os.path.join(out_dir, f"{base_name}.csv")
-    log_path = os.path.join(out_dir, f"{base_name}.log")
-    
+    import time
+    f = open(path, 'rb')
+    mm = None; size = 0; pos = start_after; last_ofs = -1 if start_after is None else start_after
+    hdr_t = FieldTable(); body_t = FieldTable(); crc_batch = None
+    count = 0; delay = poll_interval; idle_since = time.monotonic()
+    try:
+        while True:
+            if stop and stop(): return
+            cur = os.fstat(f.fileno()).st_size
+            if cur < size: return  # truncated or replaced
+            if cur > size:
+                if crc_batch: crc_batch.flush()  # queued blocks point into the old mapping
+                if mm is not None: mm.close()
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                crc_batch = CrcBatch(mm) if crc_mode == 'batch' else None
+                size = len(mm); delay = poll_interval; idle_since = time.monotonic()
+            if mm is not None:
+                if pos is None:
+                    pos = _first_header_pos(mm, size)
+                while pos is not None:
+                    k = find_magic(mm, _MBYTES, max(pos, 0), size)
+                    if k < 0:
+                        pos = max(pos, size - 3)  # magic may straddle EOF
+                        break
+                    hdr_block = _probe_header(mm, k, size, crc_mode, crc_batch, hdr_t)
+                    if not hdr_block:
+                        if size - k < _TAIL_SLACK: break  # wait for the rest of the header
+                        pos = k + 4; continue
+                    hdr, hdr_start, body_start = hdr_block
+                    data_sz = hdr.unpack(4, '<H') if hdr.length(4) else 0
+                    if body_start + data_sz + 12 > size:
+                        pos = k - 1; break  # record still being written
+                    item = _decode_record(mm, hdr, hdr_start, body_start, size, crc_mode, crc_batch, body_t)
+                    pos = hdr_start + item.hop if item.hop else item.trailer_pos + 2
+                    if hdr_start <= last_ofs:
+                        pos = max(pos, k + 1); continue
+                    last_ofs = hdr_start
+                    yield _record_from_item(item)
+                    count += 1
+                    if limit_records and count >= limit_records: return
+                    if stop and stop(): return
+            if crc_batch: crc_batch.flush()  # check what this poll walked before idling
+            if idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+                return
+            time.sleep(delay)
+            delay = min(max_poll_interval, delay * 2)
+    finally:
+        if crc_batch: crc_batch.flush()
+        if mm is not None: mm.close()
+        f.close()
+
+def _row_from_item(it: WalkItem) -> tuple:
+    """WalkItem -> tuple in record_columns.RECORD_DTYPE order (same defaults as _record_from_item)."""
+    return (it.hdr_start,
+            it.channel_id if it.channel_id is not None else 0,
+            it.seq, it.time_ms,
+            it.lat if it.lat is not None else 0.0,
+            it.lon if it.lon is not None else 0.0,
+            it.depth_m if it.depth_m is not None else 0.0,
+            it.sample_cnt if it.sample_cnt is not None else 0,
+            it.sonar_ofs, it.sonar_size,
+            it.beam_deg if it.beam_deg is not None else 0.0,
+            0.0, 0.0, _NAN, _NAN, _NAN, -1)
+
+_NAN = float('nan')
+
+def parse_rsd_batches_nextgen(path:str, batch_size:int=65536, limit_records:int=0,
+                              progress:Callable[[float,str],None]=None, crc_mode:str='warn',
+                              workers:int=1):
+    """Like parse_rsd_records_nextgen but yields RECORD_DTYPE structured arrays
+    of up to `batch_size` records (no per-record dataclass)."""
+    import numpy as np
+    from record_columns import RECORD_DTYPE, iter_batches
+    if workers and workers > 1:
+        yield from iter_batches(parse_rsd_records_parallel(path, workers=workers, limit_records=limit_records,
+                                                           progress=progress, crc_mode=crc_mode), batch_size)
+        return
+    with progress_hook(progress):
+        size=os.path.getsize(path)
+        with open(path,'rb') as f:
+            mm=mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+            try:
+                crc_batch = CrcBatch(mm) if crc_mode == 'batch' else None
+                _emit(0.0, "Scanning file for sonar data...")
+                pos = _first_header_pos(mm, size)
+                if pos is None:
+                    _emit(0.0, "No sonar data found in file"); return
+                rows=[]; count=0
+                for item, _nxt in _walk(mm, pos, size, crc_mode, crc_batch):
+                    rows.append(_row_from_item(item)); count += 1
+                    if len(rows) >= batch_size:
+                        _emit(min(95.0, (item.trailer_pos/size)*100.0), f"Processing sonar records... ({count} found)")
+                        yield np.array(rows, dtype=RECORD_DTYPE); rows=[]
+                    if limit_records and count >= limit_records: break
+                if rows: yield np.array(rows, dtype=RECORD_DTYPE)
+                _emit(100.0, f"✓ Parsing complete! Found {count} sonar records")
+            finally:
+                if crc_batch: crc_batch.flush()
+                mm.close()
+
+
+def _parse_shard(path:str, start:int, end:int, crc_mode:str='warn'):
+    """Worker: walk from `start` and collect records whose header is < `end`.
+    Returns (items as plain tuples, handoff) where handoff is the first header
+    offset at/after `end`, or None if the hop chain ended inside the shard."""
+    with open(path,'rb') as f:
+        mm=mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+        crc_batch = CrcBatch(mm) if crc_mode == 'batch' else None
+        try:
+            items=[]; gen=_walk(mm, start, len(mm), crc_mode, crc_batch, end=end)
+            while True:
+                try: item,_nxt = next(gen)
+                except StopIteration as stop: return items, stop.value
+                items.append(tuple(item))
+        finally:
+            if crc_batch: crc_batch.flush()
+            mm.close()
+
+def parse_rsd_records_parallel(path:str, workers:Optional[int]=None, limit_records:int=0,
+                               progress:Callable[[float,str],None]=None, crc_mode:str='warn',
+                               shards:Optional[int]=None) -> Iterable[RSDRecord]:
+    """Sharded multi-process variant of parse_rsd_records_nextgen.
+
+    The file is cut into byte ranges; each worker syncs forward to the next
+    valid header and walks its range. Shard results are spliced onto the
+    sequential hop chain (the header the previous shard handed off to), so a
+    shard that synced onto a false header is trimmed, a gap is re-walked in
+    this process, and records are emitted once, in file order -- the same
+    sequence the sequential engine yields.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    with progress_hook(progress):
+        workers = workers or os.cpu_count() or 1
+        size=os.path.getsize(path)
+        with open(path,'rb') as f:
+            mm=mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+        crc_batch = CrcBatch(mm) if crc_mode == 'batch' else None  # for re-walks in this process
+        try:
+            _emit(0.0, "Scanning file for sonar data...")
+            first = _first_header_pos(mm, size)
+            if first is None:
+                _emit(0.0, "No sonar data found in file"); return
+            shards = max(1, shards or workers*4)
+            step = max(1, (size-first)//shards)
+            bounds = [first + k*step for k in range(shards)] + [size]
+            bounds = sorted(set(bounds))
+            ranges = list(zip(bounds[:-1], bounds[1:]))
+            _emit(5.0, f"Parsing {len(ranges)} shards on {workers} workers...")
+
+            count=0; cur=first; last_ofs=-1
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                pending=[]; it_ranges=iter(ranges)
+                def _fill():
+                    while len(pending) < workers*2:
+                        nxt_range = next(it_ranges, None)
+                        if nxt_range is None: return
+                        pending.append((nxt_range, ex.submit(_parse_shard, path, nxt_range[0], nxt_range[1], crc_mode)))
+                _fill()
+                while pending and cur is not None:
+                    (s_start, s_end), fut = pending.pop(0)
+                    items, handoff = fut.result(); _fill()
+                    if cur >= s_end:
+                        continue  # an earlier re-walk already covered this range
+                    offsets = {t[0]: i for i,t in enumerate(items)}
+                    out=[]; splice=None
+                    if cur in offsets:
+                        splice = offsets[cur]
+                    else:
+                        # resync: walk here from `cur` until we meet the shard's chain
+                        gen=_walk(mm, cur, size, crc_mode, crc_batch, end=s_end)
+                        try:
+                            while True:
+                                item,_nxt = next(gen)
+                                if item.hdr_start in offsets:
+                                    splice = offsets[item.hdr_start]; break
+                                out.append(item)
+                        except StopIteration as stop:
+                            handoff = stop.value
+                    if splice is not None:
+                        out.extend(WalkItem._make(t) for t in items[splice:])
+                    for item in out:
+                        if item.hdr_start <= last_ofs: continue
+                        last_ofs = item.hdr_start
+                        yield _record_from_item(item)
+                        count += 1
+                        if limit_records and count >= limit_records:
+                            cur = None; break
+                    else:
+                        cur = handoff
+                    _emit(min(95.0, (s_end/size)*100.0), f"Processing sonar records... ({count} found)")
+                for _r, fut in pending: fut.cancel()
+            _emit(100.0, f"✓ Parsing complete! Found {count} sonar records")
+        finally:
+            if crc_batch: crc_batch.flush()
+            mm.close()
+
+
+CHECKPOINT_SUFFIX = '.ckpt'
+CHECKPOINT_EVERY = 10000
+
+class ParseCancelled(Exception):
+    """Raised when check_cancel() asks a parse to stop (a checkpoint is kept)."""
+
+def checkpoint_path(csv_path: str) -> str:
+    return csv_path + CHECKPOINT_SUFFIX
+
+def _save_checkpoint(csv_path: str, rsd_path: str, last_ofs: int, count: int, csv_bytes: int):
+    st = os.stat(rsd_path)
+    state = {'rsd_path': os.path.abspath(rsd_path), 'rsd_size': st.st_size, 'rsd_mtime_ns': st.st_mtime_ns,
+             'last_ofs': last_ofs, 'count': count, 'csv_bytes': csv_bytes}
+    tmp = checkpoint_path(csv_path) + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, checkpoint_path(csv_path))
+
+def load_checkpoint(csv_path: str, rsd_path: str) -> Optional[Dict[str, Any]]:
+    """Checkpoint for `csv_path` if it matches `rsd_path` (path, size, mtime)
+    and the CSV still holds at least the checkpointed bytes; else None."""
+    try:
+        with open(checkpoint_path(csv_path)) as f:
+            state = json.load(f)
+        st = os.stat(rsd_path)
+        ok = (state['rsd_path'] == os.path.abspath(rsd_path) and state['rsd_size'] == st.st_size
+              and state['rsd_mtime_ns'] == st.st_mtime_ns
+              and os.path.getsize(csv_path) >= state['csv_bytes'])
+    except (OSError, ValueError, KeyError):
+        return None
+    return state if ok else None
+
+def _drop_checkpoint(csv_path: str):
+    try: os.remove(checkpoint_path(csv_path))
+    except OSError: pass
+
+def write_parsed_records(rsd_path: str, csv_path: str, log_path: str,
+                         max_records: Optional[int] = None, workers: int = 1,
+                         columnar: Optional[str] = None, write_csv: bool = True,
+                         progress: Callable[[float,str],None] = None, resume: bool = False,
+                         checkpoint_every: int = CHECKPOINT_EVERY,
+                         check_cancel: Optional[Callable[[], bool]] = None,
+                         ping_store: bool = False) -> Tuple[int, str, str]:
+    """Parse `rsd_path` into the 18-column CSV and/or a columnar record file
+    (written beside `csv_path` as .parquet/.npy, see record_columns).
+    With write_csv=False the second return value is the columnar file's path.
+    ping_store=True also writes the per-channel ping matrices (see ping_store).
+
+    Sequential CSV-only runs save `<csv>.ckpt` every `checkpoint_every`
+    records (0 disables) and when check_cancel() returns True, which raises
+    ParseCancelled. resume=True truncates the CSV back to the checkpoint and
+    appends from the next record; without a valid checkpoint it parses from
+    the start. The checkpoint is removed once the parse completes.
+    Returns (record_count, output_path, log_path).
+    """
+    if not write_csv and not columnar:
+        columnar = 'auto'
+
     # CSV header - must match what GUI expects
     header = [
         "ofs", "channel_id", "seq", "time_ms", "lat", "lon", "depth_m", 
@@ -170,14 +653,44 @@ def parse_rsd(rsd_path: str, out_dir: str, max_records: Optional[int] = None) ->
     ]
     
     record_count = 0
-    
-    # Parse records and write to CSV
-    with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(header)
-        
-        try:
-            for record in parse_rsd_records_nextgen(rsd_path, limit_records=max_records):
+    csvfile = writer = col = None
+    limit = max_records or 0
+    ckpt = load_checkpoint(csv_path, rsd_path) if (resume and write_csv and not columnar) else None
+    checkpointing = write_csv and not columnar and (ckpt is not None or not (workers and workers > 1))
+    start_after = None
+
+    try:
+        if ckpt:
+            with open(csv_path, 'r+b') as f:
+                f.truncate(ckpt['csv_bytes'])
+            csvfile = open(csv_path, 'a', newline='', encoding='utf-8')
+            writer = csv.writer(csvfile)
+            record_count = ckpt['count']; start_after = ckpt['last_ofs']
+            _emit(0.0, f"Resuming after {record_count} records")
+        elif write_csv:
+            _drop_checkpoint(csv_path)
+            csvfile = open(csv_path, 'w', newline='', encoding='utf-8')
+            writer = csv.writer(csvfile)
+            writer.writerow(header)
+        if columnar:
+            from record_columns import ColumnarWriter, csv_rows
+            col = ColumnarWriter(os.path.splitext(csv_path)[0], columnar)
+            for batch in parse_rsd_batches_nextgen(rsd_path, limit_records=limit, progress=progress, workers=workers):
+                col.write(batch)
+                if writer: writer.writerows(csv_rows(batch))
+                record_count += len(batch)
+                if check_cancel and check_cancel(): raise ParseCancelled(f"Parse cancelled after {record_count} records")
+            col.close()
+        elif limit and record_count >= limit:
+            pass  # checkpoint already covers max_records
+        else:
+            remaining = limit - record_count if limit else 0
+            if checkpointing:
+                records = parse_rsd_records_nextgen(rsd_path, limit_records=remaining, progress=progress,
+                                                    start_after=start_after)
+            else:
+                records = parse_rsd_records_parallel(rsd_path, workers=workers, limit_records=remaining, progress=progress)
+            for record in records:
                 writer.writerow([
                     record.ofs,
                     record.channel_id,
@@ -199,11 +712,47 @@ def parse_rsd(rsd_path: str, out_dir: str, max_records: Optional[int] = None) ->
                     "{}"  # Empty JSON for extras
                 ])
                 record_count += 1
-                
-        except Exception as e:
-            # Write error to log
-            with open(log_path, 'w') as log_file:
-                log_file.write(f"Parse error: {str(e)}\n")
-            raise
-    
-    return record_count, csv_path, log_path
+                cancel = check_cancel is not None and check_cancel()
+                if checkpointing and (cancel or (checkpoint_every and record_count % checkpoint_every == 0)):
+                    csvfile.flush()
+                    _save_checkpoint(csv_path, rsd_path, record.ofs, record_count, csvfile.buffer.tell())
+                if cancel:
+                    raise ParseCancelled(f"Parse cancelled after {record_count} records")
+
+    except Exception as e:
+        if col: col.abort()
+        # Write error to log
+        with open(log_path, 'w') as log_file:
+            log_file.write(f"Parse error: {str(e)}\n")
+        raise
+    finally:
+        if csvfile: csvfile.close()
+
+    if write_csv: _drop_checkpoint(csv_path)
+    out_path = csv_path if write_csv else col.path
+    if ping_store:
+        from ping_store import build_ping_store
+        build_ping_store(rsd_path, out_path, progress=progress)
+    return record_count, out_path, log_path
+
+
+def parse_rsd(rsd_path: str, out_dir: str, max_records: Optional[int] = None,
+              workers: int = 1, columnar: Optional[str] = None,
+              write_csv: bool = True, resume: bool = False,
+              check_cancel: Optional[Callable[[], bool]] = None,
+              ping_store: bool = False) -> Tuple[int, str, str]:
+    """Parse RSD file and write records to CSV (and/or a columnar file).
+    workers > 1 uses the sharded multi-process parser (same rows, same order).
+    columnar: None, 'auto', 'parquet' or 'npy'; write_csv=False skips the CSV.
+    resume=True continues an interrupted parse from `<csv>.ckpt`.
+    ping_store=True writes `<name>.ch<N>.pings.npy` matrices beside the output.
+    Returns (record_count, csv_path, log_path).
+    """
+    # Setup output paths
+    os.makedirs(out_dir, exist_ok=True)
+    base_name = os.path.splitext(os.path.basename(rsd_path))[0]
+    csv_path = os.path.join(out_dir, f"{base_name}.csv")
+    log_path = os.path.join(out_dir, f"{base_name}.log")
+    return write_parsed_records(rsd_path, csv_path, log_path, max_records=max_records,
+                                workers=workers, columnar=columnar, write_csv=write_csv,
+                                resume=resume, check_cancel=check_cancel, ping_store=ping_store)
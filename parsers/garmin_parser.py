@@ -19,20 +19,27 @@ class GarminParser(BaseSonarParser):
         self.format_type = "garmin_rsd"
         self._cached_channels = None
         self._cached_record_count = None
+        self._index = None
         
-    def parse_records(self, max_records: Optional[int] = None, progress_callback=None) -> Tuple[int, str, str]:
+    def parse_records(self, max_records: Optional[int] = None, progress_callback=None,
+                      columnar: Optional[str] = None, write_csv: bool = True,
+                      ping_store: bool = False, check_cancel=None,
+                      resume: bool = False) -> Tuple[int, str, str]:
         """
         Parse Garmin RSD records using enhanced engine
         
         Args:
             max_records: Maximum number of records to parse (None for all)
             progress_callback: Optional callback function for progress updates (pct, message)
+            columnar: Also write a columnar record file ('auto', 'parquet' or 'npy')
+            write_csv: Write the CSV export; when False the returned path is the columnar file
+            ping_store: Also write per-channel memory-mappable ping matrices (see ping_store)
+            check_cancel: Optional callable; when it returns True a checkpoint is
+                saved and ParseCancelled is raised
+            resume: Continue from the checkpoint of an earlier cancelled parse
         """
         # Use our existing engine with improvements
-        from engine_nextgen_syncfirst import parse_rsd_records_nextgen
-        from pathlib import Path
-        import csv
-        import os
+        from engine_nextgen_syncfirst import write_parsed_records
         
         file_path_obj = Path(self.file_path)
         output_dir = file_path_obj.parent / "parsed_output"
@@ -42,75 +49,21 @@ class GarminParser(BaseSonarParser):
         csv_path = str(output_dir / csv_name)
         log_path = str(output_dir / f"{file_path_obj.stem}_parsed.log")
         
-        # CSV header - must match what GUI expects
-        header = [
-            "ofs", "channel_id", "seq", "time_ms", "lat", "lon", "depth_m", 
-            "sample_cnt", "sonar_ofs", "sonar_size", "beam_deg", "pitch_deg", 
-            "roll_deg", "heave_m", "tx_ofs_m", "rx_ofs_m", "color_id", "extras_json"
-        ]
-        
-        record_count = 0
-        
-        # Parse records and write to CSV
-        with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(header)
-            
-            try:
-                for record in parse_rsd_records_nextgen(str(self.file_path), limit_records=max_records, progress=progress_callback):
-                    writer.writerow([
-                        record.ofs,
-                        record.channel_id,
-                        record.seq,
-                        record.time_ms,
-                        record.lat,
-                        record.lon,
-                        record.depth_m,
-                        record.sample_cnt,
-                        record.sonar_ofs,
-                        record.sonar_size,
-                        record.beam_deg,
-                        record.pitch_deg,
-                        record.roll_deg,
-                        record.heave_m,
-                        record.tx_ofs_m,
-                        record.rx_ofs_m,
-                        record.color_id,
-                        "{}"  # Empty JSON for extras
-                    ])
-                    record_count += 1
-                    
-            except Exception as e:
-                # Write error to log
-                with open(log_path, 'w') as log_file:
-                    log_file.write(f"Parse error: {str(e)}\n")
-                raise
-        
-        return record_count, csv_path, log_path
+        return write_parsed_records(str(self.file_path), csv_path, log_path,
+                                    max_records=max_records, columnar=columnar,
+                                    write_csv=write_csv, progress=progress_callback,
+                                    ping_store=ping_store, check_cancel=check_cancel,
+                                    resume=resume)
     
     def get_channels(self) -> List[int]:
         """
-        Get available channels in Garmin RSD file
+        Get available channels in Garmin RSD file (from the .rsdidx sidecar)
         """
         if self._cached_channels is not None:
             return self._cached_channels
             
         try:
-            # Quick parse to get channel info
-            from engine_nextgen_syncfirst import parse_rsd_records_nextgen
-            
-            channels = set()
-            record_count = 0
-            
-            # Sample first 1000 records to get channel list
-            for record in parse_rsd_records_nextgen(str(self.file_path), limit_records=1000):
-                channels.add(record.channel_id)
-                record_count += 1
-                
-                if record_count >= 1000:  # Limit for channel detection
-                    break
-            
-            self._cached_channels = sorted(list(channels))
+            self._cached_channels = self.get_index().channels()
             return self._cached_channels
             
         except Exception as e:
@@ -119,30 +72,45 @@ class GarminParser(BaseSonarParser):
     
     def get_record_count(self) -> int:
         """
-        Get total number of records in Garmin RSD file
+        Get total number of records in Garmin RSD file (from the .rsdidx
+        sidecar when one is loaded or on disk, else a hop-chain count)
         """
         if self._cached_record_count is not None:
             return self._cached_record_count
             
         try:
-            # Fast record counting without full parse
-            from engine_nextgen_syncfirst import count_rsd_records
-            
-            # If count function doesn't exist, estimate from file size
-            try:
+            from rsd_index import open_index
+            if self._index is None:
+                self._index = open_index(str(self.file_path))
+            if self._index is not None:
+                self._cached_record_count = len(self._index)
+            else:
+                from engine_nextgen_syncfirst import count_rsd_records
                 self._cached_record_count = count_rsd_records(str(self.file_path))
-            except AttributeError:
-                # Fallback: estimate from file size (rough approximation)
-                file_size = self.file_path.stat().st_size
-                avg_record_size = 4100  # Typical RSD record size in bytes
-                self._cached_record_count = file_size // avg_record_size
-                
             return self._cached_record_count
             
         except Exception as e:
             print(f"Warning: Could not count records: {e}")
             return 0
     
+    def survey(self, sample_pings: int = 1000) -> Dict:
+        """
+        Quick file statistics: record count, channel histogram, time span,
+        bounding box from sampled pings and corrupt regions
+        """
+        from engine_nextgen_syncfirst import survey_rsd
+        return survey_rsd(str(self.file_path), sample_pings=sample_pings)
+    
+    def get_index(self, progress_callback=None):
+        """
+        Record offset index, loaded from `<file>.rsdidx` when it matches the
+        file's size/mtime, otherwise built once and saved beside the file
+        """
+        if self._index is None:
+            from rsd_index import load_or_build_index
+            self._index = load_or_build_index(str(self.file_path), progress=progress_callback)
+        return self._index
+    
     def analyze_depth_fields(self, sample_size: int = 1000) -> Dict:
         """
         Analyze depth-related fields to understand encoding
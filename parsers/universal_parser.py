@@ -217,14 +217,21 @@ class UniversalSonarParser:
         else:
             raise ValueError(f"Unsupported format: {self.format_type}")
     
-    def parse_records(self, max_records: Optional[int] = None, progress_callback=None) -> Tuple[int, str, str]:
+    def parse_records(self, max_records: Optional[int] = None, progress_callback=None,
+                      check_cancel=None, resume: bool = False) -> Tuple[int, str, str]:
         """
         Universal parsing interface
         
         Args:
             max_records: Maximum number of records to parse (None for all)
             progress_callback: Optional callback function for progress updates (pct, message)
+            check_cancel: Optional cancel poll (formats with checkpointing, i.e. Garmin RSD)
+            resume: Resume a cancelled parse from its checkpoint (Garmin RSD)
         """
+        from .garmin_parser import GarminParser
+        if isinstance(self.parser, GarminParser):
+            return self.parser.parse_records(max_records, progress_callback,
+                                             check_cancel=check_cancel, resume=resume)
         return self.parser.parse_records(max_records, progress_callback)
     
     def get_channels(self) -> List[int]:
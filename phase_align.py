@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# phase_align.py — batched phase-correlation shift estimation shared by the block pipeline and video export
+"""
+Phase-correlation alignment of left/right sidescan rows.
+
+All rows of a block go through one real FFT over a 2-D stack instead of one
+complex FFT per row pair. Everything that depends only on the row width
+(window, candidate peak positions, padded FFT length) is built once and
+cached:
+
+    shifts = row_shifts(left_rows, right_rows, max_shift=50)   # one per row
+    shift, confidence = block_shift(left_rows, right_rows)     # median + spread
+    shift, score = band_shift(L, R, max_shift=64)               # video seam profile
+
+row_shifts() returns exactly what calculate_phase_correlation_shift() gave
+for each row on its own; _row_shift_reference() keeps that implementation
+for tests and benchmark_alignment.py.
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+_WINDOWS: Dict[int, np.ndarray] = {}
+_CANDIDATES: Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray]] = {}
+
+
+def hanning(width: int) -> np.ndarray:
+    """Cached float32 Hanning window (read-only)"""
+    w = _WINDOWS.get(width)
+    if w is None:
+        w = np.hanning(width).astype(np.float32)
+        w.flags.writeable = False
+        _WINDOWS[width] = w
+    return w
+
+
+def _candidates(width: int, max_shift: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Correlation indices in the order the peak search visits them
+    (0, +1, -1, +2, -2, ...) and the shift each one stands for."""
+    key = (width, max_shift)
+    c = _CANDIDATES.get(key)
+    if c is None:
+        r = min(max_shift, width // 4)
+        steps = np.arange(1, r + 1)
+        shifts = np.empty(2 * r + 1, dtype=np.int64)
+        shifts[0] = 0
+        shifts[1::2] = steps
+        shifts[2::2] = -steps
+        c = _CANDIDATES[key] = (shifts % width, shifts)
+    return c
+
+
+def row_shifts(left_rows: np.ndarray, right_rows: np.ndarray, max_shift: int = 50) -> np.ndarray:
+    """Per-row horizontal shift of `right_rows` against `left_rows` ((n, w) arrays)."""
+    left_rows = np.atleast_2d(left_rows)
+    right_rows = np.atleast_2d(right_rows)
+    n = min(len(left_rows), len(right_rows))
+    width = min(left_rows.shape[1], right_rows.shape[1])
+    if n == 0 or width == 0:
+        return np.zeros(n, dtype=np.int64)
+    window = hanning(width)
+    a = (left_rows[:n, :width].astype(np.float32) * window).astype(np.float64)
+    b = (right_rows[:n, :width].astype(np.float32) * window).astype(np.float64)
+    cross = np.fft.rfft(a, axis=1)
+    cross *= np.conj(np.fft.rfft(b, axis=1))
+    cross /= np.abs(cross) + 1e-10
+    corr = np.abs(np.fft.irfft(cross, n=width, axis=1))
+    idx, shifts = _candidates(width, max_shift)
+    return shifts[np.argmax(corr[:, idx], axis=1)]
+
+
+def block_shift(left_rows: np.ndarray, right_rows: np.ndarray, max_shift: int = 50) -> Tuple[int, float]:
+    """Consensus (median) shift of a block and a confidence from the spread of row shifts"""
+    shifts = row_shifts(left_rows, right_rows, max_shift)
+    if not len(shifts):
+        return 0, 0.0
+    spread = np.std(shifts)
+    return int(np.median(shifts)), float(1.0 - spread / (spread + 10.0))
+
+
+def band_shift(L: np.ndarray, R: np.ndarray, max_shift: int) -> Tuple[int, float]:
+    """Seam shift between the inner edges of two half-frames (video export).
+
+    Correlates the middle third of the rows of L's right edge and R's left
+    edge (up to 128 columns each, zero-padded to a power of two), averages
+    the phase-correlation profiles and returns (shift, peak score).
+    """
+    if L.size == 0 or R.size == 0:
+        return 0, 0.0
+    h = min(L.shape[0], R.shape[0]); wL = L.shape[1]; wR = R.shape[1]
+    if h < 8 or wL < 8 or wR < 8:
+        return 0, 0.0
+    band = slice(max(0, h // 3), min(h, 2 * h // 3))
+    A = L[band, -min(128, wL):].astype(np.float32)
+    B = R[band, :min(128, wR)].astype(np.float32)
+    if A.size == 0 or B.size == 0:
+        return 0, 0.0
+    A -= A.mean(); B -= B.mean()
+    W = 1 << int(np.ceil(np.log2(max(A.shape[1], B.shape[1]) * 2)))
+    FA = np.fft.rfft(A, n=W, axis=1); FB = np.fft.rfft(B, n=W, axis=1)
+    Rsp = FA * np.conj(FB)
+    prof = np.fft.irfft(Rsp / (np.abs(Rsp) + 1e-6), n=W, axis=1).mean(axis=0)
+    if not np.isfinite(prof).any():
+        return 0, 0.0
+    peak = int(np.nanargmax(prof)); peak -= (prof.size if peak > prof.size // 2 else 0)
+    shift = int(np.clip(peak, -max_shift, max_shift))
+    maxv = float(np.nanmax(prof))
+    score = float(prof[peak if peak >= 0 else peak + prof.size] / (maxv + 1e-6)) if np.isfinite(maxv) and maxv > 0 else 0.0
+    return shift, score if np.isfinite(score) else 0.0
+
+
+def _row_shift_reference(left_row: np.ndarray, right_row: np.ndarray, max_shift: int = 50) -> int:
+    """Original single-row complex-FFT implementation (reference for tests/benchmark)"""
+    min_width = min(len(left_row), len(right_row))
+    left_row = left_row[:min_width].astype(np.float32)
+    right_row = right_row[:min_width].astype(np.float32)
+    window = np.hanning(min_width)
+    left_row *= window
+    right_row *= window
+    cross_power = np.fft.fft(left_row) * np.conj(np.fft.fft(right_row))
+    cross_power /= (np.abs(cross_power) + 1e-10)
+    correlation = np.abs(np.fft.ifft(cross_power))
+    shift_range = min(max_shift, min_width // 4)
+    best_shift = 0
+    best_score = correlation[0]
+    for shift in range(1, shift_range + 1):
+        if correlation[shift] > best_score:
+            best_score = correlation[shift]
+            best_shift = shift
+        neg_idx = min_width - shift
+        if correlation[neg_idx] > best_score:
+            best_score = correlation[neg_idx]
+            best_shift = -shift
+    return int(best_shift)
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# ping_store.py — per-channel padded ping matrices (.npy) built from parsed RSD records
+"""
+Per-channel ping matrix store.
+
+After a parse, every channel's sonar samples can be copied out of the RSD
+into one contiguous, zero-padded uint8 matrix (pings x max samples) plus a
+small index of (record row, sonar_ofs, length) per ping:
+
+    <base>.ch4.pings.npy    uint8  (n_pings, width)
+    <base>.ch4.index.npy    PING_INDEX_DTYPE (n_pings,)
+    <base>.pings.json       channels, shapes and the RSD size/mtime
+
+`<base>` is the record file's path without its extension, so the store sits
+beside the CSV/columnar output. Loading memory-maps the matrices, so a whole
+waterfall is a NumPy slice with no per-ping file I/O:
+
+    build_ping_store("Sonar000.RSD", "out/Sonar000.csv")
+    store = PingStore.open("out/Sonar000.csv")
+    wf = store.block(4, 1000, 1050)          # (50, width) view
+    row = store.ping(4, 1000)                # unpadded samples of one ping
+"""
+
+import json
+import mmap
+import os
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+PING_STORE_VERSION = 1
+MANIFEST_SUFFIX = '.pings.json'
+OUTLIER_FACTOR = 4         # default width cap: this many times the 99th-percentile ping length
+PING_INDEX_DTYPE = np.dtype([
+    ('row', '<i8'),         # record row in the parsed CSV/columnar file
+    ('sonar_ofs', '<i8'),
+    ('length', '<i4'),      # valid samples in the padded matrix row
+])
+
+
+def store_base(records_path: str) -> str:
+    return os.path.splitext(str(records_path))[0]
+
+
+def _matrix_path(base: str, channel: int) -> str:
+    return f"{base}.ch{channel}.pings.npy"
+
+
+def _index_path(base: str, channel: int) -> str:
+    return f"{base}.ch{channel}.index.npy"
+
+
+def _source_stamp(rsd_path: str):
+    st = os.stat(rsd_path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _record_columns(records_path: str):
+    """channel_id, sonar_ofs, sonar_size columns of a parsed record file (nulls -> -1)."""
+    from record_columns import is_columnar, load_columnar
+    if is_columnar(records_path):
+        arr = load_columnar(records_path)
+        return (np.asarray(arr['channel_id'], dtype=np.int64),
+                np.asarray(arr['sonar_ofs'], dtype=np.int64),
+                np.asarray(arr['sonar_size'], dtype=np.int64))
+    import pandas as pd
+    df = pd.read_csv(records_path, usecols=['channel_id', 'sonar_ofs', 'sonar_size'])
+    return tuple(df[c].fillna(-1).to_numpy(dtype=np.int64) for c in ('channel_id', 'sonar_ofs', 'sonar_size'))
+
+
+def _store_width(lengths: np.ndarray, max_width: Optional[int] = None) -> int:
+    """Matrix width for one channel: the longest ping, capped at `max_width`
+    or by default at OUTLIER_FACTOR x the 99th percentile of the non-empty
+    lengths, so one corrupt record (whose fallback payload can run to ~64 KB)
+    does not widen every row of the channel."""
+    present = lengths[lengths > 0]
+    if not len(present):
+        return 0
+    cap = max_width if max_width is not None else OUTLIER_FACTOR * int(np.ceil(np.percentile(present, 99)))
+    return int(min(present.max(), cap))
+
+
+def build_ping_store(rsd_path: str, records_path: str, channels: Optional[List[int]] = None,
+                     progress: Optional[Callable[[float, str], None]] = None,
+                     max_width: Optional[int] = None) -> Optional['PingStore']:
+    """Copy each channel's samples into `<base>.ch<N>.pings.npy` and write the manifest.
+
+    `records_path` is the CSV or columnar file produced by the parse; its row
+    order defines the ping order. Pings without a payload (or past the end
+    of the file) get length 0. Pings longer than the channel's width (see
+    _store_width; `max_width` sets it explicitly) are truncated to it and
+    counted as 'clipped' in the manifest. Returns the opened store.
+    """
+    base = store_base(records_path)
+    ch_col, ofs_col, size_col = _record_columns(records_path)
+    wanted = sorted(int(c) for c in np.unique(ch_col) if c >= 0) if channels is None else list(channels)
+    file_size, mtime_ns = _source_stamp(rsd_path)
+    manifest = {'version': PING_STORE_VERSION, 'rsd_path': os.path.abspath(rsd_path),
+                'rsd_size': file_size, 'rsd_mtime_ns': mtime_ns, 'channels': {}}
+
+    with open(rsd_path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if file_size else None
+        try:
+            for k, ch in enumerate(wanted):
+                rows = np.nonzero(ch_col == ch)[0]
+                ofs = ofs_col[rows]
+                lengths = np.where((ofs >= 0) & (size_col[rows] > 0),
+                                   np.clip(np.minimum(size_col[rows], file_size - ofs), 0, None), 0)
+                width = _store_width(lengths, max_width)
+                clipped = int(np.count_nonzero(lengths > width))
+                lengths = np.minimum(lengths, width)
+                index = np.empty(len(rows), dtype=PING_INDEX_DTYPE)
+                index['row'] = rows; index['sonar_ofs'] = ofs; index['length'] = lengths
+
+                if len(rows) and width:
+                    mat_path = _matrix_path(base, ch)
+                    mat = np.lib.format.open_memmap(mat_path + '.tmp', mode='w+', dtype=np.uint8,
+                                                    shape=(len(rows), width))
+                    for i, (o, n) in enumerate(zip(ofs.tolist(), lengths.tolist())):
+                        if n:
+                            mat[i, :n] = np.frombuffer(mm, dtype=np.uint8, count=n, offset=o)
+                    mat.flush(); del mat
+                    os.replace(mat_path + '.tmp', mat_path)
+                np.save(_index_path(base, ch), index)
+                manifest['channels'][str(ch)] = {'pings': int(len(rows)), 'width': width, 'clipped': clipped}
+                if progress:
+                    progress((k + 1) * 100.0 / len(wanted), f"Ping store: channel {ch} ({len(rows)} pings)")
+        finally:
+            if mm is not None: mm.close()
+
+    tmp = base + MANIFEST_SUFFIX + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, base + MANIFEST_SUFFIX)
+    return PingStore.open(records_path)
+
+
+class PingStore:
+    """Memory-mapped per-channel ping matrices written by build_ping_store."""
+
+    def __init__(self, base: str, manifest: Dict):
+        self.base = base
+        self.manifest = manifest
+        self.rsd_path = manifest.get('rsd_path')
+        self._mats: Dict[int, np.ndarray] = {}
+        self._index: Dict[int, np.ndarray] = {}
+        self._order: Dict[int, Optional[np.ndarray]] = {}
+
+    @classmethod
+    def open(cls, records_path: str, rsd_path: Optional[str] = None) -> Optional['PingStore']:
+        """Open the store beside `records_path`. Returns None if missing or stale
+        (the RSD named in the manifest, or `rsd_path`, changed since the build)."""
+        base = store_base(records_path)
+        try:
+            with open(base + MANIFEST_SUFFIX) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('version') != PING_STORE_VERSION:
+            return None
+        src = rsd_path or manifest.get('rsd_path')
+        try:
+            if src and _source_stamp(src) != (manifest['rsd_size'], manifest['rsd_mtime_ns']):
+                return None
+        except OSError:
+            pass  # RSD moved away: the matrices are self-contained
+        return cls(base, manifest)
+
+    def channels(self) -> List[int]:
+        return sorted(int(c) for c in self.manifest['channels'])
+
+    def __contains__(self, channel: int) -> bool:
+        return str(channel) in self.manifest['channels']
+
+    def __len__(self) -> int:
+        return sum(c['pings'] for c in self.manifest['channels'].values())
+
+    def matrix(self, channel: int) -> np.ndarray:
+        """(pings, width) uint8 memmap for `channel`, zero-padded past each ping's length."""
+        if channel not in self._mats:
+            if channel not in self:
+                raise KeyError(f"channel {channel} not in ping store")
+            info = self.manifest['channels'][str(channel)]
+            if info['pings'] and info['width']:
+                self._mats[channel] = np.load(_matrix_path(self.base, channel), mmap_mode='r')
+            else:
+                self._mats[channel] = np.zeros((info['pings'], info['width']), dtype=np.uint8)
+        return self._mats[channel]
+
+    def index(self, channel: int) -> np.ndarray:
+        if channel not in self._index:
+            if channel not in self:
+                raise KeyError(f"channel {channel} not in ping store")
+            self._index[channel] = np.load(_index_path(self.base, channel))
+        return self._index[channel]
+
+    def lengths(self, channel: int) -> np.ndarray:
+        return self.index(channel)['length']
+
+    def ping(self, channel: int, i: int) -> np.ndarray:
+        """Samples of ping `i` on `channel` (a view, padding excluded)."""
+        return self.matrix(channel)[i, :int(self.index(channel)['length'][i])]
+
+    def block(self, channel: int, start: int, stop: int) -> np.ndarray:
+        """Padded (stop - start, width) view of consecutive pings."""
+        return self.matrix(channel)[start:stop]
+
+    def find(self, channel: int, sonar_ofs) -> np.ndarray:
+        """Ping numbers on `channel` for the given sonar offsets (-1 when absent)."""
+        col = self.index(channel)['sonar_ofs']
+        q = np.atleast_1d(np.asarray(sonar_ofs, dtype=np.int64))
+        if not len(col):
+            return np.full(len(q), -1, dtype=np.int64)
+        if channel not in self._order:  # parse order is file order, so normally already sorted
+            self._order[channel] = None if np.all(col[1:] >= col[:-1]) else np.argsort(col, kind='stable')
+        order = self._order[channel]
+        keys = col if order is None else col[order]
+        pos = np.clip(np.searchsorted(keys, q), 0, len(keys) - 1)
+        found = pos if order is None else order[pos]
+        return np.where((keys[pos] == q) & (q >= 0), found, -1)
+
+
+if __name__ == '__main__':
+    import sys, time
+    if len(sys.argv) < 3:
+        print("Usage: python ping_store.py <file.RSD> <records.csv|.npy|.parquet>")
+        sys.exit(1)
+    t = time.perf_counter()
+    store = build_ping_store(sys.argv[1], sys.argv[2])
+    for ch in store.channels():
+        print(f"channel {ch}: {store.matrix(ch).shape}")
+    print(f"built in {time.perf_counter() - t:.2f}s")
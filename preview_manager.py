@@ -3,15 +3,26 @@
 from typing import Optional, Tuple, List, Callable
 import threading
 import queue
+import time
 import numpy as np
 from PIL import Image
 from pathlib import Path
+from block_pipeline import ByteLRU, load_image_cached
 from color_manager import ColorManager
+from colormap_utils import to_uint8
 
 class PreviewManager:
-    """Handles real-time preview generation and updates."""
+    """Handles real-time preview generation and updates.
     
-    def __init__(self, update_callback: Optional[Callable] = None):
+    Decoded rows, the stacked grayscale preview and its colormapped copy are
+    cached, so a colormap change only re-applies the lookup table (and a
+    PREVIEW_HEIGHT change only rescales). Updates arriving within
+    `debounce` seconds of the first one are merged into one render, so a
+    slider drag redraws at least that often.
+    """
+    
+    def __init__(self, update_callback: Optional[Callable] = None, cache_bytes: int = 256 << 20,
+                 debounce: float = 0.03):
         self.color_manager = ColorManager()
         self._update_callback = update_callback
         self._preview_queue = queue.Queue()
@@ -19,6 +30,14 @@ class PreviewManager:
         self._running = False
         self._current_paths: List[str] = []
         self._current_config = {}
+        self.debounce = debounce
+        self.row_cache = ByteLRU(cache_bytes)
+        self._gray_key: Optional[tuple] = None
+        self._gray: Optional[np.ndarray] = None
+        self._seam_x: Optional[int] = None
+        self._color_key: Optional[tuple] = None
+        self._color: Optional[np.ndarray] = None
+        self.stats = {"requests": 0, "renders": 0, "lut_only": 0}
     
     def start(self):
         """Start preview processing thread."""
@@ -53,54 +72,96 @@ class PreviewManager:
         except queue.Full:
             pass # Skip if queue is full
     
+    def _drain(self, deadline: float):
+        """Take queued commands until `deadline` (time.monotonic()), then
+        whatever is already queued, so a burst renders once but a steady
+        stream of updates still renders every `debounce` seconds."""
+        while True:
+            wait = deadline - time.monotonic()
+            try:
+                if wait > 0:
+                    self._preview_queue.get(timeout=wait)
+                else:
+                    self._preview_queue.get_nowait()
+            except queue.Empty:
+                if wait > 0:
+                    continue  # woke early with nothing queued: wait out the window
+                return
+            self.stats["requests"] += 1
+    
     def _preview_loop(self):
-        """Main preview processing loop."""
+        """Main preview processing loop (coalesces bursts of updates)."""
         while self._running:
             try:
                 cmd, data = self._preview_queue.get(timeout=0.1)
                 if cmd == "update":
+                    self.stats["requests"] += 1
+                    self._drain(time.monotonic() + self.debounce)
                     self._generate_preview()
             except queue.Empty:
                 continue
             except Exception as e:
                 print(f"Preview error: {str(e)}")
     
+    def _stacked_gray(self, paths: List[str], cfg: dict) -> Tuple[np.ndarray, Optional[int]]:
+        """Full-size stacked preview before colouring and the seam column
+        (cached until the rows or SHOW_SEAM change)"""
+        rows = [load_image_cached(p, self.row_cache) for p in paths]
+        show_seam = bool(cfg.get("SHOW_SEAM", True))
+        if (self._gray is not None and self._gray_key[0] == show_seam
+                and len(self._gray_key[1]) == len(rows)
+                and all(a is b for a, b in zip(self._gray_key[1], rows))):
+            return self._gray, self._seam_x
+        
+        key_rows = tuple(rows)
+        rows = [r[..., :3] if r.ndim == 3 else to_uint8(r) for r in rows]
+        w = rows[0].shape[1]
+        if len(rows) > 1 and len({r.ndim for r in rows}) > 1:
+            rows = [np.stack([r] * 3, axis=2) if r.ndim == 2 else r for r in rows]
+        gray = np.hstack(rows) if len(rows) > 1 else rows[0]
+        seam_x = w - 1 if len(rows) > 1 and show_seam else None
+        
+        self._gray_key, self._gray, self._seam_x = (show_seam, key_rows), gray, seam_x
+        return gray, seam_x
+    
+    def _colored(self, gray: np.ndarray, seam_x: Optional[int], cmap: str) -> np.ndarray:
+        """Colormapped full-size preview with the seam drawn (cached per
+        colormap until the stacked rows change)"""
+        if self._color is not None and self._color_key[0] == cmap and self._color_key[1] is gray:
+            return self._color
+        preview = self.color_manager.apply(gray, cmap)
+        if seam_x is not None:
+            if preview is gray:
+                preview = preview.copy()
+            preview[:, seam_x:seam_x + 2] = [255, 0, 0]  # Red line
+        self._color_key, self._color = (cmap, gray), preview
+        return preview
+    
     def _generate_preview(self):
         """Generate preview from current paths and config."""
-        if not self._current_paths:
+        paths, cfg = self._current_paths, self._current_config
+        if not paths:
             return
             
         try:
-            # Load first image to get dimensions
-            img0 = np.array(Image.open(self._current_paths[0]))
-            h, w = img0.shape[:2]
-            
-            # Apply color map
-            cmap = self._current_config.get("COLORMAP", "grayscale")
-            preview = self.color_manager.apply(img0, cmap)
+            mode = cfg.get("PREVIEW_MODE", "auto")
+            use = paths[:2] if mode == "both" and len(paths) > 1 else paths[:1]
+            previous = self._gray
+            gray, seam_x = self._stacked_gray(use, cfg)
+            if gray is previous:
+                self.stats["lut_only"] += 1
             
-            # Handle preview mode
-            mode = self._current_config.get("PREVIEW_MODE", "auto")
-            if mode == "both" and len(self._current_paths) > 1:
-                img1 = np.array(Image.open(self._current_paths[1]))
-                preview1 = self.color_manager.apply(img1, cmap)
-                
-                # Stack side by side
-                preview = np.hstack([preview, preview1])
-                
-                # Add seam indicator if requested
-                if self._current_config.get("SHOW_SEAM", True):
-                    preview[:, w-1:w+1] = [255, 0, 0]  # Red line
+            # Apply color map (then scale, so palettes are interpolated as RGB)
+            preview = self._colored(gray, seam_x, cfg.get("COLORMAP", "grayscale"))
             
             # Scale preview if height specified
-            target_h = self._current_config.get("PREVIEW_HEIGHT")
-            if target_h:
+            target_h = cfg.get("PREVIEW_HEIGHT")
+            h = gray.shape[0]
+            if target_h and int(target_h) != h:
                 target_h = int(target_h)
-                if target_h != h:
-                    scale = target_h / h
-                    new_w = int(preview.shape[1] * scale)
-                    preview = Image.fromarray(preview).resize((new_w, target_h), Image.Resampling.LANCZOS)
-                    preview = np.array(preview)
+                new_w = int(preview.shape[1] * target_h / h)
+                preview = np.array(Image.fromarray(preview).resize((new_w, target_h), Image.Resampling.LANCZOS))
+            self.stats["renders"] += 1
             
             # Notify callback
             if self._update_callback:
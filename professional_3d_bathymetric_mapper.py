@@ -61,9 +61,10 @@ class Professional3DBathymetricMapper:
         }
         
     def load_sonar_data(self, csv_file: str) -> bool:
-        """Load sonar data from parsed CSV file"""
+        """Load sonar data from parsed CSV file (or a columnar .npy/.parquet record file)"""
         try:
-            self.data = pd.read_csv(csv_file)
+            from record_columns import read_records_frame
+            self.data = read_records_frame(csv_file)
             print(f"📊 Loaded {len(self.data)} sonar records from {csv_file}")
             
             # Extract coordinates and depths
@@ -56,6 +56,7 @@ class RealTimeMarineSurveyor:
         self.data_queue = queue.Queue()
         self.alert_subscribers = []
         self.metrics_callback = None
+        self.follow_stops: List[threading.Event] = []  # one per follow_rsd_file() feeder
         
         # Processing statistics
         self.survey_start_time = None
@@ -326,10 +327,50 @@ class RealTimeMarineSurveyor:
             'processing_lag_ms': np.mean(self.processing_times) * 1000 if self.processing_times else 0
         }
     
+    def follow_rsd_file(self, rsd_path: str, idle_timeout: Optional[float] = None,
+                        stop_event: Optional[threading.Event] = None) -> threading.Thread:
+        """Tail a Garmin RSD that is still being recorded/copied and feed each
+        new ping into data_queue as it lands. Returns the feeder thread, which
+        ends after `idle_timeout`, when `stop_event` is set or on stop_server()
+        (which sets the stop event of every running feeder)."""
+        from engine_nextgen_syncfirst import parse_rsd_records_nextgen
+        stop_event = stop_event or threading.Event()
+        self.follow_stops.append(stop_event)
+
+        def feed():
+            try:
+                with open(rsd_path, 'rb') as f:
+                    for rec in parse_rsd_records_nextgen(rsd_path, follow=True, idle_timeout=idle_timeout,
+                                                         stop=stop_event.is_set):
+                        intensity = 0
+                        if rec.sonar_size:
+                            f.seek(rec.sonar_ofs)
+                            payload = f.read(rec.sonar_size)
+                            intensity = max(payload) if payload else 0
+                        self.data_queue.put({
+                            'lat': rec.lat,
+                            'lon': rec.lon,
+                            'depth_m': rec.depth_m,
+                            'channel_id': rec.channel_id,
+                            'seq': rec.seq,
+                            'time_ms': rec.time_ms,
+                            'intensity': intensity,
+                            'timestamp': datetime.now().isoformat()
+                        })
+            finally:
+                if stop_event in self.follow_stops:
+                    self.follow_stops.remove(stop_event)
+
+        thread = threading.Thread(target=feed, daemon=True)
+        thread.start()
+        return thread
+
     def stop_server(self):
         """Stop the real-time server"""
         print("🛑 Stopping real-time server...")
         self.is_running = False
+        for stop_event in list(self.follow_stops):
+            stop_event.set()
 
 class RealTimeDepthAnalyzer:
     """Real-time depth analysis and alerting"""
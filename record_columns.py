@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+# record_columns.py — fixed-dtype columnar record batches (.npy / Parquet) for parsed RSD output
+"""
+Columnar record interchange.
+
+The engines can emit batches of RECORD_DTYPE structured arrays instead of
+one RSDRecord per ping. ColumnarWriter streams those batches to
+
+    <name>.parquet   when pyarrow is installed
+    <name>.npy       otherwise (plain NumPy file, memory-mapped on load)
+
+Missing values use fixed sentinels so the file needs no parsing on load:
+NaN for optional floats and -1 for optional integers (INT_NULL).
+
+    for batch in parse_rsd_batches_nextgen("Sonar000.RSD"):
+        ...                                   # batch['lat'], batch['channel_id'], ...
+    arr = load_columnar("out/Sonar000.npy")   # zero-copy memmap
+    df = read_records_frame("out/Sonar000.npy")  # same columns as pd.read_csv(csv)
+
+Records CSVs load into the same dtype through load_records_csv, which keeps
+a binary copy in `<csv>.rcache` (checked against the CSV's size/mtime) so
+the next load is a memory map:
+
+    arr = load_records("out/Sonar000.csv")    # CSV, .npy or .parquet
+    for batch in iter_records("out/Sonar000.csv", 65536):  # bounded memory
+        ...
+"""
+
+import csv
+import json
+import os
+import struct
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+
+RECORD_FIELDS = [
+    "ofs", "channel_id", "seq", "time_ms", "lat", "lon", "depth_m",
+    "sample_cnt", "sonar_ofs", "sonar_size", "beam_deg", "pitch_deg",
+    "roll_deg", "heave_m", "tx_ofs_m", "rx_ofs_m", "color_id",
+]
+RECORD_DTYPE = np.dtype([
+    ('ofs', '<i8'),
+    ('channel_id', '<i8'),
+    ('seq', '<i8'),
+    ('time_ms', '<i8'),
+    ('lat', '<f8'),
+    ('lon', '<f8'),
+    ('depth_m', '<f8'),
+    ('sample_cnt', '<i8'),
+    ('sonar_ofs', '<i8'),
+    ('sonar_size', '<i8'),
+    ('beam_deg', '<f8'),
+    ('pitch_deg', '<f8'),
+    ('roll_deg', '<f8'),
+    ('heave_m', '<f8'),
+    ('tx_ofs_m', '<f8'),
+    ('rx_ofs_m', '<f8'),
+    ('color_id', '<i4'),
+])
+INT_NULL = -1
+DEFAULT_BATCH = 65536
+COLUMNAR_SUFFIXES = ('.npy', '.parquet')
+
+_NULLABLE_INTS = ('channel_id', 'sample_cnt', 'sonar_ofs', 'sonar_size', 'color_id')
+
+CSV_CACHE_SUFFIX = '.rcache'
+_CACHE_MAGIC = b'RSDREC\x00\x02'
+# magic, CSV size, CSV mtime_ns, record count, entry size
+_CACHE_HEADER = struct.Struct('<8sQqQI')
+_CACHE_HEADER_SIZE = 64
+
+
+def have_parquet() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def is_columnar(path) -> bool:
+    return str(path).lower().endswith(COLUMNAR_SUFFIXES)
+
+
+def record_row(r) -> tuple:
+    """RSDRecord-like object -> tuple in RECORD_DTYPE order (None -> sentinel)."""
+    out = []
+    for name in RECORD_FIELDS:
+        v = getattr(r, name, None)
+        if v is None:
+            v = INT_NULL if RECORD_DTYPE[name].kind == 'i' else np.nan
+        out.append(v)
+    return tuple(out)
+
+
+def records_to_array(records: Iterable) -> np.ndarray:
+    rows = [record_row(r) for r in records]
+    return np.array(rows, dtype=RECORD_DTYPE) if rows else np.zeros(0, dtype=RECORD_DTYPE)
+
+
+def iter_batches(records: Iterable, batch_size: int = DEFAULT_BATCH) -> Iterator[np.ndarray]:
+    """Group any record iterable into RECORD_DTYPE batches."""
+    rows = []
+    for r in records:
+        rows.append(record_row(r))
+        if len(rows) >= batch_size:
+            yield np.array(rows, dtype=RECORD_DTYPE); rows = []
+    if rows:
+        yield np.array(rows, dtype=RECORD_DTYPE)
+
+
+def csv_rows(batch: np.ndarray) -> Iterator[list]:
+    """Rows for the legacy 18-column CSV (nulls back to empty cells)."""
+    for row in batch.tolist():
+        out = []
+        for name, v in zip(RECORD_FIELDS, row):
+            if v != v or (v == INT_NULL and name in _NULLABLE_INTS):
+                v = None
+            out.append(v)
+        out.append("{}")  # extras_json
+        yield out
+
+
+class _NpyStream:
+    """Append-only .npy writer: fixed-width header, rewritten with the final count."""
+
+    _SHAPE_WIDTH = 20
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._f = open(path, 'wb')
+        self._f.write(self._header(0))
+
+    def _header(self, n: int) -> bytes:
+        descr = np.lib.format.dtype_to_descr(RECORD_DTYPE)
+        body = "{'descr': %r, 'fortran_order': False, 'shape': (%*d,), }" % (descr, self._SHAPE_WIDTH, n)
+        total = 10 + len(body) + 1
+        body += ' ' * ((64 - total % 64) % 64) + '\n'
+        return b'\x93NUMPY\x01\x00' + len(body).to_bytes(2, 'little') + body.encode('latin1')
+
+    def write(self, batch: np.ndarray):
+        self._f.write(np.ascontiguousarray(batch, dtype=RECORD_DTYPE).tobytes())
+        self.count += len(batch)
+
+    def close(self):
+        self._f.seek(0)
+        self._f.write(self._header(self.count))
+        self._f.close()
+
+
+class _ParquetStream:
+    def __init__(self, path: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.path = path
+        self.count = 0
+        self._pa = pa
+        schema = pa.schema([(n, pa.from_numpy_dtype(RECORD_DTYPE[n])) for n in RECORD_FIELDS])
+        self._w = pq.ParquetWriter(path, schema)
+
+    def write(self, batch: np.ndarray):
+        self._w.write_table(self._pa.table({n: np.ascontiguousarray(batch[n]) for n in RECORD_FIELDS}))
+        self.count += len(batch)
+
+    def close(self):
+        self._w.close()
+
+
+class ColumnarWriter:
+    """Stream RECORD_DTYPE batches to `<base>.parquet` or `<base>.npy`.
+
+    fmt: 'auto' (Parquet when pyarrow is available), 'parquet' or 'npy'.
+    The file is written under a temporary name and moved into place on close.
+    """
+
+    def __init__(self, base_path: str, fmt: str = 'auto'):
+        if fmt == 'auto':
+            fmt = 'parquet' if have_parquet() else 'npy'
+        if fmt not in ('parquet', 'npy'):
+            raise ValueError(f"Unknown columnar format: {fmt}")
+        base = str(base_path)
+        if is_columnar(base):
+            base = os.path.splitext(base)[0]
+        self.fmt = fmt
+        self.path = f"{base}.{fmt}"
+        self._tmp = self.path + '.tmp'
+        self._out = _ParquetStream(self._tmp) if fmt == 'parquet' else _NpyStream(self._tmp)
+
+    @property
+    def count(self) -> int:
+        return self._out.count
+
+    def write(self, batch: np.ndarray):
+        if len(batch):
+            self._out.write(batch)
+
+    def close(self):
+        self._out.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        """Close and discard the partial file."""
+        try:
+            self._out.close(); os.remove(self._tmp)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None: self.close()
+        else: self.abort()
+        return False
+
+
+def load_columnar(path: str, mmap: bool = True) -> np.ndarray:
+    """Load a columnar record file as a RECORD_DTYPE array (memmap for .npy)."""
+    path = str(path)
+    if path.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        table = pq.read_table(path)
+        arr = np.empty(table.num_rows, dtype=RECORD_DTYPE)
+        for n in RECORD_FIELDS:
+            arr[n] = table.column(n).to_numpy()
+        return arr
+    arr = np.load(path, mmap_mode='r' if mmap else None)
+    if arr.dtype != RECORD_DTYPE:
+        if arr.dtype.names != RECORD_DTYPE.names:
+            raise ValueError(f"{path}: not a record file (dtype {arr.dtype})")
+        arr = np.asarray(arr).astype(RECORD_DTYPE)  # older, narrower integer layout
+    return arr
+
+
+def columnar_sibling(csv_path: str) -> Optional[str]:
+    """Columnar file written next to `csv_path`, if any."""
+    base = os.path.splitext(str(csv_path))[0]
+    for suffix in COLUMNAR_SUFFIXES[::-1]:
+        if os.path.exists(base + suffix):
+            return base + suffix
+    return None
+
+
+def read_records_frame(path: str):
+    """DataFrame of parsed records from either a CSV or a columnar file.
+
+    Columnar input maps the integer sentinel back to NaN so the frame matches
+    what pd.read_csv returns for the legacy CSV.
+    """
+    import pandas as pd
+    if not is_columnar(path):
+        return pd.read_csv(path)
+    arr = load_columnar(path)
+    df = pd.DataFrame({n: np.asarray(arr[n]) for n in RECORD_FIELDS})
+    for n in _NULLABLE_INTS:
+        col = df[n].values
+        if (col == INT_NULL).any():
+            df[n] = np.where(col == INT_NULL, np.nan, col)
+    return df
+
+
+def _csv_stamp(csv_path: str):
+    st = os.stat(csv_path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _open_csv_cache(csv_path: str) -> Optional[np.ndarray]:
+    """Memory-map `<csv>.rcache` if it was written from the CSV as it is now."""
+    try:
+        with open(csv_path + CSV_CACHE_SUFFIX, 'rb') as f:
+            head = f.read(_CACHE_HEADER_SIZE)
+        magic, size, mtime_ns, count, itemsize = _CACHE_HEADER.unpack(head[:_CACHE_HEADER.size])
+    except (OSError, struct.error):
+        return None
+    if magic != _CACHE_MAGIC or itemsize != RECORD_DTYPE.itemsize or (size, mtime_ns) != _csv_stamp(csv_path):
+        return None
+    if count == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(csv_path + CSV_CACHE_SUFFIX, dtype=RECORD_DTYPE, mode='r',
+                     offset=_CACHE_HEADER_SIZE, shape=(count,))
+
+
+def _write_csv_cache(csv_path: str, arr: np.ndarray, stamp):
+    tmp = csv_path + CSV_CACHE_SUFFIX + '.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(_CACHE_HEADER.pack(_CACHE_MAGIC, stamp[0], stamp[1], len(arr),
+                                       RECORD_DTYPE.itemsize).ljust(_CACHE_HEADER_SIZE, b'\x00'))
+            f.write(np.ascontiguousarray(arr, dtype=RECORD_DTYPE).tobytes())
+        os.replace(tmp, csv_path + CSV_CACHE_SUFFIX)
+    except OSError:
+        pass  # read-only location: the next load parses again
+
+
+def _numeric_column(values: List[str]) -> np.ndarray:
+    """float64 column from CSV text; blanks and unparsable cells become NaN."""
+    try:
+        return np.array([v or 'nan' for v in values], dtype=np.float64)
+    except ValueError:
+        out = np.full(len(values), np.nan)
+        for i, v in enumerate(values):
+            try:
+                out[i] = float(v)
+            except ValueError:
+                pass
+        return out
+
+
+def _typed_records(cols: dict, count: int) -> np.ndarray:
+    """RECORD_DTYPE array from float64 columns (NaN, fractional or out-of-range
+    integers -> null; missing columns -> null)."""
+    arr = np.zeros(count, dtype=RECORD_DTYPE)
+    for n in RECORD_FIELDS:
+        col = cols.get(n)
+        if RECORD_DTYPE[n].kind == 'f':
+            arr[n] = np.nan if col is None else col
+        else:
+            # ofs/seq/time_ms default to 0 like the old row loader, the rest to INT_NULL
+            null = INT_NULL if n in _NULLABLE_INTS else 0
+            if col is not None:
+                # like safe_int: only whole numbers that fit the column, anything else is null
+                lo = float(np.iinfo(RECORD_DTYPE[n]).min)
+                ok = np.isfinite(col) & (col == np.trunc(col)) & (col >= lo) & (col < -lo)
+                arr[n] = np.where(ok, np.where(ok, col, 0), null)
+            else:
+                arr[n] = null
+    return arr
+
+
+def _iter_csv_text(csv_path: str, batch_size: Optional[int], skip: int = 0) -> Iterator[np.ndarray]:
+    """csv-module parse, `batch_size` rows at a time (None: one batch), after `skip` rows."""
+    with open(csv_path, 'r', encoding='utf-8', newline='') as fp:
+        rows = csv.reader(fp)
+        header = next(rows, [])
+        pos = {n: header.index(n) for n in RECORD_FIELDS if n in header}
+        width = max(pos.values()) + 1 if pos else 0
+        text = {n: [] for n in pos}
+        count = 0
+        for k, row in enumerate(rows):
+            if k < skip:
+                continue
+            if len(row) < width:
+                row = row + [''] * (width - len(row))
+            for n, i in pos.items():
+                text[n].append(row[i].strip())
+            count += 1
+            if count == batch_size:
+                yield _typed_records({n: _numeric_column(v) for n, v in text.items()}, count)
+                text = {n: [] for n in pos}
+                count = 0
+        if count or (batch_size is None and skip == 0):
+            yield _typed_records({n: _numeric_column(v) for n, v in text.items()}, count)
+
+
+def _iter_csv_records(csv_path: str, batch_size: Optional[int] = None) -> Iterator[np.ndarray]:
+    """Typed batches straight from the CSV text (pandas' C parser when available)."""
+    try:
+        import pandas as pd
+    except ImportError:
+        pd = None
+    done = 0
+    if pd is not None:
+        head = pd.read_csv(csv_path, nrows=0).columns
+        use = [n for n in RECORD_FIELDS if n in head]
+        try:
+            frames = pd.read_csv(csv_path, usecols=use, dtype={n: np.float64 for n in use},
+                                 float_precision='round_trip', engine='c', chunksize=batch_size)
+            for df in ([frames] if batch_size is None else frames):
+                yield _typed_records({n: df[n].to_numpy() for n in use}, len(df))
+                done += len(df)
+            return
+        except ValueError:
+            pass  # non-numeric cells: the per-cell path below maps them to nulls
+    yield from _iter_csv_text(csv_path, batch_size, skip=done)
+
+
+def _parse_records_csv(csv_path: str) -> np.ndarray:
+    """Typed columns straight from the CSV text, in one batch."""
+    return next(_iter_csv_records(csv_path), np.zeros(0, dtype=RECORD_DTYPE))
+
+
+def load_records_csv(csv_path: str, cache: bool = True) -> np.ndarray:
+    """RECORD_DTYPE array for a records CSV.
+
+    With cache=True a valid `<csv>.rcache` is memory-mapped instead of
+    parsing, and a fresh parse writes one. extras_json is not read; use
+    read_extras() for that.
+    """
+    csv_path = str(csv_path)
+    if cache:
+        arr = _open_csv_cache(csv_path)
+        if arr is not None:
+            return arr
+    stamp = _csv_stamp(csv_path)
+    arr = _parse_records_csv(csv_path)
+    if cache:
+        _write_csv_cache(csv_path, arr, stamp)
+    return arr
+
+
+def load_records(path: str, cache: bool = True) -> np.ndarray:
+    """RECORD_DTYPE array from a records CSV or a columnar record file."""
+    return load_columnar(path) if is_columnar(path) else load_records_csv(path, cache=cache)
+
+
+def iter_records(path: str, batch_size: int = DEFAULT_BATCH) -> Iterator[np.ndarray]:
+    """RECORD_DTYPE batches of at most `batch_size` rows, in file order.
+
+    Memory stays bounded by one batch: .npy files and a valid `<csv>.rcache`
+    are sliced from their memory maps, Parquet is read row group by row
+    group and CSVs are parsed in chunks (no cache is written).
+    """
+    path = str(path)
+    if path.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for rb in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            arr = np.empty(rb.num_rows, dtype=RECORD_DTYPE)
+            for n in RECORD_FIELDS:
+                arr[n] = rb.column(n).to_numpy()
+            yield arr
+        return
+    arr = load_columnar(path) if is_columnar(path) else _open_csv_cache(path)
+    if arr is None:
+        yield from _iter_csv_records(path, batch_size)
+        return
+    for start in range(0, len(arr), batch_size):
+        yield arr[start:start + batch_size]
+
+
+def read_extras(csv_path: str, limit: Optional[int] = None) -> List[Optional[dict]]:
+    """Parsed extras_json per CSV row (None for empty/invalid cells), first `limit` rows."""
+    out = []
+    if is_columnar(csv_path):
+        return out
+    with open(csv_path, 'r', encoding='utf-8', newline='') as fp:
+        rows = csv.reader(fp)
+        header = next(rows, [])
+        if 'extras_json' not in header:
+            return out
+        i = header.index('extras_json')
+        for row in rows:
+            if limit is not None and len(out) >= limit:
+                break
+            cell = row[i] if i < len(row) else ''
+            try:
+                out.append(json.loads(cell) if cell else None)
+            except ValueError:
+                out.append(None)
+    return out
@@ -1,13 +1,32 @@
 ﻿#!/usr/bin/env python3
-# render_accel.py — simple OpenCV-backed VideoWriter with codec fallback
-import numpy as np, cv2, os
+# render_accel.py — threaded OpenCV/ffmpeg VideoWriter with codec fallback
+import numpy as np, cv2, os, time
 
 _FALLBACKS=[("mp4v",".mp4"),("XVID",".avi"),("MJPG",".avi"),("avc1",".mp4")]
+# encoder preference -> ffmpeg codec for the ffmpeg pipe backend
+_FFMPEG_CODECS={"h264":"libx264","avc1":"libx264","mp4v":"mpeg4","xvid":"mpeg4","mjpg":"mjpeg"}
+_TO_BGR={1:cv2.COLOR_GRAY2BGR,3:cv2.COLOR_RGB2BGR,4:cv2.COLOR_RGBA2BGR}
 
 class VideoWorker:
-    def __init__(self,out_path,fps=30,encoder="auto",log_func=None):
-        self._base=out_path; self._fps=float(fps); self._writer=None
+    """
+    Frame sink for the waterfall/block video exports.
+    push() converts each frame (gray or RGB uint8) to BGR with cv2.cvtColor into
+    one of `queue_size` preallocated buffers and returns; a writer thread
+    encodes the buffers in order and hands them back, so composition and
+    encoding overlap and a slow encoder stalls push() once every buffer is in
+    flight. threaded=False writes on the caller's thread (same buffers).
+    backend="ffmpeg" pipes raw BGR frames to a local ffmpeg (ffmpeg_path or
+    PATH); "auto" uses it when found; OpenCV's VideoWriter is the fallback.
+    stats(): frames, encode/wait seconds, queue depth (current and max).
+    """
+    def __init__(self,out_path,fps=30,encoder="auto",log_func=None,
+                 threaded=True,queue_size=4,backend="opencv",ffmpeg_path=None):
+        self._base=out_path; self._fps=float(fps); self._writer=None; self._proc=None
         self._log=log_func or (lambda m:None); self._pref=(encoder or "auto").lower()
+        self._threaded=bool(threaded); self._nbuf=max(1,int(queue_size))
+        self._backend=(backend or "opencv").lower(); self._ffmpeg=ffmpeg_path
+        self._free=None; self._todo=None; self._thread=None; self._error=None; self._shape=None
+        self._frames=0; self._encode_s=0.0; self._wait_s=0.0; self._max_depth=0
 
     def _cands(self):
         if self._pref not in ("auto",""):
@@ -17,7 +36,27 @@ class VideoWorker:
                     return [(f,e)]+[(ff,ee) for (ff,ee) in _FALLBACKS if (ff,ee)!=(f,e)]
         return _FALLBACKS
 
+    def _ffmpeg_bin(self):
+        if self._backend not in ("ffmpeg","auto"): return None
+        import shutil
+        exe=shutil.which(self._ffmpeg or "ffmpeg")
+        if exe is None and self._backend=="ffmpeg": self._log("[VideoWriter] ffmpeg not found, using OpenCV")
+        return exe
+
+    def _open_ffmpeg(self,exe,w,h):
+        import subprocess
+        codec=_FFMPEG_CODECS.get(self._pref,self._pref) if self._pref not in ("auto","") else "libx264"
+        cmd=[exe,"-y","-loglevel","error","-f","rawvideo","-pix_fmt","bgr24","-s",f"{w}x{h}","-r",f"{self._fps:g}",
+             "-i","-","-an","-c:v",codec]
+        if codec=="libx264": cmd+=["-pix_fmt","yuv420p","-preset","veryfast"]
+        self._proc=subprocess.Popen(cmd+[self._base],stdin=subprocess.PIPE)
+        self._log(f"[VideoWriter] ffmpeg codec={codec} {w}x{h} -> {self._base}")
+
     def _open(self,w,h):
+        exe=self._ffmpeg_bin()
+        if exe is not None:
+            try: return self._open_ffmpeg(exe,w,h)
+            except OSError as e: self._log(f"[VideoWriter] ffmpeg failed ({e}), using OpenCV")
         for fourcc_txt,ext in self._cands():
             out=self._base if self._base.lower().endswith(ext) else os.path.splitext(self._base)[0]+ext
             vw=cv2.VideoWriter(out,cv2.VideoWriter_fourcc(*fourcc_txt),self._fps,(w,h),True)
@@ -27,23 +66,208 @@ class VideoWorker:
                 self._log(f"[VideoWriter] failed {fourcc_txt}, trying next…")
         raise RuntimeError("All codecs failed. Install OpenH264 for avc1/H.264 if needed.")
 
+    def _start(self,h,w):
+        import queue, threading
+        self._open(w,h); self._shape=(h,w,3)
+        self._free=queue.Queue(); self._todo=queue.Queue()
+        for _ in range(self._nbuf): self._free.put(np.empty(self._shape,np.uint8))
+        if self._threaded:
+            self._thread=threading.Thread(target=self._run,name="VideoWorker",daemon=True); self._thread.start()
+
+    def _encode(self,buf):
+        t=time.perf_counter()
+        if self._proc is not None: self._proc.stdin.write(memoryview(buf).cast("B"))
+        else: self._writer.write(buf)
+        self._encode_s+=time.perf_counter()-t; self._frames+=1
+
+    def _run(self):
+        while True:
+            buf=self._todo.get()
+            if buf is None: return
+            try:
+                if self._error is None: self._encode(buf)
+            except Exception as e:
+                self._error=e
+            finally:
+                self._free.put(buf)
+
     def push(self,frame):
-        if frame.ndim==2: frame=np.stack([frame]*3,2)
+        if self._error is not None: raise RuntimeError(f"video encoder failed: {self._error}") from self._error
         if frame.dtype!=np.uint8: frame=np.clip(frame,0,255).astype(np.uint8)
-        if self._writer is None: self._open(frame.shape[1], frame.shape[0])
-        # OpenCV expects BGR
-        self._writer.write(frame[:,:,::-1])
+        if self._shape is None: self._start(frame.shape[0], frame.shape[1])
+        if frame.shape[:2]!=self._shape[:2]: raise ValueError(f"frame {frame.shape[:2]} != video size {self._shape[:2]}")
+        t=time.perf_counter(); buf=self._free.get(); self._wait_s+=time.perf_counter()-t
+        # OpenCV and rawvideo bgr24 expect BGR
+        ch=1 if frame.ndim==2 else frame.shape[2]
+        cv2.cvtColor(np.ascontiguousarray(frame),_TO_BGR[ch],dst=buf)
+        if self._thread is None:
+            try: self._encode(buf)
+            finally: self._free.put(buf)
+        else:
+            self._todo.put(buf); self._max_depth=max(self._max_depth,self._todo.qsize())
+
+    def stats(self):
+        depth=self._todo.qsize() if self._todo is not None else 0
+        return {"frames":self._frames,"encode_s":self._encode_s,"wait_s":self._wait_s,
+                "queue_depth":depth,"max_queue_depth":self._max_depth,"queue_size":self._nbuf}
 
     def close(self):
+        if self._thread is not None:
+            self._todo.put(None); self._thread.join(); self._thread=None
         if self._writer is not None: self._writer.release(); self._writer=None
+        if self._proc is not None:
+            proc=self._proc; self._proc=None
+            try: proc.stdin.close()
+            except OSError: pass
+            if proc.wait()!=0 and self._error is None: self._error=RuntimeError(f"ffmpeg exited with {proc.returncode}")
+        if self._error is not None: raise RuntimeError(f"video encoder failed: {self._error}") from self._error
+
+STRIP_MANIFEST="strips.json"
+STRIP_VERSION=1
+
+def _file_stamp(path):
+    st=os.stat(path); return [st.st_size, st.st_mtime_ns]
+
+def _strip_rsd_path(records_path):
+    # RSD named in the ping store manifest beside the records, if one was written
+    try:
+        from ping_store import PingStore
+        store=PingStore.open(records_path)
+        return store.rsd_path if store is not None else None
+    except Exception:
+        return None
+
+def _render_strip_tile(reader, records, width, path, fmt):
+    from block_pipeline import RecordBlock, resample_block
+    matrix,lengths=reader.read_block(RecordBlock(records, np.arange(len(records))))
+    img=resample_block(matrix, lengths, width)
+    if fmt=="npy": np.save(path, img)
+    else: cv2.imencode(".png", img)[1].tofile(path)  # tofile: non-ASCII paths on Windows
+    return len(records)
 
-def process_record_images(csv_path, img_dir, scan_type=None, channel=None):
+def process_record_images(csv_path, img_dir, scan_type=None, channel=None, rsd_path=None,
+                          tile_pings=1024, width=1024, fmt="png", workers=None, batch_size=65536):
     """
-    Stub function for processing record images from CSV data
-    TODO: Implement proper image generation from sonar records
+    Per-channel waterfall strips from a parsed records file (CSV or columnar).
+    Records are streamed in batches; each channel's pings (file order) are cut
+    into tiles of `tile_pings` rows, every ping scaled to its own peak and
+    resampled to `width` columns (the block preview gain), and written as
+    ch<N>_<tile>.png (or .npy with fmt="npy") in img_dir. Tiles render on a
+    thread pool through the shared PingReader with at most 2*workers in
+    flight, so memory stays at one batch plus one partial tile per channel.
+    `channel` is None/"all", one id or a list. Writes img_dir/strips.json and
+    returns it as a dict; an up-to-date manifest is returned without
+    re-rendering. Without an RSD (rsd_path, or the one recorded in the ping
+    store) nothing is rendered and None is returned.
     """
-    print(f"[render_accel] process_record_images called for {csv_path}")
-    print(f"[render_accel] Would generate images to {img_dir}")
-    # For now, just create the directory and return
-    import os
+    rsd_path=rsd_path or _strip_rsd_path(csv_path)
+    if not rsd_path or not os.path.exists(rsd_path):
+        print(f"[render_accel] no RSD source for {csv_path}, skipping strips"); return None
+    import json
+    from block_pipeline import shared_ping_reader
+    from record_columns import iter_records
     os.makedirs(img_dir, exist_ok=True)
+    fmt="npy" if str(fmt).lower()=="npy" else "png"
+    wanted=None if channel in (None,"all","") else {int(c) for c in (channel if isinstance(channel,(list,tuple,set)) else [channel])}
+    manifest={"version":STRIP_VERSION,"records":os.path.abspath(csv_path),"records_stamp":_file_stamp(csv_path),
+              "rsd_path":os.path.abspath(rsd_path),"rsd_stamp":_file_stamp(rsd_path),"scan_type":scan_type,
+              "channel_filter":sorted(wanted) if wanted else None,"tile_pings":int(tile_pings),"width":int(width),
+              "format":fmt,"channels":{}}
+    mpath=os.path.join(img_dir,STRIP_MANIFEST)
+    try:
+        with open(mpath) as f: old=json.load(f)
+        if ({k:v for k,v in old.items() if k!="channels"}=={k:v for k,v in manifest.items() if k!="channels"}
+                and all(os.path.exists(os.path.join(img_dir,t["file"])) for c in old["channels"].values() for t in c["tiles"])):
+            return old
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    reader=shared_ping_reader(rsd_path, csv_path)
+    workers=min(4,os.cpu_count() or 1) if workers is None else int(workers)
+    pending={}; counts={}; tiles=manifest["channels"]
+
+    def cut(ch, final=False):
+        parts=pending.get(ch) or []
+        n=sum(len(p) for p in parts)
+        if n<tile_pings and not (final and n): return
+        buf=np.concatenate(parts) if len(parts)>1 else parts[0]
+        keep=0 if final else n%tile_pings
+        for start in range(0, n-keep, tile_pings):
+            recs=buf[start:start+tile_pings]; first=counts.get(ch,0); counts[ch]=first+len(recs)
+            name=f"ch{ch}_{first//tile_pings:05d}.{fmt}"
+            tiles.setdefault(str(ch),{"pings":0,"width":int(width),"tiles":[]})["tiles"].append(
+                {"file":name,"start":first,"pings":len(recs)})
+            yield reader, recs, int(width), os.path.join(img_dir,name), fmt
+        pending[ch]=[buf[n-keep:]] if keep else []
+
+    def tasks():
+        for batch in iter_records(csv_path, batch_size):
+            ch_col=batch["channel_id"]
+            for ch in np.unique(ch_col).tolist():
+                if ch<0 or (wanted is not None and ch not in wanted): continue
+                pending.setdefault(ch,[]).append(batch[ch_col==ch])
+                yield from cut(ch)
+        for ch in sorted(pending): yield from cut(ch, final=True)
+
+    for _ in ordered_map(_render_strip_tile, tasks(), workers, executor="thread"): pass
+    for ch,info in tiles.items(): info["pings"]=counts[int(ch)]
+    manifest["channels"]=dict(sorted(tiles.items(), key=lambda kv:int(kv[0])))
+    with open(mpath+".tmp","w") as f: json.dump(manifest,f,indent=2)
+    os.replace(mpath+".tmp",mpath)
+    return manifest
+
+class RecordStrips:
+    """Pre-rendered channel strips written by process_record_images (img_dir/strips.json)."""
+    def __init__(self,img_dir,manifest):
+        self.img_dir=img_dir; self.manifest=manifest; self._tile=(None,None)
+
+    @classmethod
+    def open(cls,img_dir):
+        import json
+        try:
+            with open(os.path.join(img_dir,STRIP_MANIFEST)) as f: manifest=json.load(f)
+        except (OSError,ValueError):
+            return None
+        return cls(img_dir,manifest) if manifest.get("version")==STRIP_VERSION else None
+
+    def channels(self): return sorted(int(c) for c in self.manifest["channels"])
+    def pings(self,channel): return self.manifest["channels"][str(channel)]["pings"]
+
+    def _load(self,name):
+        if self._tile[0]!=name:
+            path=os.path.join(self.img_dir,name)
+            img=np.load(path,mmap_mode="r") if name.endswith(".npy") else cv2.imdecode(np.fromfile(path,np.uint8),cv2.IMREAD_GRAYSCALE)
+            self._tile=(name,img)
+        return self._tile[1]
+
+    def rows(self,channel,start,stop):
+        """(stop-start, width) uint8 waterfall rows of `channel`, stitched across tiles"""
+        info=self.manifest["channels"][str(channel)]; start=max(0,int(start)); stop=min(int(stop),info["pings"])
+        out=np.zeros((max(0,stop-start),info["width"]),np.uint8)
+        for t in info["tiles"]:
+            a=max(start,t["start"]); b=min(stop,t["start"]+t["pings"])
+            if a<b: out[a-start:b-start]=self._load(t["file"])[a-t["start"]:b-t["start"]]
+        return out
+
+def ordered_map(fn, tasks, workers=0, max_pending=None, executor="process"):
+    """
+    Yield fn(*task) for each task, in task order.
+    With workers>1 the tasks run on a process (or thread) pool and finish in any
+    order; the deque of pending futures is the reorder buffer, capped at
+    max_pending (default 2*workers) so a slow consumer stalls task submission
+    instead of piling up results. fn must be importable for the process pool.
+    """
+    if workers is None or workers <= 1:
+        for t in tasks: yield fn(*t)
+        return
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    max_pending = max_pending or 2*workers
+    pool = ProcessPoolExecutor(workers) if executor == "process" else ThreadPoolExecutor(workers)
+    pending = deque()
+    try:
+        for t in tasks:
+            pending.append(pool.submit(fn, *t))
+            if len(pending) >= max_pending: yield pending.popleft().result()
+        while pending: yield pending.popleft().result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# rsd_index.py — persistent record offset index (.rsdidx sidecar) for Garmin RSD files
+"""
+Record offset index for RSD files.
+
+The first open walks the file once (same hop/resync walk as the nextgen
+engine) and stores one fixed-width entry per record in `<file>.rsdidx`:
+
+    hdr_ofs, body_ofs, hop, channel, seq, time_ms, sonar_ofs, sonar_size, data_size
+
+A record without a channel id is stored as NO_CHANNEL and reported as None.
+
+Later opens memory-map the entries after checking the sidecar against the
+RSD's size and mtime, so counting, channel listing and random access no
+longer rescan the file.
+
+    idx = load_or_build_index("Sonar000.RSD")
+    len(idx), idx.channels(), idx.record(1234)
+"""
+
+import mmap
+import os
+import struct
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from core_shared import progress_hook, _emit, _scan_varstruct, FieldTable
+from engine_nextgen_syncfirst import _walk, _first_header_pos, _decode_record, _record_from_item
+
+INDEX_SUFFIX = '.rsdidx'
+INDEX_MAGIC = b'RSDIDX\x00\x02'
+NO_CHANNEL = 0xFFFFFFFF     # -1 as u4: the record has no channel id
+INDEX_DTYPE = np.dtype([
+    ('hdr_ofs', '<u8'),
+    ('body_ofs', '<u8'),
+    ('hop', '<u4'),         # trailer chunk_size, 0 when the record has no hop
+    ('channel', '<u4'),
+    ('seq', '<u4'),
+    ('time_ms', '<u4'),
+    ('sonar_ofs', '<u8'),
+    ('sonar_size', '<u4'),
+    ('data_size', '<u4'),   # header data size: the trailer is at body_ofs + data_size
+])
+# magic, source size, source mtime_ns, record count, entry size, walk end offset
+_HEADER = struct.Struct('<8sQqQIQ')
+_HEADER_SIZE = 64
+
+
+def index_path_for(rsd_path: str) -> str:
+    return str(rsd_path) + INDEX_SUFFIX
+
+
+def _source_stamp(rsd_path: str):
+    st = os.stat(rsd_path)
+    return st.st_size, st.st_mtime_ns
+
+
+class RecordIndex:
+    """Fixed-width record entries for one RSD file (memory-mapped when loaded)."""
+
+    def __init__(self, rsd_path: str, entries: np.ndarray, end_pos: int = 0):
+        self.rsd_path = str(rsd_path)
+        self.entries = entries
+        self.end_pos = end_pos
+
+    def __len__(self) -> int:
+        return int(self.entries.shape[0])
+
+    def channels(self) -> List[int]:
+        """Channel ids present (records without one are not listed)."""
+        return [int(c) for c in np.unique(self.entries['channel']) if c != NO_CHANNEL]
+
+    def channel_counts(self) -> Dict[Optional[int], int]:
+        """{channel: records}; records without a channel id count under None."""
+        ch, n = np.unique(self.entries['channel'], return_counts=True)
+        return {(None if c == NO_CHANNEL else int(c)): int(k) for c, k in zip(ch, n)}
+
+    def channel_rows(self, channel: Optional[int]) -> np.ndarray:
+        """Row numbers (into `entries`) of every record on `channel` (None: no channel id)."""
+        return np.nonzero(self.entries['channel'] == (NO_CHANNEL if channel is None else channel))[0]
+
+    def record(self, i: int):
+        """Decode record `i` in full, reading only that record's bytes."""
+        return next(self.iter_records(i, i + 1))
+
+    def iter_records(self, start: int = 0, stop: Optional[int] = None, crc_mode: str = 'warn'):
+        """Yield RSDRecords for entries [start, stop) by direct seeks."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        return self.iter_rows(range(start, stop), crc_mode)
+
+    def iter_rows(self, rows, crc_mode: str = 'warn'):
+        """Yield RSDRecords for the given entry rows (any order)."""
+        with open(self.rsd_path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                limit = len(mm); hdr = FieldTable(); body = FieldTable()
+                hdr_col = self.entries['hdr_ofs']
+                for i in rows:
+                    hdr_ofs = int(hdr_col[i])
+                    body_start = _scan_varstruct(mm, hdr_ofs, limit, hdr, crc_mode=crc_mode)
+                    yield _record_from_item(_decode_record(mm, hdr, hdr_ofs, body_start, limit, crc_mode, body=body))
+            finally:
+                mm.close()
+
+
+def _write_index(index_path: str, rsd_path: str, entries: np.ndarray, end_pos: int):
+    size, mtime_ns = _source_stamp(rsd_path)
+    tmp = index_path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(INDEX_MAGIC, size, mtime_ns, entries.shape[0],
+                             INDEX_DTYPE.itemsize, end_pos).ljust(_HEADER_SIZE, b'\x00'))
+        f.write(np.ascontiguousarray(entries, dtype=INDEX_DTYPE).tobytes())
+    os.replace(tmp, index_path)
+
+
+def open_index(rsd_path: str, index_path: Optional[str] = None) -> Optional[RecordIndex]:
+    """Memory-map an existing sidecar. Returns None if missing or stale."""
+    index_path = index_path or index_path_for(rsd_path)
+    try:
+        with open(index_path, 'rb') as f:
+            head = f.read(_HEADER_SIZE)
+        magic, size, mtime_ns, count, itemsize, end_pos = _HEADER.unpack(head[:_HEADER.size])
+    except (OSError, struct.error):
+        return None
+    if magic != INDEX_MAGIC or itemsize != INDEX_DTYPE.itemsize:
+        return None
+    if (size, mtime_ns) != _source_stamp(rsd_path):
+        return None
+    if count == 0:
+        entries = np.zeros(0, dtype=INDEX_DTYPE)
+    else:
+        entries = np.memmap(index_path, dtype=INDEX_DTYPE, mode='r', offset=_HEADER_SIZE, shape=(count,))
+    return RecordIndex(rsd_path, entries, end_pos)
+
+
+def iter_index_entries(mm, pos: int, limit: int, crc_mode: str = 'warn'):
+    """Yield (entry_tuple, next_pos) for every record reached from `pos`."""
+    for it, nxt in _walk(mm, pos, limit, crc_mode):
+        yield (it.hdr_start, it.body_start, it.hop or 0,
+               NO_CHANNEL if it.channel_id is None else it.channel_id & 0xFFFFFFFF, it.seq, it.time_ms,
+               it.sonar_ofs, it.sonar_size, it.trailer_pos - it.body_start), nxt
+
+
+def build_index(rsd_path: str, index_path: Optional[str] = None,
+                progress: Optional[Callable[[float, str], None]] = None,
+                crc_mode: str = 'off', persist: bool = True) -> RecordIndex:
+    """Walk the file once and (optionally) write the sidecar.
+
+    CRC checks are off by default: the index only needs positions, and the
+    records themselves are re-validated when decoded.
+    """
+    with progress_hook(progress):
+        index_path = index_path or index_path_for(rsd_path)
+        rows = []; end_pos = 0
+        with open(rsd_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+            try:
+                pos = _first_header_pos(mm, size) if mm is not None else None
+                if pos is not None:
+                    for row, nxt in iter_index_entries(mm, pos, size, crc_mode):
+                        rows.append(row)
+                        end_pos = nxt if nxt is not None else row[0]
+                        if len(rows) % 5000 == 0:
+                            _emit(min(95.0, row[0] * 100.0 / size), f"Indexing records... ({len(rows)} found)")
+            finally:
+                if mm is not None: mm.close()
+        entries = np.array(rows, dtype=INDEX_DTYPE) if rows else np.zeros(0, dtype=INDEX_DTYPE)
+        _emit(100.0, f"Indexed {len(rows)} records")
+        if persist:
+            try:
+                _write_index(index_path, rsd_path, entries, end_pos)
+            except OSError:
+                pass  # read-only location: keep the in-memory index
+        return RecordIndex(rsd_path, entries, end_pos)
+
+
+def load_or_build_index(rsd_path: str, index_path: Optional[str] = None,
+                        progress: Optional[Callable[[float, str], None]] = None) -> RecordIndex:
+    """Reuse a valid sidecar, otherwise build (and save) a new one."""
+    idx = open_index(rsd_path, index_path)
+    if idx is not None:
+        return idx
+    return build_index(rsd_path, index_path, progress=progress)
+
+
+if __name__ == '__main__':
+    import sys, time
+    for p in sys.argv[1:]:
+        t = time.perf_counter(); idx = load_or_build_index(p)
+        print(f"{p}: {len(idx)} records, channels {idx.channel_counts()} ({time.perf_counter() - t:.3f}s)")
@@ -44,8 +44,8 @@ except ImportError as e:
 
 # Try to import block processing functionality
 try:
-    from block_pipeline import BlockProcessor, get_suggested_channel_pairs, get_transducer_info
-    from colormap_utils import get_available_colormaps, apply_colormap, create_colormap_preview
+    from block_pipeline import BlockProcessor, BlockPrefetcher, get_suggested_channel_pairs, get_transducer_info
+    from colormap_utils import get_available_colormaps, colorize, colormap_lut, create_colormap_preview
     from block_target_detection import BlockTargetAnalysisEngine, BlockTargetDetector
     BLOCK_PROCESSING_AVAILABLE = True
     TARGET_DETECTION_AVAILABLE = True
@@ -141,6 +141,7 @@ class App(tk.Tk):
         self.vh = tk.StringVar(value="200")
         self.vfps = tk.StringVar(value="30")
         self.vmax = tk.StringVar(value="255")
+        self.vspeed = tk.StringVar(value="0")  # x real time for block videos; 0 = one frame per block
         
         # Export options
         self.export_format = tk.StringVar(value="video")
@@ -175,6 +176,7 @@ class App(tk.Tk):
         
         # Runtime state for block processing
         self.block_processor = None
+        self.block_prefetcher = None
         self.current_csv_path = None
         self.current_rsd_path = None
         self.last_output_csv_path = None  # Track CSV output path for exports
@@ -522,6 +524,11 @@ Contact: festeraeb@yahoo.com"""
             ttk.Label(f10, text="Pixels:").pack(side="left", padx=4)
             ttk.Spinbox(f10, from_=10, to=200, textvariable=self.water_column_pixels, width=4).pack(side="left", padx=2)
             
+            # Render settings changed: restart background prefetch at the new settings
+            for var in (self.flip_left, self.flip_right, self.block_preview_mode,
+                        self.remove_water_column, self.water_column_pixels):
+                var.trace_add("write", self._on_block_settings_change)
+            
             # Block navigation
             nav_frame = ttk.Frame(ch_frame)
             nav_frame.pack(fill="x", padx=4, pady=2)
@@ -586,6 +593,8 @@ Contact: festeraeb@yahoo.com"""
         ttk.Entry(vs_frame, textvariable=self.vfps, width=6).pack(side="left", padx=4)
         ttk.Label(vs_frame, text="Max:").pack(side="left", padx=4)
         ttk.Entry(vs_frame, textvariable=self.vmax, width=6).pack(side="left", padx=4)
+        ttk.Label(vs_frame, text="Speed (x):").pack(side="left", padx=4)
+        ttk.Entry(vs_frame, textvariable=self.vspeed, width=6).pack(side="left", padx=4)
         
         # Right side - preview and log
         right = ttk.Frame(main)
@@ -1148,6 +1157,7 @@ Contact: festeraeb@yahoo.com"""
                 except ValueError:
                     limit_rows = None
             
+            from engine_nextgen_syncfirst import ParseCancelled
             try:
                 # Import multi-format parser
                 from parsers.universal_parser import UniversalSonarParser
@@ -1174,7 +1184,9 @@ Contact: festeraeb@yahoo.com"""
                 
                 # Parse the file
                 on_progress(30, f"Phase 4: Parsing {file_format} file...")
-                record_count, csv_path, log_path = parser.parse_records(max_records=limit_rows, progress_callback=on_progress)
+                # Cancelling keeps a checkpoint; the next parse of the same file resumes from it
+                record_count, csv_path, log_path = parser.parse_records(max_records=limit_rows, progress_callback=on_progress,
+                                                                        check_cancel=check_cancel, resume=True)
                 
                 on_progress(85, f"Phase 5: Processing {record_count} records...")
                 
@@ -1224,6 +1236,9 @@ Contact: festeraeb@yahoo.com"""
                 # Store the final CSV path for subsequent operations
                 self.last_output_csv_path = final_csv_path
                     
+            except ParseCancelled as e:
+                on_progress(None, f"Parse cancelled: {str(e)}")
+                self._q.put(("log", f"{e}; progress saved, parse the same file again to resume"))
             except Exception as e:
                 on_progress(None, f"Parse failed: {str(e)}")
                 import traceback
@@ -1380,114 +1395,90 @@ Contact: festeraeb@yahoo.com"""
                 if not left_blocks or not right_blocks:
                     raise RuntimeError(f"No blocks found for channels {left_ch} and {right_ch}")
                 
-                # Pair all blocks (not limited like preview)
-                from block_pipeline import pair_channel_blocks
-                all_paired_blocks = pair_channel_blocks(left_blocks, right_blocks)
-                
-                if not all_paired_blocks:
+                total_blocks = self.block_processor.num_block_pairs(left_ch, right_ch)
+                if not total_blocks:
                     raise RuntimeError("No paired blocks available for export")
                 
-                # Create temporary images from ALL blocks with current colormap
-                temp_dir = Path(self.last_output_csv_path).parent / "temp_block_frames"
-                temp_dir.mkdir(exist_ok=True)
+                render_kwargs = self._block_render_settings()
+                colormap_name = self.colormap_var.get()
+                lut = None
+                if colormap_name != 'gray':
+                    try:
+                        lut = colormap_lut(colormap_name)
+                    except Exception:
+                        lut = None  # keep as grayscale if the colormap is unknown
                 
-                frame_paths = []
-                total_blocks = len(all_paired_blocks)
+                cancelled = []
+                render_workers = max(1, (os.cpu_count() or 1) - 1)
                 
-                for i, (left_block, right_block) in enumerate(all_paired_blocks):
-                    if check_cancel():
-                        return
-                    
-                    # Create block image using the same method as preview
-                    from block_pipeline import compose_channel_block_preview
-                    block_image = compose_channel_block_preview(
-                        self.current_rsd_path,
-                        left_block,
-                        right_block,
-                        preview_mode=self.block_preview_mode.get(),
-                        width=512,
-                        flip_left=self.flip_left.get(),
-                        flip_right=self.flip_right.get(),
-                        remove_water_column=self.remove_water_column.get(),
-                        water_column_pixels=self.water_column_pixels.get()
-                    )
-                    
-                    # For video export, each block represents a complete frame in the waterfall
-                    # Don't split blocks into individual ping rows - treat each block as one frame
-                    block_height, block_width = block_image.shape
-                    
-                    # Convert to PIL Image - ensure uint8 format
-                    if block_image.dtype != np.uint8:
-                        block_image = block_image.astype(np.uint8)
-                    
-                    # Create PIL image from the full block (multiple pings stacked vertically)
-                    img = PIm.fromarray(block_image, mode='L')
-                    
-                    # Apply current colormap
-                    if self.colormap_var.get() != 'gray':
-                        try:
-                            # Convert to RGB for colormap
-                            import matplotlib.pyplot as plt
-                            import matplotlib.cm as cm
-                            
-                            # Normalize to 0-1 range
-                            normalized = block_image.astype(np.float32) / 255.0
-                            
-                            # Apply colormap
-                            colormap = cm.get_cmap(self.colormap_var.get())
-                            colored = colormap(normalized)
-                            
-                            # Convert back to uint8 RGB
-                            rgb_image = (colored[:, :, :3] * 255).astype(np.uint8)
-                            img = PIm.fromarray(rgb_image, mode='RGB')
-                        except:
-                            # Keep as grayscale if colormap fails
-                            pass
-                    
-                    # Save the complete block as one frame
-                    frame_path = temp_dir / f"frame_{i:06d}.png"
-                    img.save(frame_path)
-                    frame_paths.append(str(frame_path))
-                    
-                    progress = 5 + (i + 1) * 30 // total_blocks
-                    on_progress(progress, f"Generating frame from block {i+1}/{total_blocks}")
+                def render_one(i):
+                    # Same cached grayscale block as the preview; each block is one waterfall row
+                    return self.block_processor.render_block(left_ch, right_ch, i, **render_kwargs)
+                
+                row_h = int(self.block_processor.render_block(left_ch, right_ch, 0, **render_kwargs).shape[0])
+                
+                # Time-based playback: only the blocks some frame shows are rendered
+                try:
+                    speed = float(self.vspeed.get() or 0)
+                except ValueError:
+                    speed = 0.0
+                schedule = None
+                block_ids = list(range(total_blocks))
+                if speed > 0:
+                    schedule = exporter_module.schedule_frames(
+                        left_blocks.end_times()[:total_blocks], int(self.vfps.get()), speed,
+                        row_h, int(self.vh.get()))
+                    block_ids = schedule.rows_needed.tolist()
+                    self._q.put(("log", f"  {speed:g}x real time: {len(schedule)} frames from "
+                                        f"{len(block_ids)}/{total_blocks} blocks"))
+                
+                def block_frames():
+                    """Composed blocks as arrays, colormapped by table lookup, straight to the encoder."""
+                    from render_accel import ordered_map
+                    blocks = ordered_map(render_one, ((i,) for i in block_ids),
+                                         render_workers, executor="thread")
+                    for n, block_image in enumerate(blocks):
+                        if check_cancel():
+                            cancelled.append(n)
+                            blocks.close()
+                            return
+                        yield block_image if lut is None else lut[block_image]
+                        on_progress(5 + (n + 1) * 90 // max(1, len(block_ids)),
+                                    f"Encoding block {block_ids[n]+1}/{total_blocks}")
                 
                 # Configure export
                 cfg = {
-                    'COLORMAP': self.colormap_var.get(),
+                    'COLORMAP': colormap_name,
                     'SHOW_SEAM': self.show_seam.get(),
-                    'PREVIEW_MODE': self.block_preview_mode.get()
+                    'PREVIEW_MODE': self.block_preview_mode.get(),
+                    'RENDER_WORKERS': render_workers
                 }
+                debug_dir = os.environ.get('RSD_DEBUG_FRAME_DIR')
+                if debug_dir:
+                    cfg['DEBUG_FRAME_DIR'] = debug_dir  # optional PNG copy of every frame
                 
-                on_progress(40, "Phase 2: Encoding video...")
+                on_progress(5, "Phase 2: Rendering and encoding video...")
                 
-                if frame_paths:
-                    # Use the first frame to determine row height
-                    arr0 = np.array(PIm.open(frame_paths[0]))
-                    row_h = int(arr0.shape[0])
-                    
-                    exporter_module.export_waterfall_mp4(
-                        frame_paths, cfg, out_path, row_h,
-                        int(self.vh.get()),
-                        int(self.vfps.get()),
-                        int(self.vmax.get()),
-                        log_func=lambda m: on_progress(None, f"[Video] {m}")
-                    )
-                    
-                    # Cleanup temp files
-                    import shutil
-                    shutil.rmtree(temp_dir, ignore_errors=True)
-                    
-                    total_frames = len(frame_paths)
-                    video_length_seconds = total_frames / int(self.vfps.get())
-                    
-                    on_progress(100, f"✓ Block video export complete: {Path(out_path).name}")
-                    self._q.put(("log", f"✓ Block video exported: {out_path}"))
-                    self._q.put(("log", f"  {total_blocks} blocks → {total_frames} frames"))
-                    self._q.put(("log", f"  Video length: {video_length_seconds:.1f} seconds @ {self.vfps.get()} FPS"))
-                    self._q.put(("log", f"  Colormap: {self.colormap_var.get()}"))
-                else:
-                    raise RuntimeError("No block frames to export")
+                total_frames = exporter_module.export_waterfall_frames(
+                    block_frames(), cfg, out_path, row_h,
+                    int(self.vh.get()),
+                    int(self.vfps.get()),
+                    int(self.vmax.get()),
+                    log_func=lambda m: on_progress(None, f"[Video] {m}"),
+                    schedule=schedule
+                )
+                if cancelled:
+                    return
+                if schedule is not None:
+                    total_frames = len(schedule)
+                
+                video_length_seconds = total_frames / int(self.vfps.get())
+                
+                on_progress(100, f"✓ Block video export complete: {Path(out_path).name}")
+                self._q.put(("log", f"✓ Block video exported: {out_path}"))
+                self._q.put(("log", f"  {total_blocks} blocks → {total_frames} frames"))
+                self._q.put(("log", f"  Video length: {video_length_seconds:.1f} seconds @ {self.vfps.get()} FPS"))
+                self._q.put(("log", f"  Colormap: {colormap_name}"))
             else:
                 on_progress(5, f"Phase 1: Preparing {fmt.upper()} export from blocks")
                 
@@ -1522,12 +1513,11 @@ Contact: festeraeb@yahoo.com"""
                     if check_cancel():
                         return
                     
-                    # Create block image using the same method as preview
-                    from block_pipeline import compose_channel_block_preview
-                    block_image = compose_channel_block_preview(
-                        self.current_rsd_path,
-                        left_block,
-                        right_block,
+                    # Create block image using the same method as preview (cached grayscale)
+                    block_image = self.block_processor.render_block(
+                        left_ch,
+                        right_ch,
+                        i,
                         preview_mode=self.block_preview_mode.get(),
                         width=512,
                         flip_left=self.flip_left.get(),
@@ -1551,24 +1541,11 @@ Contact: festeraeb@yahoo.com"""
                     
                     img = PIm.fromarray(block_image, mode='L')
                     
-                    # Apply current colormap
+                    # Apply current colormap (uint8 lookup table, no float image)
                     if self.colormap_var.get() != 'gray':
                         try:
-                            # Convert to RGB for colormap
-                            import matplotlib.pyplot as plt
-                            import matplotlib.cm as cm
-                            
-                            # Normalize to 0-1 range
-                            normalized = block_image.astype(np.float32) / 255.0
-                            
-                            # Apply colormap
-                            colormap = cm.get_cmap(self.colormap_var.get())
-                            colored = colormap(normalized)
-                            
-                            # Convert back to uint8 RGB
-                            rgb_image = (colored[:, :, :3] * 255).astype(np.uint8)
-                            img = PIm.fromarray(rgb_image, mode='RGB')
-                        except:
+                            img = PIm.fromarray(colorize(block_image, self.colormap_var.get()), mode='RGB')
+                        except Exception:
                             # Keep as grayscale if colormap fails
                             pass
                     
@@ -2000,6 +1977,9 @@ Contact: festeraeb@yahoo.com"""
             # Initialize block processor
             try:
                 self.block_processor = BlockProcessor(str(csv_path), rsd_path, self.block_size.get())
+                if self.block_prefetcher:
+                    self.block_prefetcher.close()
+                self.block_prefetcher = BlockPrefetcher(self.block_processor)
                 self.current_csv_path = str(csv_path)
                 self.current_rsd_path = rsd_path
                 self.last_output_csv_path = str(csv_path)  # Set for export functionality
@@ -2114,7 +2094,7 @@ Contact: festeraeb@yahoo.com"""
                 if not left_blocks and not right_blocks:
                     # More specific error message
                     available_channels = self.block_processor.get_available_channels()
-                    total_records = len(self.block_processor.records)
+                    total_records = len(self.block_processor)
                     raise RuntimeError(f"No blocks found for channels {left_ch} and {right_ch}. "
                                      f"Available channels: {available_channels}, "
                                      f"Total records loaded: {total_records}, "
@@ -2127,84 +2107,46 @@ Contact: festeraeb@yahoo.com"""
                 # Process blocks individually with new preview method
                 on_progress(30, "Creating proper channel block previews...")
                 
-                from block_pipeline import compose_channel_block_preview
-                
-                # Get preview settings
-                preview_mode = self.block_preview_mode.get()
-                remove_water = self.remove_water_column.get()
-                water_pixels = self.water_column_pixels.get()
-                flip_left_val = self.flip_left.get()
-                flip_right_val = self.flip_right.get()
-                
-                # Process blocks up to a reasonable limit for preview
-                max_preview_blocks = 20  # Limit for performance
-                total_blocks = min(len(left_blocks), len(right_blocks), max_preview_blocks)
+                # Blocks are rendered on demand (cached per settings) and the
+                # neighbours of the one on screen are prefetched in the background
+                settings = self._block_render_settings()
+                total_blocks = self.block_processor.num_block_pairs(left_ch, right_ch)
                 
                 if total_blocks == 0:
                     raise RuntimeError("No block pairs to process")
                 
-                on_progress(40, f"Processing {total_blocks} block pairs...")
+                on_progress(40, f"Indexing {total_blocks} block pairs...")
                 
-                # Process each block pair
-                valid_blocks = 0
+                block_entries = []
                 for i in range(total_blocks):
-                    if check_cancel():
-                        return
-                        
-                    left_block = left_blocks[i] if i < len(left_blocks) else []
-                    right_block = right_blocks[i] if i < len(right_blocks) else []
-                    
-                    try:
-                        # Create proper channel block preview
-                        block_image = compose_channel_block_preview(
-                            self.current_rsd_path,
-                            left_block,
-                            right_block,
-                            preview_mode=preview_mode,
-                            width=512,  # Reasonable width for preview
-                            flip_left=flip_left_val,
-                            flip_right=flip_right_val,
-                            remove_water_column=remove_water,
-                            water_column_pixels=water_pixels
-                        )
-                        
-                        if block_image is not None and block_image.size > 0:
-                            # Convert to PIL Image for display
-                            pil_image = PIm.fromarray(block_image, mode='L')
-                            
-                            block_data = {
-                                'image': pil_image,
-                                'metadata': {
-                                    'block_index': i,
-                                    'left_records': len(left_block),
-                                    'right_records': len(right_block),
-                                    'preview_mode': preview_mode,
-                                    'water_removed': remove_water,
-                                    'channels': f"Ch{left_ch:02d}/Ch{right_ch:02d}"
-                                }
-                            }
-                            
-                            self.current_block_images.append(block_data)
-                            valid_blocks += 1
-                        else:
-                            on_progress(None, f"Warning: Block {i} generated empty image")
-                            
-                    except Exception as e:
-                        on_progress(None, f"Warning: Block {i} failed: {str(e)}")
-                        continue
-                    
-                    progress = 50 + (i + 1) * 45 // total_blocks
-                    on_progress(progress, f"Processing block {i+1}/{total_blocks} (valid: {valid_blocks})")
+                    block_entries.append({
+                        'metadata': {
+                            'block_index': i,
+                            'left_channel': left_ch,
+                            'right_channel': right_ch,
+                            'left_records': len(left_blocks[i]),
+                            'right_records': len(right_blocks[i]),
+                            'channels': f"Ch{left_ch:02d}/Ch{right_ch:02d}"
+                        }
+                    })
+                
+                if check_cancel():
+                    return
                 
-                if valid_blocks == 0:
-                    raise RuntimeError("No valid blocks generated - all blocks were empty or invalid")
+                on_progress(60, "Rendering first block...")
+                first_image = self.block_prefetcher.get(left_ch, right_ch, 0, **settings)
+                if first_image is None or first_image.size == 0:
+                    raise RuntimeError("First block generated an empty image")
+                self.current_block_images = block_entries
+                self.block_prefetcher.prefetch(left_ch, right_ch, 0, **settings)
+                valid_blocks = total_blocks
                 
                 on_progress(100, f"✓ Block preview complete - {valid_blocks} proper channel blocks ready")
                 
                 # Add completion message to log
                 self._q.put(("log", ""))
                 self._q.put(("log", "=== BLOCK PREVIEW COMPLETE ==="))
-                self._q.put(("log", f"✓ Generated {valid_blocks} valid image blocks"))
+                self._q.put(("log", f"✓ {valid_blocks} image blocks ready (rendered on demand, neighbours prefetched)"))
                 self._q.put(("log", f"✓ Channels: Ch{left_ch:02d} (left) + Ch{right_ch:02d} (right)"))
                 self._q.put(("log", f"✓ Auto-alignment: {'ON' if self.auto_align.get() else 'OFF'}"))
                 self._q.put(("log", f"✓ Manual shift: {self.manual_shift.get()} pixels"))
@@ -2232,6 +2174,28 @@ Contact: festeraeb@yahoo.com"""
         self._create_progress_bar("block_preview", "Generating block preview...")
         self.process_mgr.start_process("block_preview", block_preview_job)
     
+    def _block_render_settings(self):
+        """Current block render settings as BlockProcessor.render_block keyword arguments."""
+        try:
+            water_pixels = int(self.water_column_pixels.get())
+        except (tk.TclError, ValueError):
+            water_pixels = 50  # spinbox mid-edit
+        return {
+            'preview_mode': self.block_preview_mode.get(),
+            'width': 512,
+            'flip_left': self.flip_left.get(),
+            'flip_right': self.flip_right.get(),
+            'remove_water_column': self.remove_water_column.get(),
+            'water_column_pixels': water_pixels,
+        }
+    
+    def _on_block_settings_change(self, *args):
+        """Cancel stale prefetch work and prefetch around the current block at the new settings."""
+        if self.block_prefetcher and self.current_block_images:
+            meta = self.current_block_images[self.current_block_index]['metadata']
+            self.block_prefetcher.prefetch(meta['left_channel'], meta['right_channel'],
+                                           meta['block_index'], **self._block_render_settings())
+    
     def _display_block(self, block_index):
         """Display a specific block with proper channel block scaling."""
         if not self.current_block_images or block_index >= len(self.current_block_images):
@@ -2239,38 +2203,42 @@ Contact: festeraeb@yahoo.com"""
             
         self.current_block_index = block_index
         block_data = self.current_block_images[block_index]
+        meta = block_data['metadata']
+        settings = self._block_render_settings()
         
-        # Get the base image
-        img = block_data['image']
+        # Get the base image (prefetched blocks come straight from the cache)
+        block_image = self.block_prefetcher.get(meta['left_channel'], meta['right_channel'],
+                                                meta['block_index'], **settings)
+        self.block_prefetcher.prefetch(meta['left_channel'], meta['right_channel'],
+                                       meta['block_index'], **settings)
+        img_array = block_image
         
-        # Apply colormap if available and selected
+        # Apply colormap if available and selected (contrast stretch folded into the lookup table)
         if BLOCK_PROCESSING_AVAILABLE and hasattr(self, 'colormap_var') and self.colormap_var.get() != 'grayscale':
             try:
-                # Convert PIL image to apply colormap
-                img = apply_colormap(img, self.colormap_var.get())
+                img_array = colorize(block_image, self.colormap_var.get(), contrast='auto')
             except Exception as e:
                 print(f"Warning: Failed to apply colormap: {e}")
         
-        # Convert PIL image to numpy array for display
-        img_array = np.array(img)
-        
         # Display using our enhanced canvas display method
         # This will automatically handle proper scaling for channel blocks
         self._display_numpy_array_in_canvas(img_array)
         
         # Update block info
-        meta = block_data['metadata']
         info_text = f"Block {meta['block_index']} | "
         info_text += f"Records: {meta['left_records']}/{meta['right_records']} | "
         info_text += f"{meta['channels']} | {block_index + 1}/{len(self.current_block_images)}"
-        info_text += f" | Mode: {meta['preview_mode']}"
+        info_text += f" | Mode: {settings['preview_mode']}"
         
-        if meta.get('water_removed', False):
+        if settings['remove_water_column']:
             info_text += " | Water column removed"
         
         if hasattr(self, 'colormap_var'):
             info_text += f" | Colormap: {self.colormap_var.get()}"
         
+        stats = self.block_prefetcher.stats()
+        info_text += f" | Cache: {stats['hits']} hits / {stats['misses']} misses"
+        
         self.block_info_label.config(text=info_text)
         
         # Update navigation buttons
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# synthetic_rsd.py — writes small/large Garmin-style RSD files for tests and benchmarks
+"""
+Synthetic RSD writer.
+
+Produces files laid out the way engine_nextgen_syncfirst expects:
+
+    [header varstruct][body varstruct][sonar samples][trailer: magic, chunk_size, crc]
+
+Header fields: 0=magic, 1=filler, 2=seq, 4=data_sz, 5=time_ms.
+(Field 1 is a constant 0xFFFFFFFF varuint; read as a length it overruns the
+file, so the engine's 1-byte backtrack probe can never mis-sync on it.)
+Body fields:   0=channel, 1=depth (zigzag varint), 7=sample_cnt, 9=lat, 10=lon, 11=beam.
+`chunk_size` in the trailer is the hop from this header to the next one.
+"""
+
+import argparse
+import random
+import struct
+from typing import Optional, Sequence
+
+from core_shared import MAGIC_REC_HDR, MAGIC_REC_TRL, _crc32_fast
+
+PREAMBLE = 64  # bytes of zero padding before the first record
+
+
+def _varuint(v: int) -> bytes:
+    out = bytearray()
+    while True:
+        b = v & 0x7F; v >>= 7
+        if v: out.append(b | 0x80)
+        else:
+            out.append(b); return bytes(out)
+
+
+def _zigzag(v: int) -> int:
+    return (v << 1) ^ (v >> 63)
+
+
+def encode_varstruct(fields) -> bytes:
+    """Encode [(field_no, value_bytes), ...] as a varstruct with trailing CRC."""
+    out = bytearray(_varuint(len(fields)))
+    for fn, val in fields:
+        if len(val) < 7:
+            out += _varuint((fn << 3) | len(val))
+        else:
+            out += _varuint((fn << 3) | 7) + _varuint(len(val))
+        out += val
+    return bytes(out) + struct.pack('>I', _crc32_fast(bytes(out)))
+
+
+def _deg_to_mapunit(d: float) -> int:
+    return int(round(d * float(1 << 32) / 360.0))
+
+
+def build_record(seq: int, channel: int, time_ms: int, lat: float, lon: float,
+                 depth_m: float, samples: bytes, beam_deg: float = 0.0,
+                 hop: bool = True) -> bytes:
+    """Build one complete record (header, body, samples, trailer)."""
+    body = encode_varstruct([
+        (0, struct.pack('<I', channel)),
+        (1, _varuint(_zigzag(int(depth_m * 1000)))),
+        (7, struct.pack('<I', len(samples))),
+        (9, struct.pack('>i', _deg_to_mapunit(lat))),
+        (10, struct.pack('>i', _deg_to_mapunit(lon))),
+        (11, struct.pack('<f', beam_deg)),
+    ])
+    data_sz = len(body) + len(samples)
+    hdr = encode_varstruct([
+        (0, struct.pack('<I', MAGIC_REC_HDR)),
+        (1, b'\xff\xff\xff\xff\x0f'),
+        (2, struct.pack('<I', seq)),
+        (4, struct.pack('<H', data_sz)),
+        (5, struct.pack('<I', time_ms)),
+    ])
+    total = len(hdr) + data_sz + 12
+    trailer = struct.pack('>III', MAGIC_REC_TRL, total if hop else 0, 0)
+    return hdr + body + samples + trailer
+
+
+def iter_records(n_records: int, channels: Sequence[int] = (4, 5), samples: int = 512,
+                 seed: int = 1234, ping_ms: int = 100, hop: bool = True):
+    """Yield encoded records. Channels alternate; lat/lon walk a short track."""
+    rnd = random.Random(seed)
+    lat, lon = 45.0, -84.0
+    ramp = bytes(i * 255 // max(1, samples - 1) for i in range(samples))
+    for i in range(n_records):
+        ch = channels[i % len(channels)]
+        if i % len(channels) == 0:
+            lat += 1e-5; lon += 1e-5
+        noise = bytes(rnd.getrandbits(6) for _ in range(16)) * (samples // 16 + 1)
+        payload = bytes((a + b) & 0x7F for a, b in zip(ramp, noise[:samples]))
+        yield build_record(i, ch, i * ping_ms, lat, lon, 5.0 + (i % 50) * 0.1, payload,
+                           beam_deg=float(ch), hop=hop)
+
+
+def write_synthetic_rsd(path: str, n_records: int, channels: Sequence[int] = (4, 5),
+                        samples: int = 512, seed: int = 1234, hop: bool = True,
+                        garbage_every: Optional[int] = None) -> str:
+    """Write a synthetic RSD file and return its path.
+
+    garbage_every: insert a run of junk bytes after every Nth record. The
+    record's hop lands on the junk, so the reader has to resync with find_magic.
+    """
+    with open(path, 'wb') as f:
+        f.write(b'\x00' * PREAMBLE)
+        for i, rec in enumerate(iter_records(n_records, channels, samples, seed, hop=hop)):
+            f.write(rec)
+            if garbage_every and (i + 1) % garbage_every == 0:
+                f.write(b'\xAA' * 37)
+    return path
+
+
+def write_synthetic_rsd_bytes(path: str, target_bytes: int, **kw) -> str:
+    """Write a synthetic file of roughly `target_bytes` (benchmarks)."""
+    samples = kw.get('samples', 512)
+    per = len(next(iter_records(1, samples=samples)))
+    return write_synthetic_rsd(path, max(1, target_bytes // per), **kw)
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Write a synthetic RSD file')
+    ap.add_argument('out')
+    ap.add_argument('--records', type=int, default=10000)
+    ap.add_argument('--samples', type=int, default=512)
+    ap.add_argument('--size-mb', type=float, default=None, help='Target size instead of --records')
+    a = ap.parse_args()
+    if a.size_mb:
+        write_synthetic_rsd_bytes(a.out, int(a.size_mb * 1024 * 1024), samples=a.samples)
+    else:
+        write_synthetic_rsd(a.out, a.records, samples=a.samples)
+    print('Wrote', a.out)
@@ -58,11 +58,13 @@ class TargetSignature:
 class TargetDetector:
     """Advanced target detection and classification system"""
     
-    def __init__(self, rsd_path: str, csv_path: str):
+    def __init__(self, rsd_path: str, csv_path: str, reader=None):
         self.rsd_path = Path(rsd_path)
         self.csv_path = Path(csv_path)
         self.records_df = None
-        self.sonar_cache = {}
+        # Payloads come from the per-file PingReader shared with the block pipeline
+        from block_pipeline import shared_ping_reader
+        self.reader = reader or shared_ping_reader(str(rsd_path), str(csv_path))
         
         # Target signatures database
         self.target_signatures = self._init_target_signatures()
@@ -145,11 +147,12 @@ class TargetDetector:
         return signatures
     
     def load_data(self):
-        """Load sonar data from CSV file"""
+        """Load sonar data from CSV file (or a columnar .npy/.parquet record file)"""
         print(f"Loading sonar data from {self.csv_path}")
         
         try:
-            self.records_df = pd.read_csv(self.csv_path)
+            from record_columns import read_records_frame
+            self.records_df = read_records_frame(self.csv_path)
             print(f"Loaded {len(self.records_df)} records")
             
             # Filter to only records with sonar data
@@ -173,20 +176,9 @@ class TargetDetector:
         if pd.isna(record['sonar_ofs']) or pd.isna(record['sonar_size']):
             return None
             
-        cache_key = (record['sonar_ofs'], record['sonar_size'])
-        if cache_key in self.sonar_cache:
-            return self.sonar_cache[cache_key]
-        
         try:
-            with open(self.rsd_path, 'rb') as f:
-                f.seek(int(record['sonar_ofs']))
-                payload = f.read(int(record['sonar_size']))
-                
-            if payload:
-                # Convert to intensity values
-                sonar_data = np.frombuffer(payload, dtype=np.uint8).astype(np.float32) / 255.0
-                self.sonar_cache[cache_key] = sonar_data
-                return sonar_data
+            # Intensity values in [0, 1], cached by the reader's LRU
+            return self.reader.intensity(record)
                 
         except Exception as e:
             print(f"Error reading sonar data: {e}")
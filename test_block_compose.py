@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from block_pipeline import (PingReader, RSDRecord, _compose_preview_per_ping, _max_scaled_row,
+                            compose_channel_block_preview, read_records_from_csv, resample_block)
+from engine_nextgen_syncfirst import parse_rsd
+from synthetic_rsd import write_synthetic_rsd
+
+
+def _close(a, b):
+    return a.shape == b.shape and int(np.abs(a.astype(int) - b).max()) <= 1
+
+
+@pytest.mark.parametrize('n,width', [(700, 256), (128, 256), (256, 256), (1, 64), (2, 9), (3000, 37)])
+def test_resample_block_matches_per_ping(n, width):
+    rng = np.random.default_rng(n)
+    lengths = rng.integers(1, n + 1, 40) if n > 1 else np.ones(40, dtype=int)
+    lengths[:20] = n
+    lengths[5] = 0
+    mat = rng.integers(0, 256, (40, n), dtype=np.uint8)
+    mat[7] = 0
+    for i, k in enumerate(lengths):
+        mat[i, k:] = 0
+    out = resample_block(mat, lengths, width)
+    for i, k in enumerate(lengths):
+        ref = _max_scaled_row(mat[i, :k], width) if k else np.zeros(width, dtype=np.uint8)
+        assert _close(out[i], ref), i
+
+
+def test_block_preview_matches_per_ping(tmp_path):
+    path = write_synthetic_rsd(str(tmp_path / 'a.RSD'), 240, samples=600, garbage_every=11)
+    _, csv_path, _ = parse_rsd(path, str(tmp_path / 'out'), ping_store=True)
+    records = read_records_from_csv(csv_path)
+    left = [r for r in records if r.channel_id == 4][:100]
+    right = [r for r in records if r.channel_id == 5][:90]
+    right[3] = RSDRecord(**{**right[3].__dict__, 'sonar_ofs': None})
+    reader = PingReader(path)
+    for kw in [{}, dict(flip_left=True, remove_water_column=True, water_column_pixels=30),
+               dict(preview_mode='right', flip_right=True, width=300), dict(preview_mode='left', width=1600)]:
+        ref = _compose_preview_per_ping(reader, left, right, **kw)
+        out = compose_channel_block_preview(path, left, right, reader=reader, **kw)
+        assert _close(out, ref), kw
+    assert not compose_channel_block_preview(path, left, right, reader=reader)[3, 260:].any()
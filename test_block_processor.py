@@ -0,0 +1,125 @@
+import threading
+import tracemalloc
+
+import numpy as np
+
+import block_pipeline
+from block_pipeline import (BlockPrefetcher, BlockProcessor, RecordBlock, compose_channel_block_preview,
+                            create_channel_blocks, read_records_from_csv, split_by_channels,
+                            stream_block_pairs)
+from engine_nextgen_syncfirst import parse_rsd
+from synthetic_rsd import write_synthetic_rsd
+
+
+def _processor(tmp_path, n=230, block_size=20):
+    path = write_synthetic_rsd(str(tmp_path / 'a.RSD'), n, samples=128)
+    _, csv_path, _ = parse_rsd(path, str(tmp_path / 'out'))
+    return path, csv_path, BlockProcessor(csv_path, path, block_size=block_size)
+
+
+def test_lazy_blocks_match_record_lists(tmp_path):
+    path, csv_path, bp = _processor(tmp_path)
+    assert bp._records is None and len(bp) == 230
+    by_channel = split_by_channels(read_records_from_csv(csv_path))
+    assert bp.get_available_channels() == sorted(by_channel)
+    for ch, records in by_channel.items():
+        expected = create_channel_blocks(records, 20)
+        blocks = bp.get_channel_blocks(ch)
+        assert len(blocks) == len(expected)
+        assert all(isinstance(b, RecordBlock) for b in blocks)
+        assert [len(b) for b in blocks] == [len(b) for b in expected]
+        assert list(blocks[-1]) == expected[-1] and blocks[1][3:7].records() == expected[1][3:7]
+        assert blocks.end_times().tolist() == [b[-1].time_ms for b in expected]
+    assert bp._records is None
+    assert not bp.get_channel_blocks(99)
+    assert bp.by_channel == by_channel and bp.by_channel is bp.by_channel
+    assert bp.by_channel[4][0] is bp.records[int(bp.channel_rows(4)[0])]
+
+
+def test_render_block_is_cached_per_setting(tmp_path):
+    path, csv_path, bp = _processor(tmp_path)
+    left, right = bp.get_channel_blocks(4)[2], bp.get_channel_blocks(5)[2]
+    image = bp.render_block(4, 5, 2, flip_left=True)
+    assert np.array_equal(image, compose_channel_block_preview(path, list(left), list(right),
+                                                               flip_left=True))
+    assert not image.flags.writeable
+    assert bp.render_block(4, 5, 2, flip_left=True) is image
+    assert bp.render_block(4, 5, 2, water_column_pixels=10) is bp.render_block(4, 5, 2)
+    assert bp.render_block(4, 5, 2, preview_mode='left').shape[1] == 256
+    assert len(bp.image_cache) == 3 and bp.image_cache.hits == 2
+
+    small = BlockProcessor(csv_path, path, block_size=20, cache_bytes=image.nbytes * 2)
+    for i in range(small.num_block_pairs(4, 5)):
+        small.render_block(4, 5, i)
+    assert small.image_cache.nbytes <= image.nbytes * 2
+
+    results = list(bp.process_channel_pair(4, 5))
+    assert len(results) == bp.num_block_pairs(4, 5)
+    assert next(bp.process_channel_pair(4, 5))['image'] is results[0]['image']
+
+
+def test_prefetcher_renders_neighbours_and_counts_hits(tmp_path):
+    path, csv_path, bp = _processor(tmp_path)
+    prefetcher = BlockPrefetcher(bp, radius=2)
+    try:
+        first = prefetcher.get(4, 5, 2)
+        prefetcher.prefetch(4, 5, 2)
+        assert prefetcher.wait_idle(10)
+        assert all(bp.is_rendered(4, 5, i) for i in (0, 1, 3, 4)) and not bp.is_rendered(4, 5, 5)
+        assert prefetcher.get(4, 5, 3) is bp.render_block(4, 5, 3)
+        assert prefetcher.get(4, 5, 2) is first
+        assert prefetcher.stats() == {'hits': 2, 'misses': 1, 'prefetched': 4}
+
+        prefetcher.cancel()
+        prefetcher.prefetch(4, 5, 3, flip_right=True)
+        assert prefetcher.wait_idle(10)
+        assert bp.is_rendered(4, 5, 5, flip_right=True) and not bp.is_rendered(4, 5, 3, flip_right=True)
+    finally:
+        prefetcher.close()
+
+
+def test_prefetcher_get_waits_for_inflight_render(tmp_path, monkeypatch):
+    path, csv_path, bp = _processor(tmp_path)
+    started, release, calls = threading.Event(), threading.Event(), []
+    compose = block_pipeline.compose_channel_block_preview
+
+    def slow_compose(*args, **kwargs):
+        calls.append(threading.current_thread().name)
+        started.set()
+        release.wait(10)
+        return compose(*args, **kwargs)
+
+    monkeypatch.setattr(block_pipeline, 'compose_channel_block_preview', slow_compose)
+    prefetcher = BlockPrefetcher(bp, radius=1)
+    try:
+        prefetcher.prefetch(4, 5, 2)
+        assert started.wait(10)
+        threading.Timer(0.2, release.set).start()
+        image = prefetcher.get(4, 5, 3)
+        assert prefetcher.wait_idle(10)
+        assert image is bp.render_block(4, 5, 3)
+        assert calls == ['block-prefetch'] * 2
+        assert prefetcher.stats() == {'hits': 1, 'misses': 0, 'prefetched': 2}
+    finally:
+        prefetcher.close()
+
+
+def test_stream_block_pairs_matches_processor(tmp_path):
+    path, csv_path, bp = _processor(tmp_path, n=1230)
+    left, right = bp.get_channel_blocks(4), bp.get_channel_blocks(5)
+    for source in (csv_path, path):
+        pairs = list(stream_block_pairs(source, 4, 5, block_size=20, batch_size=64))
+        assert len(pairs) == bp.num_block_pairs(4, 5)
+        for (a, b), want_a, want_b in zip(pairs, left, right):
+            assert a.columns[a.rows].tobytes() == want_a.columns[want_a.rows].tobytes()
+            assert list(b) == list(want_b)
+
+    tracemalloc.start()
+    for _ in stream_block_pairs(csv_path, 4, 5, block_size=20, batch_size=64):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak < len(bp.columns) * bp.columns.itemsize
+
+    one_sided = [bp.columns[bp.channel_rows(4)], bp.columns[bp.channel_rows(5)]]
+    assert len(list(stream_block_pairs(one_sided, 4, 5, block_size=20, max_lag_blocks=2))) == 2
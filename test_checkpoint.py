@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from engine_nextgen_syncfirst import ParseCancelled, checkpoint_path, parse_rsd, write_parsed_records
+from synthetic_rsd import write_synthetic_rsd
+
+
+def _canceller(after):
+    calls = {'n': 0}
+    def check():
+        calls['n'] += 1
+        return calls['n'] >= after
+    return check
+
+
+def test_cancel_then_resume_matches_full_parse(tmp_path):
+    rsd = write_synthetic_rsd(str(tmp_path / 'a.RSD'), 400, samples=64, garbage_every=11)
+    _, full_csv, _ = parse_rsd(rsd, str(tmp_path / 'full'))
+    out = str(tmp_path / 'out')
+
+    with pytest.raises(ParseCancelled):
+        parse_rsd(rsd, out, check_cancel=_canceller(137))
+    csv_path = os.path.join(out, 'a.csv')
+    assert os.path.exists(checkpoint_path(csv_path))
+
+    n, csv_path, _ = parse_rsd(rsd, out, resume=True)
+    assert n == 400
+    assert open(csv_path).read() == open(full_csv).read()
+    assert not os.path.exists(checkpoint_path(csv_path))
+
+
+def test_crash_between_checkpoints_is_rolled_back(tmp_path):
+    rsd = write_synthetic_rsd(str(tmp_path / 'a.RSD'), 300, samples=64)
+    _, full_csv, _ = parse_rsd(rsd, str(tmp_path / 'full'))
+    out = tmp_path / 'out'
+    out.mkdir()
+
+    def boom():
+        boom.n += 1
+        if boom.n == 130: raise RuntimeError('power cut')
+        return False
+    boom.n = 0
+    with pytest.raises(RuntimeError):
+        write_parsed_records(rsd, str(out / 'a.csv'), str(out / 'a.log'), checkpoint_every=50, check_cancel=boom)
+    # 130 rows reached the CSV but the checkpoint covers 100: resume must not duplicate 101..130
+    n, csv_path, _ = parse_rsd(rsd, str(out), resume=True)
+    assert n == 300
+    assert open(csv_path).read() == open(full_csv).read()
+
+
+def test_resume_ignores_stale_checkpoint_and_respects_limit(tmp_path):
+    rsd = write_synthetic_rsd(str(tmp_path / 'a.RSD'), 200, samples=64)
+    out = str(tmp_path / 'out')
+    with pytest.raises(ParseCancelled):
+        parse_rsd(rsd, out, check_cancel=_canceller(40))
+    n, _, _ = parse_rsd(rsd, out, max_records=120, resume=True)
+    assert n == 120
+
+    with pytest.raises(ParseCancelled):
+        parse_rsd(rsd, out, check_cancel=_canceller(40))
+    write_synthetic_rsd(rsd, 150, samples=64)  # file changed: checkpoint no longer applies
+    os.utime(rsd, ns=(1, 1))
+    n, csv_path, _ = parse_rsd(rsd, out, resume=True)
+    assert n == 150
+    assert sum(1 for _ in open(csv_path)) == 151
+
+
+def test_universal_parser_cancel_then_resume(tmp_path):
+    from parsers.universal_parser import UniversalSonarParser
+    rsd = write_synthetic_rsd(str(tmp_path / 'a.RSD'), 300, samples=64)
+    _, full_csv, _ = parse_rsd(rsd, str(tmp_path / 'full'))
+
+    parser = UniversalSonarParser(rsd)
+    with pytest.raises(ParseCancelled):
+        parser.parse_records(check_cancel=_canceller(120), resume=True)
+    n, csv_path, _ = parser.parse_records(resume=True)
+    assert n == 300
+    assert open(csv_path).read() == open(full_csv).read()
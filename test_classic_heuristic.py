@@ -0,0 +1,65 @@
+import mmap
+import random
+import struct
+
+from engine_classic_varstruct import (RECORD_MAGIC, iter_record_spans, parse_record_heuristic,
+                                      parse_rsd_records_classic)
+
+
+def _reference(path, start_ofs=0x5000, limit=None):
+    """The scalar decoder over every header (what the engine did without its 20k cap)."""
+    out = []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for pos, size in iter_record_spans(mm, start_ofs):
+            if limit and len(out) >= limit: break
+            if size < 16 or size > 0x100000: continue
+            rec = parse_record_heuristic(mm, pos, size, len(out))
+            if rec: out.append(rec)
+    return out
+
+
+def _write_classic(path, n_records, seed=7):
+    rnd = random.Random(seed)
+    unit = lambda deg: int(round(deg * (1 << 32) / 360.0))
+    data = bytearray(rnd.getrandbits(8) for _ in range(0x5000 + 3))
+    for i in range(n_records):
+        body = bytearray(rnd.getrandbits(8) for _ in range(rnd.randrange(40, 1400)))
+        if rnd.random() < 0.7 and len(body) > 16:
+            at = 4 * rnd.randrange(0, 3)
+            body[at:at + 4] = struct.pack('<I', rnd.randrange(0, 16))
+        if rnd.random() < 0.8 and len(body) > 260:
+            at = 200 + 4 * rnd.randrange(0, (len(body) - 212) // 4) + rnd.choice((0, 0, 1, 2))
+            body[at:at + 8] = struct.pack('<ii', unit(rnd.uniform(41, 54)), unit(rnd.uniform(-99, -81)))
+            if rnd.random() < 0.6:
+                body[at - 12:at - 8] = struct.pack('<i', rnd.randrange(0, 500000))
+        if rnd.random() < 0.5 and len(body) > 140:
+            at = 100 + 4 * rnd.randrange(0, 8)
+            body[at:at + 2] = struct.pack('<H', rnd.randrange(64, 4097))
+        data += struct.pack('<I', RECORD_MAGIC) + body
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def test_vectorised_matches_scalar(tmp_path):
+    path = _write_classic(str(tmp_path / 'c.RSD'), 900)
+    expected = _reference(path)
+    assert len(expected) > 300
+    got = list(parse_rsd_records_classic(path))
+    assert got == expected
+    assert list(parse_rsd_records_classic(path, limit_records=57)) == expected[:57]
+
+
+def test_small_batches_and_no_header_cap(tmp_path, monkeypatch):
+    import engine_classic_varstruct as eng
+    path = _write_classic(str(tmp_path / 'c.RSD'), 400, seed=3)
+    expected = _reference(path)
+    monkeypatch.setattr(eng, 'HEURISTIC_BATCH', 7)
+    monkeypatch.setattr(eng, 'HEURISTIC_REGION', 4096)
+    assert list(parse_rsd_records_classic(path)) == expected
+
+    # more than the old 20,000-header limit
+    with open(path, 'ab') as f:
+        f.write((struct.pack('<I', RECORD_MAGIC) + b'\x00' * 12) * 20500)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        assert sum(1 for _ in iter_record_spans(mm)) > 20400
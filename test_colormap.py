@@ -0,0 +1,40 @@
+import matplotlib
+import numpy as np
+import pytest
+
+from color_manager import ColorManager, ColorStop
+from colormap_utils import STUDIO_COLORMAPS, apply_colormap, colorize, colormap_lut, lut_from_stops
+import video_exporter
+
+
+def test_lut_matches_float_colormap_and_stretch():
+    gray = np.random.default_rng(0).integers(30, 200, (40, 60), dtype=np.uint8)
+    cmap = matplotlib.colormaps['viridis']
+    expected = (cmap(gray.astype(np.float32) / 255.0)[:, :, :3] * 255).astype(np.uint8)
+    assert np.array_equal(colorize(gray, 'viridis'), expected)
+
+    lo, hi = gray.min(), gray.max()
+    stretched = ((gray - lo) / (hi - lo) * 255).astype(np.uint8)
+    assert np.array_equal(np.asarray(apply_colormap(gray, 'viridis')), colorize(stretched, 'viridis'))
+    assert np.array_equal(colorize(gray, 'viridis', contrast='auto'), colorize(stretched, 'viridis'))
+
+    out = np.zeros(gray.shape + (3,), np.uint8)
+    assert colorize(gray, 'viridis', out=out) is out and np.array_equal(out, expected)
+    assert colormap_lut('viridis') is colormap_lut('viridis') and not colormap_lut('viridis').flags.writeable
+    with pytest.raises((KeyError, ValueError)):
+        colormap_lut('no-such-map')
+
+
+def test_studio_palettes_are_shared():
+    manager = ColorManager()
+    for name in STUDIO_COLORMAPS:
+        assert manager._luts[name] is colormap_lut(name, studio=True)
+    assert np.array_equal(video_exporter._lut('amber'), lut_from_stops(STUDIO_COLORMAPS['amber']))
+    assert np.array_equal(colormap_lut('amber'), colormap_lut('amber', studio=True))
+    assert colormap_lut('no-such-map', studio=True) is colormap_lut('grayscale', studio=True)
+
+    gray = np.arange(256, dtype=np.uint8).reshape(16, 16)
+    assert np.array_equal(manager.apply(gray, 'fire'), colormap_lut('fire', studio=True)[gray])
+    assert np.array_equal(manager.apply(gray / 255.0, 'fire'), manager.apply(gray, 'fire'))
+    manager.add_colormap('duo', [ColorStop(0, '#000000'), ColorStop(255, '#ff0000')])
+    assert manager.apply(gray, 'duo', contrast=(0, 127))[8, 0].tolist() == [255, 0, 0]
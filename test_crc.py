@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Tests for the table-driven / deferred CRC paths in core_shared."""
+
+import os
+import random
+
+from core_shared import _crc32_custom, _crc32_table, _crc32_fast, _parse_varstruct, CrcBatch
+
+
+def test_crc_implementations_match_reference():
+    rnd = random.Random(7)
+    for n in (0, 1, 2, 3, 4, 5, 7, 8, 33, 256, 1001):
+        data = bytes(rnd.getrandbits(8) for _ in range(n))
+        ref = _crc32_custom(data)
+        assert _crc32_table(data) == ref
+        assert _crc32_fast(data) == ref
+
+
+def test_parse_varstruct_crc_modes_agree(tmp_path):
+    from synthetic_rsd import encode_varstruct
+    good = encode_varstruct([(0, b'\x01\x02\x03\x04'), (3, b'x' * 20)])
+    bad = good[:-1] + bytes([good[-1] ^ 0xFF])
+    for mode in ('strict', 'warn', 'sampled', 'off'):
+        fields, end = _parse_varstruct(good, 0, len(good), crc_mode=mode)
+        assert fields == {0: b'\x01\x02\x03\x04', 3: b'x' * 20} and end == len(good)
+    try:
+        _parse_varstruct(bad, 0, len(bad), crc_mode='strict')
+        assert False, 'strict mode should raise on CRC mismatch'
+    except ValueError:
+        pass
+    batch = CrcBatch(bad)
+    _parse_varstruct(bad, 0, len(bad), crc_mode='batch', crc_batch=batch)
+    batch.flush()
+    assert batch.checked == 1 and batch.mismatches == 1
+    # no queue given: 'batch' checks inline instead of failing
+    assert _parse_varstruct(bad, 0, len(bad), crc_mode='batch')[1] == len(bad)
+
+
+def test_nextgen_records_identical_across_crc_modes(tmp_path):
+    from synthetic_rsd import write_synthetic_rsd
+    from engine_nextgen_syncfirst import parse_rsd_records_nextgen
+    path = write_synthetic_rsd(str(tmp_path / 'crc.RSD'), 200, samples=64)
+    base = list(parse_rsd_records_nextgen(path, crc_mode='warn'))
+    assert len(base) == 200
+    for mode in ('strict', 'sampled', 'batch', 'off'):
+        assert list(parse_rsd_records_nextgen(path, crc_mode=mode)) == base
+
+
+def test_batch_checks_flushed_when_walk_is_abandoned(tmp_path, monkeypatch):
+    import core_shared
+    from synthetic_rsd import write_synthetic_rsd
+    from engine_nextgen_syncfirst import parse_rsd_records_nextgen
+    path = write_synthetic_rsd(str(tmp_path / 'crc.RSD'), 50, samples=64)
+    checked = []
+    flush = core_shared.CrcBatch.flush
+    monkeypatch.setattr(core_shared.CrcBatch, 'flush',
+                        lambda self: (checked.append(len(self.starts)), flush(self)))
+    gen = parse_rsd_records_nextgen(path, crc_mode='batch')
+    next(gen); next(gen)
+    gen.close()
+    assert checked and checked[0] >= 2
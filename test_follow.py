@@ -0,0 +1,59 @@
+import random
+import threading
+import time
+
+from engine_nextgen_syncfirst import parse_rsd_records_nextgen
+from synthetic_rsd import write_synthetic_rsd
+
+
+def _grow(src_bytes, dst, seed):
+    rnd = random.Random(seed)
+    with open(dst, 'ab') as out:
+        i = 0
+        while i < len(src_bytes):
+            n = rnd.randrange(1, 3000)
+            out.write(src_bytes[i:i + n]); out.flush()
+            i += n
+            time.sleep(0.001)
+
+
+def _follow_while_growing(tmp_path, name, crc_mode='warn', **kw):
+    src = write_synthetic_rsd(str(tmp_path / f'{name}_src.RSD'), 300, samples=96, **kw)
+    data = open(src, 'rb').read()
+    dst = str(tmp_path / f'{name}.RSD')
+    open(dst, 'wb').close()
+    writer = threading.Thread(target=_grow, args=(data, dst, 5))
+    writer.start()
+    got = list(parse_rsd_records_nextgen(dst, follow=True, poll_interval=0.005, crc_mode=crc_mode,
+                                         max_poll_interval=0.02, idle_timeout=0.5))
+    writer.join()
+    return got, list(parse_rsd_records_nextgen(src))
+
+
+def test_follow_matches_full_parse(tmp_path):
+    for name, kw in {'plain': {}, 'garbage': {'garbage_every': 13}, 'nohop': {'hop': False}}.items():
+        got, expected = _follow_while_growing(tmp_path, name, **kw)
+        assert got == expected, name
+
+
+def test_follow_batch_crc_mode(tmp_path, monkeypatch):
+    import core_shared
+    checked = []
+    flush = core_shared.CrcBatch.flush
+    monkeypatch.setattr(core_shared.CrcBatch, 'flush',
+                        lambda self: (checked.append(len(self.starts)), flush(self)))
+    got, expected = _follow_while_growing(tmp_path, 'batch', crc_mode='batch')
+    assert len(got) == 300 and got == expected
+    assert sum(checked) >= 2 * 300  # header and body block of every record
+
+
+def test_follow_stop_and_limit(tmp_path):
+    path = write_synthetic_rsd(str(tmp_path / 'a.RSD'), 50, samples=64)
+    t = time.monotonic()
+    recs = list(parse_rsd_records_nextgen(path, follow=True, idle_timeout=30, limit_records=20))
+    assert len(recs) == 20 and time.monotonic() - t < 5
+    seen = []
+    stop = lambda: len(seen) >= 35
+    for r in parse_rsd_records_nextgen(path, follow=True, idle_timeout=30, stop=stop):
+        seen.append(r)
+    assert len(seen) == 35
@@ -0,0 +1,41 @@
+from engine_nextgen_syncfirst import parse_rsd_records_nextgen, parse_rsd_records_parallel, parse_rsd
+from synthetic_rsd import write_synthetic_rsd
+
+
+def _sequential(path):
+    return list(parse_rsd_records_nextgen(path))
+
+
+def test_parallel_matches_sequential(tmp_path):
+    layouts = {
+        'plain': {},
+        'garbage': {'garbage_every': 7},
+        'nohop': {'hop': False},
+    }
+    for name, kw in layouts.items():
+        path = write_synthetic_rsd(str(tmp_path / f'{name}.RSD'), 600, samples=200, **kw)
+        expected = _sequential(path)
+        assert expected
+        for shards in (1, 3, 17, 64):
+            got = list(parse_rsd_records_parallel(path, workers=2, shards=shards))
+            assert got == expected, (name, shards)
+
+
+def test_parallel_batch_crc_mode(tmp_path):
+    path = write_synthetic_rsd(str(tmp_path / 'crc.RSD'), 200, samples=64, garbage_every=9)
+    expected = list(parse_rsd_records_nextgen(path, crc_mode='batch'))
+    assert len(expected) == 200
+    for shards in (1, 5):
+        got = list(parse_rsd_records_parallel(path, workers=2, shards=shards, crc_mode='batch'))
+        assert got == expected
+
+
+def test_parallel_limit_and_csv(tmp_path):
+    path = write_synthetic_rsd(str(tmp_path / 'a.RSD'), 300, samples=128)
+    got = list(parse_rsd_records_parallel(path, workers=2, shards=8, limit_records=50))
+    assert got == _sequential(path)[:50]
+
+    n1, csv1, _ = parse_rsd(path, str(tmp_path / 'seq'))
+    n2, csv2, _ = parse_rsd(path, str(tmp_path / 'par'), workers=2)
+    assert n1 == n2 == 300
+    assert open(csv1).read() == open(csv2).read()
@@ -0,0 +1,34 @@
+import numpy as np
+
+from block_pipeline import PingReader, auto_align_block_pair, calculate_phase_correlation_shift
+from engine_nextgen_syncfirst import parse_rsd
+from phase_align import _row_shift_reference, block_shift, row_shifts
+from synthetic_rsd import write_synthetic_rsd
+
+
+def test_batched_shifts_match_per_row():
+    rng = np.random.default_rng(3)
+    for width in (8, 37, 256, 1024):
+        base = rng.integers(0, 256, (6, width + 40), dtype=np.uint8)
+        left = base[:, 20:20 + width]
+        right = np.stack([np.roll(row, s)[20:20 + width] for row, s in zip(base, (-9, -1, 0, 2, 7, 15))])
+        right[0] = rng.integers(0, 256, width)
+        want = [_row_shift_reference(l, r) for l, r in zip(left, right)]
+        assert list(row_shifts(left, right)) == want
+        assert calculate_phase_correlation_shift(left[1:2], right[1:2]) == want[1]
+    shift, confidence = block_shift(left[1:], right[1:])
+    assert shift == int(np.median(want[1:])) and 0.0 < confidence <= 1.0
+
+
+def test_block_alignment_is_memoised(tmp_path):
+    path = write_synthetic_rsd(str(tmp_path / 'a.RSD'), 60, samples=128)
+    _, csv_path, _ = parse_rsd(path, str(tmp_path / 'out'))
+    from block_pipeline import read_records_from_csv
+    records = read_records_from_csv(csv_path)
+    left = [r for r in records if r.channel_id == 4][:20]
+    right = [r for r in records if r.channel_id == 5][:20]
+    reader = PingReader(path)
+    first = auto_align_block_pair(path, left, right, reader=reader)
+    misses = reader.misses
+    assert auto_align_block_pair(path, left, right, reader=reader) == first
+    assert reader.misses == misses
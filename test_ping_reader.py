@@ -0,0 +1,56 @@
+import numpy as np
+
+from block_pipeline import (BlockProcessor, PingReader, compose_aligned_block,
+                            extract_sonar_data, read_records_from_csv, shared_ping_reader)
+from engine_nextgen_syncfirst import parse_rsd
+from synthetic_rsd import write_synthetic_rsd
+
+
+def _parsed(tmp_path, n=80, **kw):
+    path = write_synthetic_rsd(str(tmp_path / 'a.RSD'), n, samples=128)
+    _, csv_path, _ = parse_rsd(path, str(tmp_path / 'out'), **kw)
+    return path, csv_path, read_records_from_csv(csv_path)
+
+
+def test_payload_views_and_blocks(tmp_path):
+    path, csv_path, records = _parsed(tmp_path)
+    with PingReader(path) as reader:
+        for r in records[:10]:
+            view = reader.payload(r)
+            assert not view.flags.owndata and not view.flags.writeable
+            assert view.tobytes() == extract_sonar_data(path, r)
+        left = [r for r in records if r.channel_id == 4][:20]
+        block, lengths = reader.read_block(left)
+        assert block.shape == (20, 128) and list(lengths) == [128] * 20
+        assert all(np.array_equal(block[i], reader.payload(r)) for i, r in enumerate(left))
+        assert reader.read_block(left, width=200)[0][:, 128:].sum() == 0
+    assert not len(PingReader(str(tmp_path / 'missing.RSD')).payload(records[0]))
+
+
+def test_store_backed_blocks(tmp_path):
+    path, csv_path, records = _parsed(tmp_path, ping_store=True)
+    plain, _ = PingReader(path).read_block([r for r in records if r.channel_id == 5][3:13])
+    reader = shared_ping_reader(path, csv_path)
+    assert reader.store is not None
+    block, _ = reader.read_block([r for r in records if r.channel_id == 5][3:13])
+    assert isinstance(block.base, np.memmap) or isinstance(block, np.memmap)
+    assert np.array_equal(block, plain)
+
+
+def test_row_cache_is_bounded_and_shared(tmp_path):
+    path, csv_path, records = _parsed(tmp_path)
+    reader = PingReader(path, cache_bytes=10 * 256)
+    for r in records:
+        reader.normalized_row(r, 256)
+    assert reader.cached_bytes <= 10 * 256 and reader.misses == len(records)
+    row = reader.normalized_row(records[-1], 256)
+    assert reader.hits == 1 and not row.flags.writeable
+
+    bp = BlockProcessor(csv_path, path, block_size=20)
+    from target_detection import TargetDetector
+    assert TargetDetector(path, csv_path).reader is bp.reader is shared_ping_reader(path)
+    left, right = bp.get_channel_blocks(4)[0], bp.get_channel_blocks(5)[0]
+    first = compose_aligned_block(path, left, right, reader=bp.reader)
+    hits = bp.reader.hits
+    assert np.array_equal(compose_aligned_block(path, left, right), first)
+    assert bp.reader.hits == hits + 2 * len(left)
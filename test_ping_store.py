@@ -0,0 +1,65 @@
+import numpy as np
+
+from engine_nextgen_syncfirst import parse_rsd, parse_rsd_records_nextgen
+from ping_store import PingStore, build_ping_store
+from synthetic_rsd import write_synthetic_rsd
+
+
+def _payload(path, rec):
+    with open(path, 'rb') as f:
+        f.seek(rec.sonar_ofs)
+        return np.frombuffer(f.read(rec.sonar_size), dtype=np.uint8)
+
+
+def test_store_matches_payloads(tmp_path):
+    path = write_synthetic_rsd(str(tmp_path / 'a.RSD'), 90, samples=96, garbage_every=7)
+    n, csv_path, _ = parse_rsd(path, str(tmp_path / 'out'), ping_store=True)
+    store = PingStore.open(csv_path)
+    assert store is not None and store.channels() == [4, 5] and len(store) == n
+
+    records = list(parse_rsd_records_nextgen(path))
+    for ch in (4, 5):
+        recs = [r for r in records if r.channel_id == ch]
+        mat = store.matrix(ch)
+        assert isinstance(mat, np.memmap) and mat.shape == (len(recs), 96)
+        assert list(store.lengths(ch)) == [r.sonar_size for r in recs]
+        for i, r in enumerate(recs):
+            assert np.array_equal(store.ping(ch, i), _payload(path, r))
+        assert store.block(ch, 3, 8).shape == (5, 96)
+        assert list(store.find(ch, [recs[6].sonar_ofs, 1])) == [6, -1]
+        assert [records[j] for j in store.index(ch)['row']] == recs
+
+
+def test_padding_columnar_and_stale(tmp_path):
+    path = write_synthetic_rsd(str(tmp_path / 'a.RSD'), 20, samples=64)
+    n, npy, _ = parse_rsd(path, str(tmp_path / 'out'), columnar='npy', write_csv=False)
+    store = build_ping_store(path, npy, channels=[4, 9])
+    assert store.channels() == [4, 9] and store.matrix(9).shape == (0, 0)
+
+    records = [r for r in parse_rsd_records_nextgen(path) if r.channel_id == 4]
+    # a record truncated by the end of the file keeps only the bytes present
+    with open(path, 'r+b') as f:
+        f.truncate(records[-1].sonar_ofs + 10)
+    assert PingStore.open(npy) is None
+    store = build_ping_store(path, npy, channels=[4])
+    assert store.lengths(4)[-1] == 10
+    assert not store.matrix(4)[-1, 10:].any()
+    assert np.array_equal(store.ping(4, 0), _payload(path, records[0]))
+
+
+def test_corrupt_length_does_not_widen_the_store(tmp_path):
+    import pandas as pd
+    path = write_synthetic_rsd(str(tmp_path / 'a.RSD'), 400, samples=64)
+    n, csv_path, _ = parse_rsd(path, str(tmp_path / 'out'))
+    df = pd.read_csv(csv_path)
+    bad = int(df.index[df['channel_id'] == 4][10])
+    df.loc[bad, 'sonar_size'] = 60000  # fallback-path length of a corrupt record
+    df.to_csv(csv_path, index=False)
+
+    store = build_ping_store(path, csv_path)
+    assert store.matrix(4).shape == (200, 4 * 64) and store.matrix(5).shape == (200, 64)
+    assert store.manifest['channels']['4']['clipped'] == 1
+    assert store.lengths(4)[10] == 4 * 64 and store.lengths(4)[11] == 64
+
+    store = build_ping_store(path, csv_path, max_width=32)
+    assert store.matrix(5).shape == (200, 32) and (store.lengths(5) == 32).all()
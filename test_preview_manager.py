@@ -0,0 +1,92 @@
+import time
+
+import numpy as np
+from PIL import Image
+
+from colormap_utils import colormap_lut
+from preview_manager import PreviewManager
+from video_exporter import _ROW_CACHE, build_preview_frame
+
+
+def _rows(tmp_path, n=2, h=40, w=64):
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(n):
+        p = str(tmp_path / f'row{i}.png')
+        Image.fromarray(rng.integers(0, 256, (h, w), dtype=np.uint8)).save(p)
+        paths.append(p)
+    return paths
+
+
+def test_colormap_change_reuses_decoded_preview(tmp_path):
+    paths = _rows(tmp_path)
+    frames = []
+    pm = PreviewManager(frames.append)
+    pm._current_paths = paths
+    pm._current_config = {'PREVIEW_MODE': 'both', 'PREVIEW_HEIGHT': 80, 'COLORMAP': 'grayscale'}
+    pm._generate_preview()
+    gray = pm._gray
+    assert gray.shape == (40, 128) and frames[-1].shape == (80, 256, 3)
+    assert (frames[-1][:, 126:128, 0] > frames[-1][:, 126:128, 1]).all()  # the seam survives scaling
+
+    def scaled(cmap):  # colormap and seam at full size, then resize the RGB (as before caching)
+        full = colormap_lut(cmap, studio=True)[gray]
+        full[:, 63:65] = [255, 0, 0]
+        return np.array(Image.fromarray(full).resize((256, 80), Image.Resampling.LANCZOS))
+
+    assert np.array_equal(frames[-1], scaled('grayscale'))
+    pm._current_config = dict(pm._current_config, COLORMAP='amber')
+    pm._generate_preview()
+    assert pm._gray is gray and pm.stats['lut_only'] == 1 and len(pm.row_cache) == 2
+    assert np.array_equal(frames[-1], scaled('amber'))
+
+    colored = pm._color
+    pm._current_config = dict(pm._current_config, PREVIEW_HEIGHT=None)
+    pm._generate_preview()
+    assert pm._color is colored and frames[-1] is colored
+
+    Image.fromarray(np.zeros((40, 64), np.uint8)).save(paths[0])
+    pm._generate_preview()
+    assert pm._gray is not gray and not pm._gray[:, :60].any()
+
+
+def test_update_bursts_are_coalesced(tmp_path):
+    frames = []
+    pm = PreviewManager(frames.append, debounce=0.05)
+    pm._current_paths = _rows(tmp_path, 1)
+    pm.start()
+    try:
+        for name in ('grayscale', 'amber', 'viridis') * 5:
+            pm.update_config({'COLORMAP': name})
+        deadline = time.time() + 5
+        while pm.stats['requests'] < 15 and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        pm.stop()
+    assert pm.stats['requests'] == 15 and pm.stats['renders'] < 15
+    assert np.array_equal(frames[-1], colormap_lut('viridis', studio=True)[pm._gray])
+
+
+def test_steady_updates_still_render(tmp_path):
+    frames = []
+    pm = PreviewManager(frames.append, debounce=0.05)
+    pm._current_paths = _rows(tmp_path, 1)
+    pm.start()
+    try:
+        t_end = time.monotonic() + 0.6
+        while time.monotonic() < t_end:  # a slider drag: an update every 10 ms
+            pm.update_config({'COLORMAP': 'amber'})
+            time.sleep(0.01)
+        during = pm.stats['renders']
+    finally:
+        pm.stop()
+    assert during >= 4 and pm.stats['requests'] >= 40
+
+
+def test_build_preview_frame_decodes_rows_once(tmp_path):
+    paths = _rows(tmp_path, 4)
+    _ROW_CACHE.clear()
+    first = build_preview_frame(paths, {'COLORMAP': 'amber'}, 40, 160)[0]
+    misses = _ROW_CACHE.misses
+    again = build_preview_frame(paths, {'COLORMAP': 'amber'}, 40, 160)[0]
+    assert _ROW_CACHE.misses == misses and np.array_equal(first, again)
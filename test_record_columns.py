@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+from engine_nextgen_syncfirst import parse_rsd, parse_rsd_batches_nextgen, parse_rsd_records_nextgen
+from record_columns import RECORD_DTYPE, load_columnar, read_records_frame, records_to_array
+from synthetic_rsd import write_synthetic_rsd
+
+
+def test_batches_match_records(tmp_path):
+    path = write_synthetic_rsd(str(tmp_path / 'a.RSD'), 250, samples=128, garbage_every=9)
+    batches = list(parse_rsd_batches_nextgen(path, batch_size=64))
+    assert [len(b) for b in batches] == [64, 64, 64, 58]
+    arr = np.concatenate(batches)
+    assert arr.dtype == RECORD_DTYPE
+    expected = records_to_array(parse_rsd_records_nextgen(path))
+    assert arr.tobytes() == expected.tobytes()
+    assert len(list(parse_rsd_batches_nextgen(path, limit_records=10))[0]) == 10
+
+
+def test_columnar_output_and_loaders(tmp_path):
+    path = write_synthetic_rsd(str(tmp_path / 'a.RSD'), 120, samples=64)
+    n_csv, csv_plain, _ = parse_rsd(path, str(tmp_path / 'plain'))
+    n, csv_path, _ = parse_rsd(path, str(tmp_path / 'col'), columnar='npy')
+    assert n == n_csv == 120
+    assert open(csv_path).read() == open(csv_plain).read()
+
+    npy = str(tmp_path / 'col' / 'a.npy')
+    arr = load_columnar(npy)
+    assert isinstance(arr, np.memmap) and len(arr) == 120
+    pd.testing.assert_frame_equal(read_records_frame(npy), pd.read_csv(csv_plain).drop(columns=['extras_json']),
+                                  check_dtype=False)
+
+    from block_pipeline import read_records_from_csv
+    a = read_records_from_csv(npy)
+    b = read_records_from_csv(csv_plain)
+    for ra, rb in zip(a, b):
+        ra.extras = rb.extras = None
+    assert a == b
+
+    n, out, _ = parse_rsd(path, str(tmp_path / 'nocsv'), columnar='npy', write_csv=False)
+    assert out.endswith('a.npy') and not (tmp_path / 'nocsv' / 'a.csv').exists()
+    assert load_columnar(out).tobytes() == arr.tobytes()
+
+
+def test_unsigned_channel_ids_survive_every_path(tmp_path):
+    from engine_nextgen_syncfirst import write_parsed_records
+    from record_columns import load_records
+    big = 3000000000  # channel ids are u32 on disk
+    path = write_synthetic_rsd(str(tmp_path / 'a.RSD'), 40, channels=(big, 5), samples=32)
+    out = tmp_path / 'out'
+    out.mkdir()
+    n, csv_path, _ = write_parsed_records(path, str(out / 'a.csv'), str(out / 'a.log'), columnar='npy')
+    assert n == 40
+    for arr in (load_columnar(str(out / 'a.npy')), load_records(csv_path), load_records(csv_path)):
+        assert sorted(set(arr['channel_id'].tolist())) == [5, big]
+
+
+def test_typed_csv_loader_and_cache(tmp_path, monkeypatch):
+    from record_columns import CSV_CACHE_SUFFIX, load_records_csv, read_extras
+    path = write_synthetic_rsd(str(tmp_path / 'a.RSD'), 150, samples=32, garbage_every=7)
+    parse_rsd(path, str(tmp_path / 'col'), columnar='npy', write_csv=False)
+    n, csv_path, _ = parse_rsd(path, str(tmp_path / 'out'))
+    expected = load_columnar(str(tmp_path / 'col' / 'a.npy'))
+
+    arr = load_records_csv(csv_path)
+    assert arr.dtype == RECORD_DTYPE and arr.tobytes() == expected.tobytes()
+    cached = load_records_csv(csv_path)
+    assert isinstance(cached, np.memmap) and cached.tobytes() == expected.tobytes()
+
+    monkeypatch.setitem(__import__('sys').modules, 'pandas', None)
+    assert load_records_csv(csv_path, cache=False).tobytes() == expected.tobytes()
+    monkeypatch.undo()
+
+    # a rewritten CSV invalidates the cache; junk cells load as nulls / zero
+    lines = open(csv_path).read().splitlines()
+    lines[1] = 'x,4,1,,abc,-84.5,,,,,,,,,,,,{"serial": "S1"}'
+    with open(csv_path, 'w') as f:
+        f.write('\n'.join(lines[:3]) + '\n')
+    for loaded in (load_records_csv(csv_path), load_records_csv(csv_path)):
+        assert len(loaded) == 2 and loaded['ofs'][0] == 0 and loaded['channel_id'][0] == 4
+        assert np.isnan(loaded['lat'][0]) and loaded['lon'][0] == -84.5 and loaded['sonar_ofs'][0] == -1
+    assert read_extras(csv_path) == [{'serial': 'S1'}, {}]
+
+    # fractional or out-of-range integers are nulls, not truncated or wrapped
+    lines[2] = '1.5,3000000000,2,,,,,7.5,,,,,,,,,1e12,{}'
+    with open(csv_path, 'w') as f:
+        f.write('\n'.join(lines[:3]) + '\n')
+    for loaded in (load_records_csv(csv_path), load_records_csv(csv_path, cache=False)):
+        row = loaded[1]
+        assert (row['ofs'], row['channel_id'], row['sample_cnt'], row['color_id']) == (0, 3000000000, -1, -1)
+    assert (tmp_path / 'out' / ('a.csv' + CSV_CACHE_SUFFIX)).exists()
+
+    from block_pipeline import BlockProcessor, get_transducer_info, read_records_from_csv
+    assert read_records_from_csv(csv_path)[0].extras is None
+    assert read_records_from_csv(csv_path, extras=True)[0].extras == {'serial': 'S1'}
+    assert get_transducer_info(csv_path)['transducer_serial'] == 'S1'
+    bp = BlockProcessor(expected, path, block_size=10)
+    assert bp.get_available_channels() == [4, 5] and len(bp.get_channel_blocks(4)[0]) == 10
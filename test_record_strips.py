@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+
+from block_pipeline import BlockProcessor, PingReader, RecordBlock, resample_block
+from engine_glue import _run_one
+from render_accel import RecordStrips, process_record_images
+from synthetic_rsd import write_synthetic_rsd
+
+
+def test_strips_match_channel_waterfalls(tmp_path):
+    path = write_synthetic_rsd(str(tmp_path / 'a.RSD'), 230, samples=96)
+    n, csv_path, _ = _run_one('nextgen', path, str(tmp_path / 'out'))
+    manifest = RecordStrips.open(str(tmp_path / 'out' / 'images')).manifest
+    assert manifest['rsd_path'] == os.path.abspath(path) and manifest['channels']['4']['pings'] == 115
+
+    bp = BlockProcessor(csv_path, path)
+    with PingReader(path) as reader:
+        for fmt in ('png', 'npy'):
+            out = str(tmp_path / fmt)
+            m = process_record_images(csv_path, out, rsd_path=path, tile_pings=40, width=64, fmt=fmt, workers=2,
+                                      batch_size=50)
+            assert [t['pings'] for t in m['channels']['5']['tiles']] == [40, 40, 35]
+            strips = RecordStrips.open(out)
+            assert strips.channels() == [4, 5]
+            for ch in (4, 5):
+                rows = bp.columns[bp.channel_rows(ch)]
+                want = resample_block(*reader.read_block(RecordBlock(rows, np.arange(len(rows)))), 64)
+                assert np.array_equal(strips.rows(ch, 0, strips.pings(ch)), want)
+                assert np.array_equal(strips.rows(ch, 35, 85), want[35:85])
+
+            stamp = os.stat(os.path.join(out, 'ch4_00000.' + fmt)).st_mtime_ns
+            assert process_record_images(csv_path, out, rsd_path=path, tile_pings=40, width=64, fmt=fmt) == m
+            assert os.stat(os.path.join(out, 'ch4_00000.' + fmt)).st_mtime_ns == stamp
+
+    only = process_record_images(csv_path, str(tmp_path / 'ch5'), rsd_path=path, channel=5, tile_pings=100)
+    assert list(only['channels']) == ['5'] and sorted(os.listdir(tmp_path / 'ch5'))[:2] == ['ch5_00000.png', 'ch5_00001.png']
+    assert process_record_images(csv_path, str(tmp_path / 'none')) is None
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Tests for the .rsdidx record offset index."""
+
+import os
+
+from synthetic_rsd import write_synthetic_rsd
+from engine_nextgen_syncfirst import parse_rsd_records_nextgen
+from rsd_index import build_index, open_index, load_or_build_index, index_path_for
+
+
+def test_index_matches_full_parse(tmp_path):
+    path = write_synthetic_rsd(str(tmp_path / 'idx.RSD'), 300, channels=(4, 5, 2), samples=80,
+                               garbage_every=50)
+    records = list(parse_rsd_records_nextgen(path))
+    idx = build_index(path)
+    assert len(idx) == len(records) == 300
+    assert idx.channels() == [2, 4, 5]
+    assert idx.channel_counts() == {2: 100, 4: 100, 5: 100}
+    assert [int(o) for o in idx.entries['hdr_ofs']] == [r.ofs for r in records]
+    assert [int(o) for o in idx.entries['sonar_ofs']] == [r.sonar_ofs for r in records]
+    # random access decodes exactly what the sequential walk produced
+    assert idx.record(123) == records[123]
+    assert list(idx.iter_records(10, 20)) == records[10:20]
+
+
+def test_index_is_reused_and_invalidated(tmp_path):
+    path = write_synthetic_rsd(str(tmp_path / 'reuse.RSD'), 50, samples=32)
+    assert open_index(path) is None
+    built = load_or_build_index(path)
+    assert os.path.exists(index_path_for(path))
+    loaded = open_index(path)
+    assert loaded is not None and len(loaded) == len(built) == 50
+    # any change in size/mtime makes the sidecar stale
+    with open(path, 'ab') as f:
+        f.write(b'\x00' * 16)
+    assert open_index(path) is None
+    assert len(load_or_build_index(path)) == 50
+
+
+def test_garmin_parser_uses_index(tmp_path):
+    from parsers.garmin_parser import GarminParser
+    path = write_synthetic_rsd(str(tmp_path / 'gp.RSD'), 40, samples=32)
+    p = GarminParser(path)
+    assert p.get_record_count() == 40
+    assert p.get_channels() == [4, 5]
+    assert os.path.exists(index_path_for(path))
+
+
+def test_progress_hook_is_restored(tmp_path):
+    import core_shared
+    path = write_synthetic_rsd(str(tmp_path / 'hook.RSD'), 20, samples=32)
+    outer, inner = [], []
+    core_shared.set_progress_hook(lambda pct, msg: outer.append(pct))
+    try:
+        build_index(path, persist=False, progress=lambda pct, msg: inner.append(pct))
+        assert len(list(parse_rsd_records_nextgen(path, progress=lambda pct, msg: inner.append(pct)))) == 20
+        core_shared._emit(50, 'outer')
+        assert inner and outer == [50.0]
+    finally:
+        core_shared.set_progress_hook(None)
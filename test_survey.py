@@ -0,0 +1,64 @@
+from engine_nextgen_syncfirst import count_rsd_records, parse_rsd_records_nextgen, survey_rsd
+from rsd_index import build_index
+from synthetic_rsd import write_synthetic_rsd
+
+
+def test_count_matches_full_parse(tmp_path):
+    for name, kw in {'plain': {}, 'garbage': {'garbage_every': 9}, 'nohop': {'hop': False}}.items():
+        path = write_synthetic_rsd(str(tmp_path / f'{name}.RSD'), 333, samples=64, **kw)
+        assert count_rsd_records(path) == len(list(parse_rsd_records_nextgen(path))), name
+    empty = tmp_path / 'empty.RSD'
+    empty.write_bytes(b'')
+    assert count_rsd_records(str(empty)) == 0
+
+
+def test_survey_scan_and_index_agree(tmp_path):
+    path = write_synthetic_rsd(str(tmp_path / 'a.RSD'), 300, channels=(4, 5, 2), samples=64, garbage_every=50)
+    recs = list(parse_rsd_records_nextgen(path))
+    s = survey_rsd(path, sample_pings=50)
+    assert s['source'] == 'scan'
+    assert s['records'] == 300
+    assert s['channels'] == {4: 100, 5: 100, 2: 100}
+    assert (s['time_ms_first'], s['time_ms_last']) == (recs[0].time_ms, recs[-1].time_ms)
+    assert s['corrupt_regions'] == 5 and s['corrupt_bytes'] == 5 * 37
+    bb = s['bbox']
+    assert min(r.lat for r in recs) <= bb['min_lat'] <= bb['max_lat'] <= max(r.lat for r in recs)
+    assert s['sampled_pings'] >= 40
+
+    build_index(path)
+    si = survey_rsd(path, sample_pings=50)
+    assert si['source'] == 'index'
+    for key in ('records', 'channels', 'time_ms_first', 'time_ms_last', 'corrupt_regions',
+                'corrupt_bytes', 'tail_bytes'):
+        assert si[key] == s[key], key
+
+
+def test_survey_records_without_channel_or_payload(tmp_path):
+    import struct
+    from core_shared import MAGIC_REC_HDR, MAGIC_REC_TRL
+    from synthetic_rsd import PREAMBLE, build_record, encode_varstruct
+
+    def bare(seq):  # no channel field, no samples, no hop
+        body = encode_varstruct([(5, b'\x01\x02\x03\x04')])
+        hdr = encode_varstruct([(0, struct.pack('<I', MAGIC_REC_HDR)), (1, b'\xff\xff\xff\xff\x0f'),
+                                (2, struct.pack('<I', seq)), (4, struct.pack('<H', len(body))),
+                                (5, struct.pack('<I', seq * 100))])
+        return hdr + body + struct.pack('>III', MAGIC_REC_TRL, 0, 0)
+
+    path = str(tmp_path / 'bare.RSD')
+    with open(path, 'wb') as f:
+        f.write(b'\x00' * PREAMBLE)
+        for i in range(12):
+            f.write(bare(i) if i % 3 else build_record(i, 4, i * 100, 45.0, -84.0, 5.0, b'\x10' * 32))
+            if i % 4 == 3:
+                f.write(b'\xAA' * 21)
+    s = survey_rsd(path)
+    assert s['records'] == 12 and s['channels'] == {4: 4, None: 8}
+    assert s['corrupt_regions'] == 2 and s['corrupt_bytes'] == 2 * 21 and s['tail_bytes'] == 21
+
+    idx = build_index(path)
+    assert idx.channels() == [4] and len(idx.channel_rows(None)) == 8
+    si = survey_rsd(path)
+    assert si['source'] == 'index'
+    for key in ('records', 'channels', 'corrupt_regions', 'corrupt_bytes', 'tail_bytes'):
+        assert si[key] == s[key], key
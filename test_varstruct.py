@@ -0,0 +1,84 @@
+import os
+import struct
+import tracemalloc
+
+from core_shared import FieldTable, _parse_varstruct, _scan_varstruct
+from synthetic_rsd import encode_varstruct
+
+
+def _block(big=0):
+    fields = [(0, struct.pack('<I', 7)), (1, b'\x14'), (7, struct.pack('<I', 512)),
+              (9, struct.pack('>i', -123456)), (11, struct.pack('<f', 2.5))]
+    if big:
+        fields.append((3, os.urandom(big)))
+    return bytearray(encode_varstruct(fields))
+
+
+def test_scan_matches_parse():
+    buf = _block(big=100)
+    fields, end = _parse_varstruct(buf, 0, len(buf), crc_mode='strict')
+    table = FieldTable()
+    assert _scan_varstruct(buf, 0, len(buf), table, crc_mode='strict') == end
+    assert table.as_dict() == fields
+    assert table.uint_le(0) == 7 and table.uint_le(7) == 512
+    assert table.unpack(9, '>i') == -123456 and table.unpack(11, '<f') == 2.5
+    assert bytes(table.view(3)) == fields[3]
+    assert 4 not in table and table.span(4) is None
+
+    # reusing the table forgets the previous block's fields
+    other = bytearray(encode_varstruct([(2, b'\x01\x00\x00\x00')]))
+    _scan_varstruct(other, 0, len(other), table)
+    assert table.as_dict() == {2: b'\x01\x00\x00\x00'}
+
+
+def test_scan_allocates_less_than_parse():
+    buf = _block(big=64 * 1024)
+    table = FieldTable()
+    _scan_varstruct(buf, 0, len(buf), table, crc_mode='off')  # warm up
+    tracemalloc.start()
+    try:
+        for _ in range(10):
+            _parse_varstruct(buf, 0, len(buf), crc_mode='off')
+        copy_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        for _ in range(10):
+            _scan_varstruct(buf, 0, len(buf), table, crc_mode='off')
+            table.unpack(9, '>i'); table.uint_le(0)
+        scan_peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    assert copy_peak >= 64 * 1024
+    assert scan_peak < 4 * 1024
+
+
+def test_scan_with_crc_check_does_not_copy_the_block():
+    buf = _block(big=64 * 1024)
+    table = FieldTable()
+    for mode in ('strict', 'warn'):
+        _scan_varstruct(buf, 0, len(buf), table, crc_mode=mode)  # warm up (scratch buffer)
+        tracemalloc.start()
+        try:
+            base = tracemalloc.get_traced_memory()[0]
+            for _ in range(10):
+                _scan_varstruct(buf, 0, len(buf), table, crc_mode=mode)
+            peak = tracemalloc.get_traced_memory()[1] - base
+        finally:
+            tracemalloc.stop()
+        assert peak < 4 * 1024, mode
+    buf[-1] ^= 0xFF
+    try:
+        _scan_varstruct(buf, 0, len(buf), table, crc_mode='strict')
+        assert False, 'strict mode should raise on CRC mismatch'
+    except ValueError:
+        pass
+
+
+def test_scan_multibyte_count_and_keys():
+    # field numbers >= 16 and >= 128 fields take the multi-byte varuint path
+    fields = [(fn, bytes([fn & 0xFF])) for fn in range(200)]
+    buf = bytearray(encode_varstruct(fields))
+    parsed, end = _parse_varstruct(buf, 0, len(buf), crc_mode='strict')
+    table = FieldTable()
+    assert _scan_varstruct(buf, 0, len(buf), table, crc_mode='strict') == end
+    assert table.as_dict() == {fn: v for fn, v in parsed.items() if fn < table.size}
@@ -0,0 +1,181 @@
+import os
+import time
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from colormap_utils import colormap_lut
+from render_accel import VideoWorker, ordered_map
+import video_exporter
+from video_exporter import export_waterfall_frames, export_waterfall_mp4
+
+
+def _frames(path):
+    cap = cv2.VideoCapture(path)
+    out = []
+    ok, frame = cap.read()
+    while ok:
+        out.append(frame)
+        ok, frame = cap.read()
+    cap.release()
+    return out
+
+
+def _sleep_id(t):
+    time.sleep(t)
+    return t
+
+
+def _rows(n=12):
+    rng = np.random.default_rng(0)
+    rows = []
+    for _ in range(n):
+        row = np.zeros((20, 260), dtype=np.uint8)
+        row[:, :128] = rng.integers(0, 256, (20, 128))
+        row[:, 132:] = rng.integers(0, 256, (20, 128))
+        rows.append(row)
+    return rows
+
+
+def test_in_memory_export_matches_png_path(tmp_path):
+    rows = _rows()
+    paths = []
+    for i, row in enumerate(rows):
+        paths.append(str(tmp_path / f"frame_{i:06d}.png"))
+        Image.fromarray(row).save(paths[-1])
+    cfg = {'COLORMAP': 'amber'}
+    export_waterfall_mp4(paths, cfg, str(tmp_path / 'png.mp4'), 20, 60, 10, 1000)
+    used = export_waterfall_frames(iter(rows), cfg, str(tmp_path / 'mem.mp4'), 20, 60, 10, 1000)
+    a, b = _frames(str(tmp_path / 'png.mp4')), _frames(str(tmp_path / 'mem.mp4'))
+    assert used == len(rows) and len(a) == len(b) == len(rows) - 2
+    assert all(np.array_equal(x, y) for x, y in zip(a, b))
+
+
+def test_lut_frames_and_debug_dir(tmp_path):
+    lut = colormap_lut('viridis')
+    rows = [lut[r] for r in _rows(5)]
+    cfg = {'COLORMAP': 'viridis', 'DEBUG_FRAME_DIR': str(tmp_path / 'dbg')}
+    export_waterfall_frames(iter(rows), cfg, str(tmp_path / 'v.mp4'), 20, 20, 10, 1000)
+    assert len(_frames(str(tmp_path / 'v.mp4'))) == 5
+    assert sorted(os.listdir(tmp_path / 'dbg')) == [f"frame_{i:06d}.png" for i in range(5)]
+    assert np.array_equal(np.array(Image.open(tmp_path / 'dbg' / 'frame_000003.png')), rows[3])
+
+
+def test_parallel_render_is_frame_identical(tmp_path):
+    rows = _rows(9)
+    base = export_waterfall_frames(iter(rows), {'COLORMAP': 'amber'}, str(tmp_path / 'a.mp4'), 20, 60, 10, 1000)
+    cfg = {'COLORMAP': 'amber', 'RENDER_WORKERS': 2, 'RENDER_CHUNK': 3}
+    assert export_waterfall_frames(iter(rows), cfg, str(tmp_path / 'b.mp4'), 20, 60, 10, 1000) == base
+    a, b = _frames(str(tmp_path / 'a.mp4')), _frames(str(tmp_path / 'b.mp4'))
+    assert len(a) == len(b) == len(rows) - 2
+    assert all(np.array_equal(x, y) for x, y in zip(a, b))
+
+    slow_first = [(0.05,), (0.0,), (0.02,), (0.0,)]
+    assert list(ordered_map(_sleep_id, slow_first, workers=3, executor='thread')) == [t[0] for t in slow_first]
+
+
+def test_ring_frames_match_window_resize(tmp_path, monkeypatch):
+    class Sink:
+        frames = []
+
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def push(self, frame):
+            Sink.frames.append(np.array(frame))
+
+        def close(self):
+            pass
+
+        def stats(self):
+            return {'frames': 0}
+
+    monkeypatch.setattr(video_exporter, 'VideoWorker', Sink)
+    rows = _rows(14)
+    cfg = {'COLORMAP': 'amber'}
+    for video_h in (60, 50, 45):
+        Sink.frames = []
+        export_waterfall_frames(iter(rows), cfg, str(tmp_path / 'r.mp4'), 20, video_h, 10, 1000)
+        need = video_exporter._rows_needed(video_h, 20)
+        assert len(Sink.frames) == len(rows) - need + 1
+        state = {'HALF_W': None}
+        for f in range(0, len(Sink.frames), 1 if video_h == 60 else need):
+            gray = video_exporter._compose_window(rows[f:f + need], cfg, 'compose', False, 11, [], state)[0]
+            want = video_exporter._even_frame(video_exporter._apply(video_exporter._resize_h(gray, video_h), 'amber'))
+            assert np.array_equal(Sink.frames[f], want)
+
+    ring = video_exporter.WaterfallRing(5, 2)
+    for i in range(4):
+        ring.push(np.full((3, 2, 3), i, np.uint8))
+    assert ring.frame()[:, 0, 0].tolist() == [2, 2, 3, 3, 3] and ring.frame().base is ring.buf
+
+
+def test_threaded_video_worker_matches_synchronous(tmp_path):
+    frames = [np.full((32, 48, 3), (20 * i, 200 - 10 * i, 90), np.uint8) for i in range(10)]
+    frames[3] = frames[3][:, :, 0]
+    logs = []
+    outputs = []
+    for threaded in (False, True):
+        vw = VideoWorker(str(tmp_path / f't{threaded}.avi'), fps=10, encoder='MJPG', log_func=logs.append,
+                         threaded=threaded, queue_size=2, backend='ffmpeg', ffmpeg_path='no-such-ffmpeg')
+        for frame in frames:
+            vw.push(frame)
+        with pytest.raises(ValueError):
+            vw.push(frames[0][:16])
+        vw.close()
+        stats = vw.stats()
+        assert stats['frames'] == len(frames) and stats['max_queue_depth'] <= 2 and stats['queue_depth'] == 0
+        outputs.append(_frames(str(tmp_path / f't{threaded}.avi')))
+    assert any('ffmpeg not found' in m for m in logs)
+    assert len(outputs[0]) == len(outputs[1]) == len(frames)
+    assert all(np.array_equal(a, b) for a, b in zip(*outputs))
+    assert np.abs(outputs[1][5].astype(int) - frames[5][:, :, ::-1]).mean() < 8
+
+
+def test_time_schedule_skips_unseen_rows(tmp_path, monkeypatch):
+    times = np.arange(40) * 1000.0  # one row per second
+    sched = video_exporter.schedule_frames(times, fps=10, speed=10, row_height=20, video_height=60)
+    assert len(sched) == 38 and sched.last_rows.tolist() == list(range(2, 40))
+    fast = video_exporter.schedule_frames(times, fps=10, speed=50, row_height=20, video_height=60)
+    assert fast.last_rows.tolist() == list(range(2, 40, 5))
+    assert fast.rows_needed.tolist() == [r for e in range(2, 40, 5) for r in (e - 2, e - 1, e)]
+    slow = video_exporter.schedule_frames(times, fps=10, speed=5, row_height=20, video_height=60,
+                                          start_ms=10000, end_ms=14000)
+    assert slow.last_rows.tolist() == [10, 10, 11, 11, 12, 12, 13, 13, 14] and slow.unique_frames == 5
+    assert not len(video_exporter.schedule_frames(times[:2], 10, 10, 20, 60))
+
+    frames = {}
+
+    class Sink:
+        def __init__(self, path, *args, **kwargs):
+            self.path = path
+            frames[path] = []
+
+        def push(self, frame):
+            frames[self.path].append(np.array(frame))
+
+        def close(self):
+            pass
+
+        def stats(self):
+            return {'frames': 0}
+
+    monkeypatch.setattr(video_exporter, 'VideoWorker', Sink)
+    rows = _rows(40)
+    cfg = {'COLORMAP': 'amber'}
+    export_waterfall_frames(iter(rows), cfg, 'all', 20, 60, 10, 1000)
+    rendered = []
+
+    def needed(schedule):
+        for i in schedule.rows_needed:
+            rendered.append(i)
+            yield rows[i]
+
+    for name, schedule in (('fast', fast), ('slow', slow)):
+        rendered.clear()
+        export_waterfall_frames(needed(schedule), cfg, name, 20, 60, 10, 0, schedule=schedule)
+        assert rendered == schedule.rows_needed.tolist()
+        assert len(frames[name]) == len(schedule)
+        assert all(np.array_equal(f, frames['all'][r - 2]) for f, r in zip(frames[name], schedule.last_rows))
@@ -1,11 +1,14 @@
 ﻿#!/usr/bin/env python3
 # video_exporter.py — preview builder + MP4 export (stitch/align + color maps)
 from __future__ import annotations
-from typing import Sequence, Dict, Any, List, Tuple, Optional, Callable
-import math
+from typing import Sequence, Dict, Any, Iterable, List, Tuple, Optional, Callable
+import math, os
 import numpy as np
 from PIL import Image
-from render_accel import VideoWorker
+from render_accel import VideoWorker, ordered_map
+from phase_align import band_shift
+from colormap_utils import apply_lut, colormap_lut
+from block_pipeline import ByteLRU, load_image_cached
 
 def _build_single_preview(
     img_paths: Sequence[str],
@@ -119,55 +122,14 @@ def export_waterfall_mp4(img_paths: Sequence[str], cfg: Dict[str,Any], out_path:
         cfg['AUTO_SPLIT'] = False
 
 # ----------- Color maps -----------
-def _hex2rgb(h: str) -> tuple[int,int,int]:
-    h = h.lstrip("#")
-    return int(h[0:2],16), int(h[2:4],16), int(h[4:6],16)
-
-def _mk(stops: List[Tuple[int,str]]) -> np.ndarray:
-    lut = np.zeros((256,3), np.uint8)
-    for (p0,c0),(p1,c1) in zip(stops[:-1],stops[1:]):
-        r0,g0,b0 = _hex2rgb(c0); r1,g1,b1 = _hex2rgb(c1)
-        span = max(1, p1 - p0)
-        t = np.linspace(0,1,span,endpoint=False,dtype=np.float32)
-        lut[p0:p1,0] = (r0+(r1-r0)*t).astype(np.uint8)
-        lut[p0:p1,1] = (g0+(g1-g0)*t).astype(np.uint8)
-        lut[p0:p1,2] = (b0+(b1-b0)*t).astype(np.uint8)
-    p,c = stops[-1]
-    lut[p:] = np.array(_hex2rgb(c), np.uint8)
-    return lut
-
-_LUTS: Dict[str,np.ndarray] = {}
 def _lut(name: str) -> np.ndarray:
-    k = name.lower()
-    if k in _LUTS: return _LUTS[k]
-    maps = {
-        "grayscale":[(0,"#000000"),(255,"#ffffff")],
-        "amber":[(0,"#000000"),(40,"#2b1b00"),(96,"#7a3e00"),(180,"#f6a400"),(255,"#fff5cc")],
-        "copper":[(0,"#000000"),(48,"#1a0e06"),(110,"#5a2e15"),(190,"#b36b2c"),(255,"#ffd29c")],
-        "blue":[(0,"#000000"),(64,"#001a33"),(140,"#004c99"),(210,"#33aaff"),(255,"#d6f0ff")],
-        "ice":[(0,"#000000"),(64,"#001a33"),(170,"#66b2ff"),(255,"#ffffff")],
-        "purple":[(0,"#000000"),(64,"#1a0033"),(150,"#5a00a3"),(210,"#c084ff"),(255,"#ffe6ff")],
-        "fire":[(0,"#000000"),(50,"#330000"),(120,"#990000"),(200,"#ff6600"),(255,"#ffff66")],
-        "viridis":[(0,"#440154"),(80,"#3b528b"),(140,"#21918c"),(200,"#5ec962"),(255,"#fde725")],
-        "magma":[(0,"#000004"),(90,"#3b0f70"),(150,"#8c2981"),(200,"#de4968"),(235,"#fca636"),(255,"#fcfdbf")],
-        "inferno":[(0,"#000004"),(70,"#1f0c48"),(135,"#5c1e76"),(190,"#b63679"),(225,"#ee7b51"),(255,"#f6d746")]
-    }
-    _LUTS[k] = _mk(maps.get(k, maps["grayscale"]))
-    return _LUTS[k]
-
-def _apply(gray: np.ndarray, cmap: str) -> np.ndarray:
+    return colormap_lut(name, studio=True)
+
+def _apply(gray: np.ndarray, cmap: str, out: Optional[np.ndarray] = None) -> np.ndarray:
     # Accept grayscale uint8 or any float-ish array. Return RGB uint8.
     if gray.ndim == 3 and gray.shape[2] == 3:
         return gray
-    if gray.dtype != np.uint8:
-        f = gray.astype(np.float32)
-        mn = np.nanmin(f); mx = np.nanmax(f)
-        if not np.isfinite(mn) or not np.isfinite(mx) or mx <= mn:
-            f = np.clip(f, 0, 1)
-        else:
-            f = np.clip((f - mn) / (mx - mn), 0, 1)
-        gray = (f*255 + 0.5).astype(np.uint8)
-    return _lut(cmap)[gray]
+    return apply_lut(gray, _lut(cmap), out)
 
 # ----------- Stitch / align helpers -----------
 def _even_dims(h:int,w:int)->tuple[int,int]:
@@ -225,27 +187,7 @@ def _fit_half_width(img: np.ndarray, half_w:int)->np.ndarray:
 
 def _phase_corr_shift(L: np.ndarray, R: np.ndarray, max_shift:int)->Tuple[int,float]:
     try:
-        if L.size==0 or R.size==0: return 0,0.0
-        h=min(L.shape[0], R.shape[0]); wL=L.shape[1]; wR=R.shape[1]
-        if h<8 or wL<8 or wR<8: return 0,0.0
-        band = slice(max(0,h//3), min(h, 2*h//3))
-        A = L[band, -min(128,wL):].astype(np.float32)
-        B = R[band, :min(128,wR)].astype(np.float32)
-        if A.size==0 or B.size==0: return 0,0.0
-        A -= A.mean() if A.size else 0; B -= B.mean() if B.size else 0
-        W = 1<<int(np.ceil(np.log2(max(A.shape[1],B.shape[1])*2))) if max(A.shape[1],B.shape[1])>0 else 0
-        if W<=0: return 0,0.0
-        def fpad(X): out=np.zeros((X.shape[0],W),np.float32); out[:,:X.shape[1]]=X; return out
-        FA=np.fft.rfft(fpad(A),axis=1); FB=np.fft.rfft(fpad(B),axis=1)
-        Rsp=FA*np.conj(FB); pc=np.fft.irfft(Rsp/(np.abs(Rsp)+1e-6),axis=1)
-        if pc.size==0: return 0,0.0
-        prof=pc.mean(axis=0)
-        if not np.isfinite(prof).any(): return 0,0.0
-        peak=int(np.nanargmax(prof));  peak-= (prof.size if peak>prof.size//2 else 0)
-        shift=int(np.clip(peak,-max_shift,max_shift))
-        maxv=float(np.nanmax(prof)); score=float(prof[peak if peak>=0 else peak+prof.size]/(maxv+1e-6)) if np.isfinite(maxv) and maxv>0 else 0.0
-        if not np.isfinite(score): score=0.0
-        return shift,score
+        return band_shift(L, R, max_shift)
     except Exception:
         return 0,0.0
 
@@ -319,12 +261,56 @@ def _compose_window(rows: Sequence[np.ndarray], cfg: Dict[str,Any], mode:str, sh
 def _rows_needed(video_h:int, row_h:int)->int:
     return max(1, int(math.ceil(video_h / max(1,row_h))))
 
+class FrameSchedule:
+    """Time-based frame plan from schedule_frames().
+
+    last_rows[k] is the row at the bottom of output frame k (frames repeat a
+    row while the survey clock has not reached the next one); rows_needed are
+    the rows any frame shows, in order, so rows in between are never rendered.
+    """
+    def __init__(self, last_rows: np.ndarray, need:int, n_rows:int):
+        self.last_rows=np.asarray(last_rows, dtype=np.int64); self.need=int(need)
+        cover=np.zeros(n_rows+1, np.int64)
+        if len(self.last_rows):
+            ends=np.unique(self.last_rows)
+            np.add.at(cover, np.maximum(ends-self.need+1, 0), 1); np.add.at(cover, ends+1, -1)
+        self.rows_needed=np.nonzero(np.cumsum(cover[:n_rows])>0)[0]
+
+    def __len__(self)->int:
+        return len(self.last_rows)
+
+    @property
+    def unique_frames(self)->int:
+        return int(len(np.unique(self.last_rows)))
+
+def schedule_frames(times_ms: Sequence[float], fps:float, speed:float, row_height:int, video_height:int,
+                    start_ms:Optional[float]=None, end_ms:Optional[float]=None)->FrameSchedule:
+    """Plan a video that plays the survey at `speed` x real time.
+
+    times_ms holds one time per row (e.g. the last ping of each block); frame k
+    shows the window ending at the last row recorded by t0 + k*1000*speed/fps,
+    where t0 is the first full window (or start_ms, if later) and the video
+    stops at end_ms or the last row. Decreasing times are held at the running max.
+    """
+    t=np.maximum.accumulate(np.asarray(times_ms, dtype=np.float64)) if len(times_ms) else np.zeros(0)
+    need=_rows_needed(int(video_height), max(1,int(row_height)))
+    if len(t)<need or speed<=0 or fps<=0: return FrameSchedule(np.zeros(0, np.int64), need, len(t))
+    t0=t[need-1] if start_ms is None else max(t[need-1], float(start_ms))
+    t1=t[-1] if end_ms is None else min(t[-1], float(end_ms))
+    if t1<t0: return FrameSchedule(np.zeros(0, np.int64), need, len(t))
+    step=1000.0*float(speed)/float(fps)
+    clock=t0+step*np.arange(int(np.floor((t1-t0)/step))+1)
+    return FrameSchedule(np.searchsorted(t, clock, side="right")-1, need, len(t))
+
 # ----------- Public API -----------
+# decoded row images for repeated previews (keyed by path + mtime, so edits are picked up)
+_ROW_CACHE = ByteLRU(256 << 20)
+
 def build_preview_frame(row_paths: Sequence[str], cfg: Dict[str, Any], row_h:int, video_h:int):
     cmap=str(cfg.get("COLORMAP","amber")).lower(); mode=str(cfg.get("PREVIEW_MODE","compose")).lower()
     show_seam=bool(cfg.get("SHOW_SEAM", False)); smooth=int(cfg.get("SMOOTH_SHIFT",11)); edge_pad=int(cfg.get("EDGE_PAD",0))
     need=_rows_needed(video_h,row_h)
-    window=[np.array(Image.open(p)) for p in row_paths[:need]]
+    window=[load_image_cached(p, _ROW_CACHE) for p in row_paths[:need]]
     if not window: raise RuntimeError("No rows for preview")
     state={"HALF_W":None}
     gray,seam,shift,score=_compose_window(window, cfg, mode, show_seam, smooth, [], state, edge_pad=edge_pad)
@@ -333,17 +319,160 @@ def build_preview_frame(row_paths: Sequence[str], cfg: Dict[str, Any], row_h:int
 def export_waterfall_mp4(row_paths: Sequence[str], cfg: Dict[str, Any], out_mp4: str,
                          row_height:int, video_height:int, fps:int, vmax_frames:int,
                          log_func:Optional[Callable[[str],None]]=None):
+    rows=(np.array(Image.open(p)) for p in row_paths)
+    return export_waterfall_frames(rows, cfg, out_mp4, row_height, video_height, fps, vmax_frames, log_func)
+
+_LINE_MAPS: Dict[Tuple[int,int],np.ndarray] = {}
+def _line_map(n_out:int, n_in:int)->np.ndarray:
+    # nearest source index for each of n_out samples over n_in, accumulated in
+    # float64 the way PIL's NEAREST resize steps through pixel centres (same picks)
+    m=_LINE_MAPS.get((n_out,n_in))
+    if m is None:
+        step=np.full(n_out, n_in/float(n_out)); step[0]*=0.5
+        m=np.minimum(np.cumsum(step).astype(np.int64), n_in-1); m.flags.writeable=False
+        _LINE_MAPS[(n_out,n_in)]=m
+    return m
+
+def _row_lines(k:int, row_h:int, need:int, video_h:int)->np.ndarray:
+    """Source lines (within row k) of the output lines row k covers. Every run of
+    `need` rows is resized like one window (need*row_h -> video_h lines), so frames
+    starting at a multiple of `need` match resizing their window, and frame f is
+    always the video_h ring lines written since row f began."""
+    m=_line_map(video_h, need*row_h); q=k%need
+    lo,hi=np.searchsorted(m, (q*row_h, (q+1)*row_h))
+    return m[lo:hi]-q*row_h
+
+class WaterfallRing:
+    """Scrolling RGB frame buffer for the waterfall export.
+
+    Lines are written once per row into a (2*height, width, 3) array, each at
+    y % height and y % height + height, so the newest `height` lines are always a
+    single contiguous view. Adding a row costs its own lines, not the frame height.
+    """
+    def __init__(self, height:int, width:int):
+        self.height=int(height); self.buf=np.zeros((2*self.height, width, 3), np.uint8); self.lines=0
+
+    def push(self, strip: np.ndarray):
+        n=strip.shape[0]; h=self.height
+        if n>h: self.lines+=n-h; strip=strip[-h:]; n=h
+        p=self.lines%h; first=min(n, h-p); w=strip.shape[1]
+        self.buf[p:p+first,:w]=strip[:first]; self.buf[h+p:h+p+first,:w]=strip[:first]
+        if first<n:
+            rest=n-first; self.buf[:rest,:w]=strip[first:]; self.buf[h:h+rest,:w]=strip[first:]
+        self.lines+=n
+
+    def frame(self)->np.ndarray:
+        p=self.lines%self.height
+        return self.buf[p:p+self.height]
+
+def _render_strips(rows: Sequence[np.ndarray], indices: Sequence[int], cfg: Dict[str, Any], half_w:Optional[int],
+                   geom: Tuple[int,int,int,int,int,int], cmap:str):
+    """Composed, scaled and colour-mapped strips for the rows at `indices` of the
+    stream (compose mode; pool worker). geom is (row_h, need, video_h, composed width, edge pad,
+    scaled frame width). Returns [(RGB strip, raw shift)]."""
+    row_h,need,video_h,comp_w,edge_pad,out_w=geom
+    cols=_line_map(out_w, comp_w+2*edge_pad); lut=_lut(cmap)
+    state={"HALF_W":half_w}; out=[]
+    for k,row in zip(indices, rows):
+        comp,_,shift,_,_,_=_compose_single_row(row,cfg,state)
+        if comp.shape[0]!=row_h: comp=comp[_line_map(row_h, comp.shape[0])]
+        sel=_fit_half_width(comp, comp_w)[_row_lines(k,row_h,need,video_h)]
+        if edge_pad>0:
+            padded=np.zeros((sel.shape[0], comp_w+2*edge_pad)+sel.shape[2:], sel.dtype)
+            padded[:,edge_pad:edge_pad+comp_w]=sel; sel=padded
+        sel=sel[:,cols]
+        out.append((sel if sel.ndim==3 else apply_lut(sel, lut), shift))
+    return out
+
+def export_waterfall_frames(rows: Iterable[np.ndarray], cfg: Dict[str, Any], out_mp4: str,
+                            row_height:int, video_height:int, fps:int, vmax_frames:int,
+                            log_func:Optional[Callable[[str],None]]=None,
+                            schedule:Optional[FrameSchedule]=None) -> int:
+    """export_waterfall_mp4 for in-memory rows (grayscale or RGB uint8 arrays, consumed
+    lazily). cfg["DEBUG_FRAME_DIR"] also saves each row as a PNG. Returns rows used.
+
+    Each row is composed, scaled and colour-mapped once into a strip that is
+    written into a WaterfallRing; every frame is a view of the ring, so the
+    per-frame cost is one row, not the video height. Strips are rendered in
+    chunks of cfg["RENDER_CHUNK"] (8) rows; with cfg["RENDER_WORKERS"] > 1 the
+    chunks go to a process pool and come back in order through
+    render_accel.ordered_map (at most 2 chunks per worker in flight). Encoding
+    runs on VideoWorker's writer thread behind cfg["VIDEO_QUEUE"] (4) frame
+    buffers; cfg["VIDEO_BACKEND"] = "ffmpeg"/"auto" pipes to a local ffmpeg.
+
+    Without a schedule there is one frame per row from the first full window
+    up to row vmax_frames. With a FrameSchedule (schedule_frames) `rows` yields
+    only schedule.rows_needed, in order; repeated frames are re-sent without
+    composing and vmax_frames is ignored.
+    """
     log = log_func or (lambda m: None)
     cmap=str(cfg.get("COLORMAP","amber")).lower(); smooth=int(cfg.get("SMOOTH_SHIFT",11)); edge_pad=int(cfg.get("EDGE_PAD",0))
-    need=_rows_needed(video_height,row_height); window=[]; shist=[]; state={"HALF_W":None}
-    vw=VideoWorker(out_mp4, fps=fps, encoder=str(cfg.get("VIDEO_ENCODER","mp4v")), log_func=log)
-    for i,p in enumerate(row_paths):
-        window.append(np.array(Image.open(p)))
-        if len(window)>need: window.pop(0)
-        if len(window)==need:
-            gray,seam,shift,score=_compose_window(window, cfg, "compose", False, smooth, shist, state, edge_pad=edge_pad)
-            if shift is not None: log(f"align: shift={shift:+d}px")
-            gray=_resize_h(gray, int(video_height)); rgb=_apply(gray, cmap); rgb=_even_frame(rgb)
-            vw.push(rgb)
-            if i>=vmax_frames: break
-    vw.close()
+    workers=int(cfg.get("RENDER_WORKERS",0) or 0); chunk=max(1,int(cfg.get("RENDER_CHUNK",8)))
+    debug_dir=cfg.get("DEBUG_FRAME_DIR")
+    if debug_dir: os.makedirs(debug_dir, exist_ok=True)
+    row_h=max(1,int(row_height)); video_h=max(1,int(video_height))
+    need=_rows_needed(video_h,row_h)
+    if schedule is None:
+        last=max(vmax_frames,need-1); indices=None
+        repeats=lambda j: 1 if j>=need-1 else 0
+    else:
+        if not len(schedule): return 0
+        last=int(schedule.last_rows[-1]); indices=schedule.rows_needed.tolist()
+        ends,counts=np.unique(schedule.last_rows, return_counts=True); per_row=dict(zip(ends.tolist(), counts.tolist()))
+        repeats=lambda j: per_row.get(j,0)
+    state={"HALF_W":None}; used=[0]; geom=[None]
+
+    def chunks():
+        buf=[]; idx=[]
+        for i,row in enumerate(rows):
+            j=i if indices is None else indices[i]
+            used[0]=i+1
+            if debug_dir: Image.fromarray(row).save(os.path.join(debug_dir, f"frame_{j:06d}.png"))
+            if geom[0] is None:
+                comp_w=_compose_single_row(row,cfg,state)[0].shape[1]  # first split fixes the half width
+                out_w=comp_w+2*edge_pad
+                if need*row_h!=video_h: out_w=max(2,int(round(out_w*video_h/float(need*row_h))))
+                geom[0]=(row_h,need,video_h,comp_w,edge_pad,out_w)
+            buf.append(row); idx.append(j)
+            if len(buf)>=chunk or j>=last:
+                yield buf, idx, cfg, state["HALF_W"], geom[0], cmap
+                buf=[]; idx=[]
+            if j>=last: return
+        if buf:
+            yield buf, idx, cfg, state["HALF_W"], geom[0], cmap
+
+    fn=_render_strips
+    if workers>1:
+        import importlib
+        fn=importlib.import_module("video_exporter")._render_strips  # picklable by module name
+    ring=None; window=[]; shist=[]; pos=0
+    vw=VideoWorker(out_mp4, fps=fps, encoder=str(cfg.get("VIDEO_ENCODER","mp4v")), log_func=log,
+                   queue_size=int(cfg.get("VIDEO_QUEUE",4)), backend=str(cfg.get("VIDEO_BACKEND","opencv")))
+    try:
+        for strips in ordered_map(fn, chunks(), workers):
+            for strip,raw in strips:
+                j=pos if indices is None else indices[pos]; pos+=1
+                if ring is None: ring=WaterfallRing(video_h, _even_dims(video_h, strip.shape[1])[1])
+                ring.push(strip)
+                window.append(raw)
+                if len(window)>need: window.pop(0)
+                n_frames=repeats(j)
+                if not n_frames: continue
+                # same shift log as re-composing the whole window for every frame
+                shift=None
+                for sh in window:
+                    if sh is not None and smooth>1:
+                        shist.append(int(sh))
+                        if len(shist)>smooth: shist.pop(0)
+                        sh=int(np.median(shist))
+                    shift = sh if sh is not None else shift
+                if shift is not None: log(f"align: shift={shift:+d}px")
+                frame=ring.frame()
+                if video_h%2: frame=_even_frame(frame)
+                for _ in range(n_frames): vw.push(frame)
+    finally:
+        vw.close()
+    st=vw.stats()
+    if st["frames"]: log(f"[VideoWriter] {st['frames']} frames, encode {st['encode_s']:.2f}s, "
+                         f"waited {st['wait_s']:.2f}s for buffers (max queue {st['max_queue_depth']}/{st['queue_size']})")
+    return used[0]